@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# availability.py
+#
+# Bitmap view of one day's reservation grid. Each court is a row held in a
+# plain Python int, and each bit is one tick of the day: bit t stands for the
+# tick that starts t * tick_minutes after midnight. The tick is the largest
+# step that all slot starts and lengths divide into (20 minutes at our club).
+# Window, adjacency and back-to-back queries become shifts and ANDs on these
+# ints, so they don't loop over every ranked candidate. The matrix is built
+# once per GridSnapshot (see GridSnapshot.availability()).
+
+import math
+
+def parse_clock(text):
+    """Minutes since midnight for "6:00 PM" / "06:00 PM" (None if unreadable)"""
+    try:
+        clock, suffix = text.strip().split(" ")
+        hour, minute = clock.split(":")
+        hour = int(hour) % 12 + (12 if suffix.upper() == "PM" else 0)
+        return hour * 60 + int(minute)
+    except (AttributeError, ValueError):
+        return None
+
+def bits(mask):
+    """Indices of the set bits of mask, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+class AvailabilityMatrix:
+    """Courts x ticks availability bitmap for one day"""
+    def __init__(self, slots):
+        """slots: iterable of (court, start minute, end minute, open)"""
+        slots = [(int(c), s, e, o) for c, s, e, o in slots if s is not None and e is not None and e > s]
+        self.tick_minutes = 0
+        for _, start, end, _ in slots:
+            self.tick_minutes = math.gcd(self.tick_minutes, math.gcd(start, end - start))
+        self.tick_minutes = self.tick_minutes or 1
+        # court -> bitmap of the ticks where an open slot starts / an existing slot starts
+        self.open_starts = {}
+        self.slot_starts = {}
+        # court -> slot length in ticks
+        self.slot_ticks = {}
+        for court, start, end, is_open in slots:
+            bit = 1 << (start // self.tick_minutes)
+            self.slot_starts[court] = self.slot_starts.get(court, 0) | bit
+            self.slot_ticks.setdefault(court, (end - start) // self.tick_minutes)
+            if is_open:
+                self.open_starts[court] = self.open_starts.get(court, 0) | bit
+        self.courts = sorted(self.slot_starts)
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        return cls(
+            (entry["court"], entry["start_minute"], entry["end_minute"], entry["open"])
+            for entry in snapshot.slots.values()
+        )
+
+    def tick(self, minutes):
+        """Tick index of a minute-of-day, or None if it doesn't fall on a tick"""
+        if minutes is None or minutes % self.tick_minutes:
+            return None
+        return minutes // self.tick_minutes
+
+    def window_mask(self, start_minute, end_minute):
+        """Bitmap of the ticks from start_minute up to (not including) end_minute"""
+        first = -(-start_minute // self.tick_minutes)
+        last = -(-end_minute // self.tick_minutes)
+        return ((1 << max(last - first, 0)) - 1) << first
+
+    def is_open(self, court, start_minute):
+        tick = self.tick(start_minute)
+        return tick is not None and bool(self.open_starts.get(int(court), 0) >> tick & 1)
+
+    def open_in_window(self, court, start_minute, end_minute):
+        """Start minutes of the open slots on court that start inside the window"""
+        mask = self.open_starts.get(int(court), 0) & self.window_mask(start_minute, end_minute)
+        return [tick * self.tick_minutes for tick in bits(mask)]
+
+    def first_open_in_window(self, start_minute, end_minute, court_ranking=None):
+        """Earliest open (court, start minute) in the window, ties broken by court rank"""
+        window = self.window_mask(start_minute, end_minute)
+        best = None
+        for court in court_ranking or self.courts:
+            mask = self.open_starts.get(int(court), 0) & window
+            if not mask:
+                continue
+            tick = (mask & -mask).bit_length() - 1
+            if best is None or tick < best[1]:
+                best = (int(court), tick)
+        return (best[0], best[1] * self.tick_minutes) if best else None
+
+    def open_courts_at(self, start_minute):
+        """Bitmap of courts (bit c = court c) with an open slot starting at start_minute"""
+        tick = self.tick(start_minute)
+        if tick is None:
+            return 0
+        mask = 0
+        for court, row in self.open_starts.items():
+            mask |= (row >> tick & 1) << court
+        return mask
+
+    def adjacent_courts(self, start_minute, count=2):
+        """First courts of every run of `count` neighbouring courts all open at start_minute"""
+        mask = self.open_courts_at(start_minute)
+        runs = mask
+        for shift in range(1, count):
+            runs &= mask >> shift
+        return list(bits(runs))
+
+    def run_starts(self, court, slots=1):
+        """Bitmap of the ticks on court where `slots` consecutive slots are all open"""
+        court = int(court)
+        row = self.open_starts.get(court, 0)
+        step = self.slot_ticks.get(court, 0)
+        runs = row
+        for n in range(1, slots):
+            runs &= row >> (n * step)
+        return runs
+
+    def back_to_back(self, court, slots=2, window=None):
+        """Start minutes on court where `slots` consecutive slots are all open (e.g. 2 x 40 = 80 minutes)"""
+        runs = self.run_starts(court, slots)
+        if window is not None:
+            runs &= self.window_mask(*window)
+        return [tick * self.tick_minutes for tick in bits(runs)]
+
+    def open_candidates(self, day_schedule):
+        """(rank, entry) for the ranked candidates that are open, best first"""
+        for rank, entry in enumerate(day_schedule, start=1):
+            if self.is_open(entry["court"], parse_clock(entry["time_slot"].split(" - ")[0])):
+                yield rank, entry
+
+    def first_open(self, day_schedule):
+        """Best ranked open candidate, or None"""
+        return next(self.open_candidates(day_schedule), (None, None))[1]
+
+    def count_open(self):
+        return sum(bin(row).count("1") for row in self.open_starts.values())
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# benchmarks/bench_booking.py
+#
+# End-to-end latency benchmark against the local ClubLocker stand-in.
+# Each iteration starts a fresh stand-in (with the requested server delay and
+# rival contention), drives a booking backend through every phase exactly as
+# run_scheduled_bookings does, and records time-to-confirmed-booking. A full
+# `python run_scheduled_bookings.py` subprocess run is timed as well.
+#
+# The default backend is browser (SquashBooking), which needs Chrome and a
+# baseline of its own (--save_baseline). benchmarks/baseline.json already has
+# numbers for --backend http.
+#
+# Usage:
+#   python benchmarks/bench_booking.py --iterations 20 --delay 0.05 --contention 0.3
+#   python benchmarks/bench_booking.py --backend http --iterations 20
+#   python benchmarks/bench_booking.py --save_baseline
+
+import os
+import sys
+import io
+import json
+import math
+import time
+import contextlib
+import argparse
+import datetime
+import subprocess
+from types import SimpleNamespace
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+# The stand-in accepts any non-empty credentials; set them before the backends read them
+os.environ.setdefault("CLUBLOCKER_USERNAME", "benchmark")
+os.environ.setdefault("CLUBLOCKER_PASSWORD", "benchmark")
+
+import run_scheduled_bookings as runner
+from clublocker_standin import start_standin
+from booking_log import setup_logging, format_line
+
+BASELINE_FILE = os.path.join(REPO_ROOT, "benchmarks", "baseline.json")
+PHASES = ["start_browser", "login", "navigate_to_date", "snapshot_grid", "book", "time_to_booking", "end_to_end"]
+# A phase regresses when its p95 is this much slower than the stored baseline,
+DEFAULT_TOLERANCE = 0.25
+# ...by more than this many times the baseline's p50-p95 spread (its run-to-run noise),
+DEFAULT_NOISE_SPREADS = 2.0
+# ...and by at least this many milliseconds, below which timer resolution dominates
+DEFAULT_MIN_DELTA_MS = 1.0
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+def pick_current_date(final_schedule):
+    """A current date whose runner target (current + 5 days) has a schedule"""
+    day = datetime.date.today()
+    for _ in range(7):
+        if (day + datetime.timedelta(days=5)).strftime("%A") in final_schedule:
+            return day
+        day += datetime.timedelta(days=1)
+    raise SystemExit("booking_config.json has no final_schedule to benchmark")
+
+def standin_options(args, seed):
+    return dict(
+        response_delay=args.delay,
+        delay_jitter=args.jitter,
+        contention=args.contention,
+        rival_window=args.rival_window,
+        seed=seed,
+    )
+
+def run_phases(args, config, day_schedule, booking_date, seed):
+    """One in-process run; returns ({phase: seconds}, booked)"""
+    server, base_url = start_standin(**standin_options(args, seed))
+    runner_args = SimpleNamespace(
+        show_browser=False, test=False, verbose=False, base_url=base_url,
+        backend=args.backend, no_session_cache=True,
+    )
+    timings = {}
+    booking = runner.make_booking(runner_args, config)
+    started = time.perf_counter()
+    booked = False
+    try:
+        for phase, call in [
+            ("start_browser", booking.start_browser),
+            ("login", booking.login),
+            ("navigate_to_date", lambda: booking.navigate_to_date(booking_date, runner.ORG_ID)),
+            ("snapshot_grid", booking.snapshot_grid),
+            ("book", lambda: runner.book_from_schedule(booking, day_schedule)),
+        ]:
+            phase_started = time.perf_counter()
+            result = call()
+            timings[phase] = time.perf_counter() - phase_started
+            if phase == "book":
+                booked = bool(result)
+        if booked:
+            timings["time_to_booking"] = time.perf_counter() - started
+    finally:
+        booking.close()
+        server.shutdown()
+    return timings, booked
+
+def run_end_to_end(args, current_date, seed):
+    """A full `run_scheduled_bookings.py` subprocess run; returns (seconds, booked)"""
+    server, base_url = start_standin(**standin_options(args, seed))
+    command = [
+        sys.executable, "run_scheduled_bookings.py",
+        "--base_url", base_url,
+        "--backend", args.backend,
+        "--current_date", current_date.strftime("%Y-%m-%d"),
+        "--no_session_cache",
+        # Benchmark runs are not real bookings; keep them out of the ledger and traces/
+        "--no_ledger",
+        "--no_trace",
+    ]
+    started = time.perf_counter()
+    try:
+        result = subprocess.run(command, cwd=REPO_ROOT, capture_output=True, text=True)
+    finally:
+        server.shutdown()
+    return time.perf_counter() - started, "Booking successful" in result.stdout
+
+def summarize(samples):
+    summary = {}
+    for phase in PHASES:
+        values = samples.get(phase, [])
+        if values:
+            summary[phase] = {
+                "p50": round(percentile(values, 50), 6),
+                "p95": round(percentile(values, 95), 6),
+                "n": len(values),
+            }
+    return summary
+
+def scenario_key(args):
+    return f"{args.backend}/delay={args.delay}/jitter={args.jitter}/contention={args.contention}"
+
+def noise_floor(stats, noise_spreads, min_delta):
+    """Slowdown (seconds) a phase's p95 must exceed to count: a multiple of its baseline spread"""
+    return max(noise_spreads * (stats["p95"] - stats["p50"]), min_delta)
+
+def compare_to_baseline(key, summary, tolerance, noise_spreads=DEFAULT_NOISE_SPREADS,
+                        min_delta=DEFAULT_MIN_DELTA_MS / 1000):
+    """Print the comparison and return the phases over both tolerance and their noise floor"""
+    if not os.path.exists(BASELINE_FILE):
+        print("No baseline stored yet (run with --save_baseline)")
+        return []
+    with open(BASELINE_FILE, "r") as f:
+        baseline = json.load(f).get(key)
+    if not baseline:
+        print(f"No baseline stored for {key}")
+        return []
+    regressions = []
+    print("\n" + format_line("Compared to baseline (p95)"))
+    for phase, stats in summary.items():
+        if phase not in baseline:
+            continue
+        before = baseline[phase]["p95"]
+        change = (stats["p95"] - before) / before if before else 0.0
+        flag = ""
+        if change > tolerance and stats["p95"] - before > noise_floor(baseline[phase], noise_spreads, min_delta):
+            flag = "  REGRESSION"
+            regressions.append(phase)
+        print(f"  {phase:<17} {before * 1000:9.1f} ms -> {stats['p95'] * 1000:9.1f} ms  ({change:+.0%}){flag}")
+    return regressions
+
+def save_baseline(key, summary):
+    baseline = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, "r") as f:
+            baseline = json.load(f)
+    baseline[key] = summary
+    with open(BASELINE_FILE, "w") as f:
+        json.dump(baseline, f, indent=4, sort_keys=True)
+    print(f"Baseline for {key} saved to {BASELINE_FILE}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark booking latency against the local stand-in.")
+    parser.add_argument("--backend", type=str, choices=sorted(runner.BACKENDS), default="browser",
+                        help="Booking backend to benchmark: browser (SquashBooking, needs Chrome) or http")
+    parser.add_argument("--iterations", type=int, default=10, help="Runs per measurement")
+    parser.add_argument("--delay", type=float, default=0.0, help="Server delay added to every response (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra server delay (seconds)")
+    parser.add_argument("--contention", type=float, default=0.0, help="Share of slots rival members grab (0-1)")
+    parser.add_argument("--rival_window", type=float, default=2.0, help="Rivals grab their slots within this many seconds")
+    parser.add_argument("--skip_end_to_end", action="store_true", help="Only run the in-process phase benchmark")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed p95 slowdown before failing")
+    parser.add_argument("--noise_spreads", type=float, default=DEFAULT_NOISE_SPREADS,
+                        help="A slowdown within this many baseline p50-p95 spreads is noise and never fails")
+    parser.add_argument("--min_delta_ms", type=float, default=DEFAULT_MIN_DELTA_MS,
+                        help="A slowdown smaller than this many milliseconds never fails")
+    parser.add_argument("--verbose", action="store_true", help="Show the backends' own output")
+    parser.add_argument("--save_baseline", action="store_true", help="Store these results as the new baseline")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.verbose:
+        # Without it the backends' step-by-step log stays unwritten
+        setup_logging(verbose=True)
+    with open(os.path.join(REPO_ROOT, runner.CONFIG_FILE), "r") as f:
+        config = json.load(f)
+    final_schedule = config.get("final_schedule", {})
+    current_date = pick_current_date(final_schedule)
+    target_date = current_date + datetime.timedelta(days=5)
+    day_schedule = final_schedule[target_date.strftime("%A")]
+
+    print("\n" + format_line(f"Booking benchmark: {scenario_key(args)}"))
+    samples = {}
+    booked_runs = 0
+    for iteration in range(args.iterations):
+        # The backends narrate every step; keep the benchmark output readable
+        output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            timings, booked = run_phases(args, config, day_schedule, target_date.strftime("%Y-%m-%d"), iteration)
+        booked_runs += booked
+        for phase, seconds in timings.items():
+            samples.setdefault(phase, []).append(seconds)
+        if not args.skip_end_to_end:
+            seconds, _ = run_end_to_end(args, current_date, iteration)
+            samples.setdefault("end_to_end", []).append(seconds)
+
+    summary = summarize(samples)
+    print(f"\nConfirmed bookings: {booked_runs}/{args.iterations}")
+    print(f"\n  {'phase':<17} {'p50':>10} {'p95':>10}")
+    for phase, stats in summary.items():
+        print(f"  {phase:<17} {stats['p50'] * 1000:7.1f} ms {stats['p95'] * 1000:7.1f} ms")
+
+    key = scenario_key(args)
+    if args.save_baseline:
+        save_baseline(key, summary)
+        return
+    regressions = compare_to_baseline(key, summary, args.tolerance, args.noise_spreads, args.min_delta_ms / 1000)
+    if regressions:
+        print("\n" + format_line(f"Regressed: {', '.join(regressions)}", symbol="!"))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# benchmarks/bench_profiles.py
+#
+# Compares the default and lean browser profiles against the local stand-in.
+# The stand-in's grid page pulls in a banner image, a web font and an
+# analytics script (slowed down by --asset_delay), like the real page does.
+# For each profile, every iteration starts Chrome, logs in and loads a
+# date's grid a few times. The script then reports page-load time (get() to
+# a rendered grid) and the peak RSS of chromedriver plus Chrome, side by side.
+#
+# Usage:
+#   python benchmarks/bench_profiles.py --iterations 5 --asset_delay 0.2
+
+import os
+import sys
+import io
+import math
+import contextlib
+import argparse
+import datetime
+from types import SimpleNamespace
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+# The stand-in accepts any non-empty credentials; set them before the backends read them
+os.environ.setdefault("CLUBLOCKER_USERNAME", "benchmark")
+os.environ.setdefault("CLUBLOCKER_PASSWORD", "benchmark")
+
+import run_scheduled_bookings as runner
+from clublocker_standin import start_standin
+from booking_log import setup_logging, format_line
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+def run_profile(args, profile, base_url, booking_date):
+    """One browser session; returns (page load seconds, peak RSS bytes)"""
+    runner_args = SimpleNamespace(
+        show_browser=False, test=True, verbose=False, base_url=base_url,
+        backend="browser", no_session_cache=True, browser_profile=profile,
+    )
+    booking = runner.make_booking(runner_args, {})
+    try:
+        booking.start_browser()
+        booking.login()
+        for _ in range(args.loads):
+            booking.navigate_to_date(booking_date, runner.ORG_ID, check_existing=False)
+        return [seconds for _, seconds in booking.page_loads], booking.measure_peak_rss()
+    finally:
+        booking.close()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare the default and lean browser profiles.")
+    parser.add_argument("--iterations", type=int, default=5, help="Browser sessions per profile")
+    parser.add_argument("--loads", type=int, default=3, help="Grid page loads per session")
+    parser.add_argument("--asset_delay", type=float, default=0.2, help="Stand-in delay for images, fonts and scripts")
+    parser.add_argument("--delay", type=float, default=0.0, help="Stand-in delay added to every response")
+    parser.add_argument("--verbose", action="store_true", help="Show the backend's own output")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.verbose:
+        # Without it the backends' step-by-step log stays unwritten
+        setup_logging(verbose=True)
+    server, base_url = start_standin(response_delay=args.delay, asset_delay=args.asset_delay)
+    booking_date = (datetime.date.today() + datetime.timedelta(days=5)).strftime("%Y-%m-%d")
+    results = {}
+    try:
+        for profile in runner.BROWSER_PROFILES:
+            loads, peaks = [], []
+            for _ in range(args.iterations):
+                output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+                with output:
+                    profile_loads, peak = run_profile(args, profile, base_url, booking_date)
+                loads.extend(profile_loads)
+                if peak:
+                    peaks.append(peak)
+            results[profile] = (loads, peaks)
+    finally:
+        server.shutdown()
+
+    print("\n" + format_line(f"Browser profiles (asset delay {args.asset_delay}s)"))
+    print(f"  {'profile':<9} {'load p50':>10} {'load p95':>10} {'peak RSS p50':>14} {'peak RSS max':>14}")
+    summary = {}
+    for profile, (loads, peaks) in results.items():
+        load_p50 = percentile(loads, 50)
+        rss_p50 = percentile(peaks, 50)
+        summary[profile] = (load_p50, rss_p50)
+        rss_text = f"{rss_p50 / 2**20:11.0f} MB {max(peaks) / 2**20:11.0f} MB" if peaks else f"{'n/a':>14} {'n/a':>14}"
+        print(f"  {profile:<9} {load_p50 * 1000:7.0f} ms {percentile(loads, 95) * 1000:7.0f} ms {rss_text}")
+
+    default_load, default_rss = summary["default"]
+    lean_load, lean_rss = summary["lean"]
+    if default_load:
+        print(f"\n  Lean page loads: {1 - lean_load / default_load:.0%} faster")
+    if default_rss and lean_rss:
+        print(f"  Lean peak RSS:   {(default_rss - lean_rss) / 2**20:.0f} MB less ({1 - lean_rss / default_rss:.0%})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# benchmarks/bench_replay.py
+#
+# Replays saved grid and reservations pages (see page_capture.py) without
+# Chrome or the network. For every capture the HTML is re-parsed with
+# page_parser.py and checked against what the live script extracted at
+# capture time. Grid captures then go through the planner: GridSnapshot,
+# the availability bitmap and SlotOptimizer.rank with the current schedule.
+# The planner's choice from the parsed page must match its choice from the
+# live data. Any mismatch fails the run, so this doubles as a regression
+# test for the parsers and the planner.
+#
+# Without real captures, --standin N first writes N days of synthetic
+# captures rendered by the local stand-in (with rival contention).
+#
+# Usage:
+#   python run_scheduled_bookings.py --capture           # during real runs
+#   python benchmarks/bench_replay.py --capture_dir captures
+#   python benchmarks/bench_replay.py --standin 60 --parser stdlib
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import datetime
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import run_scheduled_bookings as runner
+import page_parser
+from page_capture import PageCapture, load_captures, DEFAULT_CAPTURE_DIR
+from grid_snapshot import GridSnapshot
+from preferences import SlotOptimizer
+from timetable import PLAN_FILE, load_plan, plan_to_final_schedule
+from booking_log import format_line
+
+BASELINE_FILE = os.path.join(REPO_ROOT, "benchmarks", "baseline.json")
+DEFAULT_TOLERANCE = 0.25
+STANDIN_MEMBER = "benchmark"
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+def write_standin_captures(directory, days, contention, seed):
+    """Render `days` dates on the stand-in and save them as grid and reservations captures"""
+    import requests
+    from clublocker_standin import start_standin, SESSION_COOKIE
+
+    server, base_url = start_standin(contention=contention, rival_window=0.0, seed=seed)
+    capture = PageCapture(directory)
+    session = requests.Session()
+    session.cookies.set(SESSION_COOKIE, STANDIN_MEMBER)
+    first = datetime.date.today()
+    try:
+        state = server.state
+        for offset in range(days):
+            booking_date = (first + datetime.timedelta(days=offset)).strftime("%Y-%m-%d")
+            grid = state.grid(booking_date)
+            # Hold one open slot so the page also lists a reservation
+            for column in grid["courts"]:
+                held = next((s for s in column["slots"] if s["status"] == "open"), None)
+                if held and offset % 3 == 0:
+                    state.book(booking_date, column["court"], held["start"], STANDIN_MEMBER)
+                    break
+            url = f"{base_url}/organizations/{runner.ORG_ID}/reservations/{booking_date}/grid"
+            page_html = session.get(url).text
+            slots = [
+                {"court": column["court"], "title": f"{s['start']} - {s['end']}\nCourt {column['court']}",
+                 "classes": f"slot {s['status']}"}
+                for column in state.grid(booking_date)["courts"] for s in column["slots"]
+            ]
+            rows = [
+                {"date": datetime.datetime.strptime(d, "%Y-%m-%d").strftime("%a, %b %d"), "time": f"{start} Court {court}"}
+                for d, court, start in state.member_bookings(STANDIN_MEMBER)
+            ]
+            capture.save("grid", booking_date, page_html, slots, url)
+            capture.save("reservations", booking_date, page_html, rows, url)
+    finally:
+        server.shutdown()
+    return capture.saved
+
+def plan_choice(raw_slots, day_schedule, optimizer):
+    """(court, time slot) the planner would try first, plus the seconds it took"""
+    started = time.perf_counter()
+    ranked = optimizer.rank(GridSnapshot(raw_slots).availability(), day_schedule)
+    elapsed = time.perf_counter() - started
+    return ((ranked[0]["court"], ranked[0]["time_slot"]) if ranked else None), elapsed
+
+def strip_slot(slot):
+    return (int(slot["court"]), slot.get("title") or "", slot.get("classes") or "")
+
+def replay(captures, parser, final_schedule, optimizer):
+    """Parse and plan every capture; returns (samples, mismatches)"""
+    samples = {"parse_grid": [], "parse_reservations": [], "plan": []}
+    mismatches = []
+    for capture in captures:
+        with open(capture["html"], "r", encoding="utf-8") as f:
+            page_html = f.read()
+        if capture["kind"] == "grid":
+            started = time.perf_counter()
+            raw_slots = page_parser.parse_grid_html(page_html, parser)
+            samples["parse_grid"].append(time.perf_counter() - started)
+            if [strip_slot(s) for s in raw_slots] != [strip_slot(s) for s in capture["extracted"]]:
+                mismatches.append((capture["html"], "grid slots differ from the live extraction"))
+                continue
+            day_name = datetime.datetime.strptime(capture["booking_date"], "%Y-%m-%d").strftime("%A")
+            day_schedule = final_schedule.get(day_name)
+            if not day_schedule:
+                continue
+            choice, elapsed = plan_choice(raw_slots, day_schedule, optimizer)
+            expected, _ = plan_choice(capture["extracted"], day_schedule, optimizer)
+            samples["plan"].append(elapsed)
+            if choice != expected:
+                mismatches.append((capture["html"], f"planner picked {choice}, live data gives {expected}"))
+        elif capture["kind"] == "reservations":
+            started = time.perf_counter()
+            rows = page_parser.parse_reservations_html(page_html, parser)
+            samples["parse_reservations"].append(time.perf_counter() - started)
+            if rows != capture["extracted"]:
+                mismatches.append((capture["html"], "reservation rows differ from the live extraction"))
+    return samples, mismatches
+
+def summarize(samples):
+    summary = {}
+    for phase, values in samples.items():
+        if values:
+            summary[phase] = {
+                "p50": round(percentile(values, 50), 6),
+                "p95": round(percentile(values, 95), 6),
+                "n": len(values),
+            }
+    return summary
+
+def compare_to_baseline(key, summary, tolerance):
+    """Print the comparison and return the list of regressed phases"""
+    if not os.path.exists(BASELINE_FILE):
+        print("No baseline stored yet (run with --save_baseline)")
+        return []
+    with open(BASELINE_FILE, "r") as f:
+        baseline = json.load(f).get(key)
+    if not baseline:
+        print(f"No baseline stored for {key}")
+        return []
+    regressions = []
+    print("\n" + format_line("Compared to baseline (p95)"))
+    for phase, stats in summary.items():
+        if phase not in baseline:
+            continue
+        before = baseline[phase]["p95"]
+        change = (stats["p95"] - before) / before if before else 0.0
+        flag = ""
+        if change > tolerance:
+            flag = "  REGRESSION"
+            regressions.append(phase)
+        print(f"  {phase:<19} {before * 1e6:9.0f} us -> {stats['p95'] * 1e6:9.0f} us  ({change:+.0%}){flag}")
+    return regressions
+
+def save_baseline(key, summary):
+    baseline = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, "r") as f:
+            baseline = json.load(f)
+    baseline[key] = summary
+    with open(BASELINE_FILE, "w") as f:
+        json.dump(baseline, f, indent=4, sort_keys=True)
+    print(f"Baseline for {key} saved to {BASELINE_FILE}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay captured pages through the offline parser and the planner.")
+    parser.add_argument("--capture_dir", type=str, default=None,
+                        help=f"Captures to replay (default: {DEFAULT_CAPTURE_DIR}, or a temporary directory with --standin)")
+    parser.add_argument("--standin", type=int, default=0, metavar="DAYS",
+                        help="First write this many days of synthetic captures from the stand-in")
+    parser.add_argument("--contention", type=float, default=0.5, help="Share of stand-in slots taken by rivals (0-1)")
+    parser.add_argument("--seed", type=int, default=0, help="Stand-in seed for which slots rivals take")
+    parser.add_argument("--parser", type=str, choices=page_parser.PARSERS, default=page_parser.default_parser(),
+                        help="HTML parser to replay with (default: lxml if installed)")
+    parser.add_argument("--iterations", type=int, default=3, help="Passes over all captures")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed p95 slowdown before failing")
+    parser.add_argument("--save_baseline", action="store_true", help="Store these results as the new baseline")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    with open(os.path.join(REPO_ROOT, runner.CONFIG_FILE), "r") as f:
+        config = json.load(f)
+    plan = load_plan(os.path.join(REPO_ROOT, PLAN_FILE), config)
+    final_schedule = plan_to_final_schedule(plan) if plan else config.get("final_schedule", {})
+    optimizer = SlotOptimizer.from_config(config)
+
+    capture_dir = args.capture_dir or (tempfile.mkdtemp(prefix="captures-") if args.standin else DEFAULT_CAPTURE_DIR)
+    if args.standin:
+        saved = write_standin_captures(capture_dir, args.standin, args.contention, args.seed)
+        print(f"Wrote {saved} stand-in captures to {capture_dir}")
+    captures = load_captures(capture_dir)
+    if not captures:
+        print(f"No captures in {capture_dir} (record some with run_scheduled_bookings.py --capture, or use --standin)")
+        sys.exit(1)
+
+    print("\n" + format_line(f"Replay: {len(captures)} captures, {args.parser} parser"))
+    samples = {}
+    mismatches = []
+    for _ in range(args.iterations):
+        run_samples, mismatches = replay(captures, args.parser, final_schedule, optimizer)
+        for phase, values in run_samples.items():
+            samples.setdefault(phase, []).extend(values)
+
+    summary = summarize(samples)
+    print(f"\n  {'phase':<19} {'p50':>10} {'p95':>10} {'n':>6}")
+    for phase, stats in summary.items():
+        print(f"  {phase:<19} {stats['p50'] * 1e6:7.0f} us {stats['p95'] * 1e6:7.0f} us {stats['n']:>6}")
+
+    if mismatches:
+        print("\n" + format_line(f"{len(mismatches)} capture(s) replayed differently", symbol="!"))
+        for path, problem in mismatches:
+            print(f"  {path}: {problem}")
+        sys.exit(1)
+    print(f"\nAll {len(captures)} captures match their live extraction")
+
+    key = f"replay/{args.parser}"
+    if args.save_baseline:
+        save_baseline(key, summary)
+        return
+    regressions = compare_to_baseline(key, summary, args.tolerance)
+    if regressions:
+        print("\n" + format_line(f"Regressed: {', '.join(regressions)}", symbol="!"))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
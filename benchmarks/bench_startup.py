@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# benchmarks/bench_startup.py
+#
+# Startup benchmark for the planning path. Each iteration runs a fresh
+# interpreter and times (a) importing the runner, timetable and scheduler UI
+# modules and (b) a full `run_scheduled_bookings.py --plan_only` run. It also
+# fails outright if any of those imports pulls in Selenium, requests, dotenv
+# or Tk, which would mean a heavy import has crept back to module level.
+#
+# Usage:
+#   python benchmarks/bench_startup.py --iterations 20
+#   python benchmarks/bench_startup.py --save_baseline
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from booking_log import format_line
+
+BASELINE_FILE = os.path.join(REPO_ROOT, "benchmarks", "baseline.json")
+BASELINE_KEY = "startup"
+# Modules that must stay lazily imported
+HEAVY_MODULES = ["selenium", "requests", "dotenv", "tkinter", "squash_booking", "clublocker_http"]
+IMPORT_TARGETS = ["run_scheduled_bookings", "timetable", "scheduler_ui"]
+DEFAULT_TOLERANCE = 0.25
+
+IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+def time_import(module):
+    """Import module in a fresh interpreter; returns (seconds, heavy modules loaded)"""
+    code = IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)
+    result = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    return probe["seconds"], probe["heavy"]
+
+def time_plan_only():
+    """Wall time of a complete `--plan_only` run, interpreter startup included"""
+    command = [sys.executable, "run_scheduled_bookings.py", "--plan_only", "--no_trace"]
+    started = time.perf_counter()
+    subprocess.run(command, cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    return time.perf_counter() - started
+
+def summarize(samples):
+    return {
+        name: {
+            "p50": round(percentile(values, 50), 6),
+            "p95": round(percentile(values, 95), 6),
+            "n": len(values),
+        }
+        for name, values in samples.items()
+    }
+
+def compare_to_baseline(summary, tolerance):
+    """Print the comparison and return the list of regressed measurements"""
+    if not os.path.exists(BASELINE_FILE):
+        print("No baseline stored yet (run with --save_baseline)")
+        return []
+    with open(BASELINE_FILE, "r") as f:
+        baseline = json.load(f).get(BASELINE_KEY)
+    if not baseline:
+        print(f"No baseline stored for {BASELINE_KEY}")
+        return []
+    regressions = []
+    print("\n" + format_line("Compared to baseline (p95)"))
+    for name, stats in summary.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["p95"]
+        change = (stats["p95"] - before) / before if before else 0.0
+        flag = ""
+        if change > tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"  {name:<31} {before * 1000:8.1f} ms -> {stats['p95'] * 1000:8.1f} ms  ({change:+.0%}){flag}")
+    return regressions
+
+def save_baseline(summary):
+    baseline = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, "r") as f:
+            baseline = json.load(f)
+    baseline[BASELINE_KEY] = summary
+    with open(BASELINE_FILE, "w") as f:
+        json.dump(baseline, f, indent=4, sort_keys=True)
+    print(f"Baseline for {BASELINE_KEY} saved to {BASELINE_FILE}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark startup time of the planning path.")
+    parser.add_argument("--iterations", type=int, default=10, help="Runs per measurement")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed p95 slowdown before failing")
+    parser.add_argument("--save_baseline", action="store_true", help="Store these results as the new baseline")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    print("\n" + format_line("Startup benchmark"))
+    samples = {}
+    heavy_imports = {}
+    for _ in range(args.iterations):
+        for module in IMPORT_TARGETS:
+            seconds, heavy = time_import(module)
+            samples.setdefault(f"import {module}", []).append(seconds)
+            if heavy:
+                heavy_imports[module] = heavy
+        samples.setdefault("run --plan_only", []).append(time_plan_only())
+
+    summary = summarize(samples)
+    print(f"\n  {'measurement':<31} {'p50':>10} {'p95':>10}")
+    for name, stats in summary.items():
+        print(f"  {name:<31} {stats['p50'] * 1000:7.1f} ms {stats['p95'] * 1000:7.1f} ms")
+
+    if heavy_imports:
+        print("\n" + format_line("Heavy modules imported at startup", symbol="!"))
+        for module, heavy in heavy_imports.items():
+            print(f"  import {module} loaded: {', '.join(heavy)}")
+        sys.exit(1)
+
+    if args.save_baseline:
+        save_baseline(summary)
+        return
+    regressions = compare_to_baseline(summary, args.tolerance)
+    if regressions:
+        print("\n" + format_line(f"Regressed: {', '.join(regressions)}", symbol="!"))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
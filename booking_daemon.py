@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# booking_daemon.py
+#
+# Long-running alternative to the daily GitHub workflow run. The daemon keeps
+# one logged-in booking session warm between days and runs each day's booking
+# itself: a few minutes before the daily release it checks the session, loads
+# the grid for today + 5 days and books at the release instant, exactly like
+# run_scheduled_bookings.py --release_at. In between it
+#   - checks every health_interval_seconds that the session is still accepted
+#     and restarts it (new browser, log in) when it is not;
+#   - restarts the browser when Chrome's RSS grows past max_rss_mb;
+#   - re-reads booking_config.json and booking_plan.json when they change, so
+#     schedule edits take effect without restarting the daemon.
+# With --attach the browser belongs to chrome_supervisor.py: a restart is a
+# new WebDriver session on it, and Chrome's RSS is the supervisor's to watch.
+#
+# Usage:
+#   python booking_daemon.py --verbose
+#   python booking_daemon.py --run_at 12:00:00 --once
+
+import os
+import time
+import signal
+import argparse
+import logging
+import datetime
+from zoneinfo import ZoneInfo
+
+import release_timer
+import run_scheduled_bookings as runner
+from booking_trace import RunTracer
+from timetable import PLAN_FILE
+from booking_log import setup_logging
+
+log = logging.getLogger(__name__)
+
+DEFAULT_RUN_AT = "12:00:00"
+DEFAULT_WARM_UP_SECONDS = 180
+DEFAULT_HEALTH_INTERVAL = 600
+DEFAULT_MAX_RSS_MB = 1024
+DEFAULT_CONFIG_POLL = 30
+BOOKING_DAYS_AHEAD = 5
+# Config blocks the running session was built from; a change means a restart
+SESSION_KEYS = ("browser", "timeouts", "session_cache")
+
+class BookingDaemon:
+    """Keeps a booking session warm and books every active day at the release time"""
+    def __init__(self, args, clock=time.time, sleep=time.sleep):
+        self.args = args
+        self.clock = clock
+        self.sleep = sleep
+        self.config = None
+        self.final_schedule = {}
+        self.mtimes = None
+        self.booking = None
+        self.restart_reason = None
+        self.last_health = None
+        self.last_run_day = None
+        self.restarts = 0
+        # In memory only: feeds each day's run ledger with candidates and phase timings
+        self.tracer = RunTracer()
+        # (run day, target date, outcome) per daily run
+        self.history = []
+
+    def settings(self):
+        daemon_config = self.config.get("daemon", {})
+        return {
+            "run_at": self.args.run_at or daemon_config.get("run_at", DEFAULT_RUN_AT),
+            "warm_up_seconds": daemon_config.get("warm_up_seconds", DEFAULT_WARM_UP_SECONDS),
+            "health_interval_seconds": daemon_config.get("health_interval_seconds", DEFAULT_HEALTH_INTERVAL),
+            "max_rss_mb": daemon_config.get("max_rss_mb", DEFAULT_MAX_RSS_MB),
+            "config_poll_seconds": daemon_config.get("config_poll_seconds", DEFAULT_CONFIG_POLL),
+        }
+
+    def reload_config(self):
+        """Re-read the config and plan if either file changed; True if reloaded"""
+        mtimes = tuple(os.path.getmtime(p) if os.path.exists(p) else None for p in (runner.CONFIG_FILE, PLAN_FILE))
+        if mtimes == self.mtimes:
+            return False
+        self.mtimes = mtimes
+        try:
+            config = runner.load_config()
+        except (OSError, ValueError) as e:
+            # Most likely caught mid-save; keep what we have and look again next poll
+            log.warning("Could not read %s (%s); keeping the previous config", runner.CONFIG_FILE, e)
+            self.mtimes = None
+            return False
+        if self.config is not None:
+            log.info("Config changed; reloaded", extra={"banner": "-"})
+            changed = [key for key in SESSION_KEYS if config.get(key) != self.config.get(key)]
+            if changed:
+                self.restart_reason = f"{', '.join(changed)} settings changed"
+        self.config = config
+        self.final_schedule = runner.load_final_schedule(config)
+        return True
+
+    def release_timezone(self):
+        return self.config.get("release", {}).get("timezone", release_timer.DEFAULT_RELEASE_TIMEZONE)
+
+    def next_run(self, now):
+        """(run day, release epoch) of the next daily run that hasn't happened yet"""
+        settings = self.settings()
+        window = self.config.get("release", {}).get("window_seconds", 30)
+        today = datetime.datetime.fromtimestamp(now, ZoneInfo(self.release_timezone())).date()
+        for run_day in (today, today + datetime.timedelta(days=1)):
+            if run_day == self.last_run_day:
+                continue
+            release_epoch = release_timer.release_instant(settings["run_at"], run_day, self.release_timezone())
+            # Started a moment after release: still worth a try inside the release window
+            if now <= release_epoch + window:
+                return run_day, release_epoch
+        run_day = today + datetime.timedelta(days=2)
+        return run_day, release_timer.release_instant(settings["run_at"], run_day, self.release_timezone())
+
+    def start_session(self):
+        """Start and log in a new booking session; leaves self.booking None on failure"""
+        self.restart_reason = None
+        try:
+            self.booking = runner.make_booking(self.args, self.config, self.tracer)
+            self.booking.start_browser()
+            self.booking.login()
+        except Exception as e:
+            log.error("Could not start a booking session: %s", e)
+            self.close_session()
+
+    def close_session(self):
+        if self.booking is not None:
+            try:
+                self.booking.close()
+            except Exception as e:
+                log.warning("Note: Error closing the session: %s", e)
+            self.booking = None
+
+    def restart(self, reason):
+        log.info("Restarting session: %s", reason, extra={"banner": "-"})
+        self.restarts += 1
+        self.close_session()
+        self.start_session()
+
+    def check_health(self):
+        """Restart the session if it is gone, logged out, too big, or its settings changed"""
+        self.last_health = self.clock()
+        if self.booking is None:
+            self.restart(self.restart_reason or "no session")
+            return
+        reason = self.restart_reason
+        if reason is None and not self.booking.session_alive():
+            reason = "session check failed"
+        if reason is None:
+            rss = self.booking.current_rss()
+            max_rss = self.settings()["max_rss_mb"] * 2**20
+            if rss and rss > max_rss:
+                reason = f"browser RSS {rss / 2**20:.0f} MB is over {max_rss / 2**20:.0f} MB"
+            else:
+                memory = f", browser RSS {rss / 2**20:.0f} MB" if rss else ""
+                log.debug("[HEALTH] Session ok%s", memory, extra={"rss": rss})
+        if reason is not None:
+            self.restart(reason)
+
+    def run_day(self, run_day, release_epoch):
+        """Book the day's target date at the release instant; returns the outcome"""
+        target = run_day + datetime.timedelta(days=BOOKING_DAYS_AHEAD)
+        day_name = target.strftime("%A")
+        booking_date = target.strftime("%Y-%m-%d")
+        log.info("Daily run %s: booking %s %s", run_day, day_name, booking_date, extra={"banner": "-"})
+        day_schedule = self.final_schedule.get(day_name, [])
+        if not self.config.get("active_days", {}).get(day_name) or not day_schedule:
+            log.info("No booking schedule for %s; skipping", day_name)
+            return "no_schedule"
+
+        self.check_health()
+        if self.booking is None:
+            log.info("No session; skipping this run", extra={"banner": "!"})
+            return "error"
+        # Bookings made since yesterday (by hand or by a previous run) must be seen
+        self.booking.clear_reservations()
+        release = (release_epoch, self.config.get("release", {}).get("window_seconds", 30))
+        ledger = runner.make_ledger(self.args, self.config)
+        results = {}
+        try:
+            results = runner.book_targets(
+                self.booking, self.args, self.config, [(booking_date, day_schedule)], release, ledger
+            )
+        except Exception as e:
+            log.exception("An error occurred: %s", e, extra={"gap": True})
+            self.restart_reason = "booking run failed"
+        finally:
+            self.booking.print_wait_summary()
+            # Timings are per run; the session lives on
+            self.booking.wait_timings = []
+        outcome, entry = results.get(booking_date, ("error", None))
+        if ledger is not None:
+            try:
+                ledger.write(outcome, {booking_date: (outcome, entry)}, self.tracer,
+                             run_id=f"{self.tracer.run_id}-{run_day}", backend=self.args.backend,
+                             test_mode=self.args.test, base_url=self.args.base_url)
+            except Exception as e:
+                log.warning("Note: Could not write to the run ledger: %s", e)
+        self.tracer.clear()
+        detail = f": {runner.describe_booking(entry)}" if entry else ""
+        log.info("%s %s%s", booking_date, outcome, detail, extra={"banner": "*" if outcome == "booked" else "-"})
+        return outcome
+
+    def run(self, once=False):
+        """Run daily bookings until interrupted (or after one run with once=True)"""
+        self.reload_config()
+        self.start_session()
+        self.last_health = self.clock()
+        while True:
+            self.reload_config()
+            settings = self.settings()
+            now = self.clock()
+            run_day, release_epoch = self.next_run(now)
+            warm_at = release_epoch - settings["warm_up_seconds"]
+            if now >= warm_at:
+                outcome = self.run_day(run_day, release_epoch)
+                self.history.append((run_day, run_day + datetime.timedelta(days=BOOKING_DAYS_AHEAD), outcome))
+                self.last_run_day = run_day
+                if once:
+                    return self.history
+                continue
+            next_health = self.last_health + settings["health_interval_seconds"]
+            if now >= next_health:
+                self.check_health()
+                continue
+            wake = min(warm_at, next_health, now + settings["config_poll_seconds"])
+            log.debug("[DAEMON] Next run %s in %.0fs; sleeping %.0fs", run_day, warm_at - now, wake - now)
+            self.sleep(max(0.0, wake - now))
+
+    def print_summary(self):
+        log.info("Daemon summary", extra={"banner": "-"})
+        log.info("Session restarts: %s", self.restarts)
+        for run_day, target, outcome in self.history:
+            log.info("  %s -> %s %s", run_day, target, outcome)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Keep a booking session warm and book every active day at release time.")
+    parser.add_argument("--run_at", type=str, default=None,
+                        help=f"Daily release time HH:MM[:SS] in the release timezone (default: config or {DEFAULT_RUN_AT})")
+    parser.add_argument("--once", action="store_true", help="Exit after the next daily run")
+    parser.add_argument("--backend", type=str, choices=sorted(runner.BACKENDS), default="browser",
+                        help="Book through headless Chrome (browser, the live site) or the stand-in's API "
+                             "(http: clublocker_standin.py only, needs a local --base_url)")
+    parser.add_argument("--base_url", type=str, default=runner.CLUBLOCKER_BASE_URL,
+                        help="Site to book against (e.g. a local clublocker_standin.py)")
+    parser.add_argument("--browser_profile", type=str, choices=runner.BROWSER_PROFILES, default=None,
+                        help="Browser profile (default: config or default)")
+    parser.add_argument("--attach", type=str, default=None, metavar="HOST:PORT",
+                        help="Use the Chrome already listening for DevTools here (see chrome_supervisor.py) (default: config)")
+    parser.add_argument("--remote_driver", type=str, default=None, metavar="URL",
+                        help="Use a running chromedriver or Selenium server instead of spawning one (default: config)")
+    parser.add_argument("--budget", type=float, default=None, metavar="SECONDS",
+                        help="Time budget for retries once booking starts (default: config or 90)")
+    parser.add_argument("--test", action="store_true", help="Run in test (dry-run) mode.")
+    parser.add_argument("--verbose", action="store_true", help="Output detailed debug information.")
+    parser.add_argument("--show_browser", action="store_true", help="Show browser window")
+    parser.add_argument("--no_session_cache", action="store_true", help="Always log in with the form")
+    parser.add_argument("--log_file", type=str, default=None, help="Also write every log record to this file as JSON lines")
+    args = parser.parse_args()
+    runner.check_backend(parser, args)
+    return args
+
+def stop_on_sigterm(signum, frame):
+    # Let the finally block close Chrome when a service manager stops us
+    raise KeyboardInterrupt()
+
+def main():
+    args = parse_args()
+    setup_logging(args.verbose, args.log_file)
+    signal.signal(signal.SIGTERM, stop_on_sigterm)
+    daemon = BookingDaemon(args)
+    log.info("Booking Daemon Test Mode" if args.test else "Booking Daemon", extra={"banner": "-"})
+    try:
+        daemon.run(once=args.once)
+    except KeyboardInterrupt:
+        log.info("Stopped", extra={"gap": True})
+    finally:
+        daemon.close_session()
+        daemon.print_summary()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# booking_log.py
+#
+# Logging setup for the booking runs. Modules log through
+# logging.getLogger(__name__); the records go onto an in-memory queue and a
+# QueueListener thread does the writing. A slow terminal or CI log pipe
+# therefore never stalls a slot check or a click. Console output keeps the
+# runner's plain look. --verbose lowers the console level from INFO to DEBUG.
+# With a log file, every record is also written there as one JSON object
+# per line: time, level, logger, thread, message, plus the record's fields
+# (court, time_slot, phase, seconds, ...) for post-run analysis.
+#
+# Messages are %-style with their fields passed with extra=, e.g.
+#   log.debug("Slot %s on Court %s is open", time_slot, court, extra={"court": court, "time_slot": time_slot})
+# Layout is the console's business, not the message's: extra={"banner": "!"}
+# draws the message as a format_line banner, {"heading": True} as a
+# "=== Step ===" heading and {"gap": True} puts a blank line before it. The
+# JSON file gets the plain message.
+# Print-based reports (run_ledger.py, the benchmarks) import format_line
+# from here for their own banners.
+
+import sys
+import json
+import queue
+import atexit
+import logging
+import datetime
+
+# Attributes every LogRecord has; anything else on a record came from extra=
+STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+# extra= keys that only say how the console draws a record
+LAYOUT_ATTRIBUTES = {"banner", "heading", "gap"}
+
+_queue = None
+_listener = None
+
+def format_line(text="", width=80, symbol="-"):
+    """Format a line with centered text and padding"""
+    if text:
+        return f" {text} ".center(width, symbol)
+    return symbol * width
+
+class ConsoleFormatter(logging.Formatter):
+    """The runner's plain console look: the message, drawn as its layout fields ask"""
+    def format(self, record):
+        text = super().format(record)
+        banner = getattr(record, "banner", None)
+        if banner:
+            return "\n" + format_line(text, symbol=banner)
+        if getattr(record, "heading", False):
+            return f"\n=== {text} ==="
+        if getattr(record, "gap", False):
+            return "\n" + text
+        return text
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record, with the record's extra fields at the top level"""
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in STANDARD_ATTRIBUTES and key not in LAYOUT_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def setup_logging(verbose=False, log_file=None):
+    """
+    Send all logging through a queue to the console (and log_file as JSON
+    lines). Safe to call again; the last call's settings win.
+    """
+    global _queue, _listener
+    # logging.handlers costs ~11ms to import; only runs that log pay for it
+    from logging.handlers import QueueHandler, QueueListener
+    stop_logging()
+    console = logging.StreamHandler(sys.stdout)
+    console.setLevel(logging.DEBUG if verbose else logging.INFO)
+    console.setFormatter(ConsoleFormatter("%(message)s"))
+    handlers = [console]
+    if log_file:
+        json_handler = logging.FileHandler(log_file, encoding="utf-8")
+        json_handler.setLevel(logging.DEBUG)
+        json_handler.setFormatter(JSONFormatter())
+        handlers.append(json_handler)
+
+    _queue = queue.Queue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(_queue))
+    root.setLevel(logging.DEBUG if verbose or log_file else logging.INFO)
+    # Selenium and urllib3 log every command at DEBUG
+    for noisy in ("selenium", "urllib3"):
+        logging.getLogger(noisy).setLevel(logging.WARNING)
+    _listener = QueueListener(_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def flush_logs():
+    """Wait until every queued record has been written"""
+    if _queue is not None and _listener is not None:
+        _queue.join()
+
+def stop_logging():
+    """Write out whatever is queued and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+atexit.register(stop_logging)
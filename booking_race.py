@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# booking_race.py
+#
+# Opt-in racing mode: several independent logged-in SquashBooking sessions
+# attempt different top-ranked (court, time) candidates at the same time.
+# Each session books exactly like a single-session run (the runner's
+# book_from_schedule: optimizer ranking, retry engine, ledger), through a
+# guard that splits the ranked candidates between sessions. A shared
+# BookingClaim makes sure only one session ever clicks Save, so the first
+# confirmed booking cancels everyone else. A Save that fails after it was
+# clicked may still have booked the court: the session keeps the claim,
+# everyone else stops, and My Reservations decides whether the date is booked.
+
+import logging
+import threading
+
+from retry_engine import BudgetExhausted, Cancelled, SaveUncertain, SAVE_UNCERTAIN, SLOT_TAKEN
+
+log = logging.getLogger(__name__)
+
+RACE_STRATEGIES = ["round_robin", "block", "queue"]
+DEFAULT_RACE_STRATEGY = "round_robin"
+# How long sessions wait for each other to finish warming up
+WARMUP_BARRIER_TIMEOUT = 120
+
+def split_candidates(day_schedule, sessions, strategy=DEFAULT_RACE_STRATEGY):
+    """
+    Assign ranked candidates to sessions.
+
+    round_robin: session i gets candidates i, i+N, i+2N, ... so the top N
+                 candidates are all attempted first, one per session.
+    block:       the ranked list is cut into N contiguous chunks.
+    queue:       returns None; sessions pull the next untried candidate from
+                 a shared queue instead of a fixed list.
+    """
+    if strategy == "round_robin":
+        return [day_schedule[i::sessions] for i in range(sessions)]
+    if strategy == "block":
+        size = -(-len(day_schedule) // sessions)
+        return [day_schedule[i * size:(i + 1) * size] for i in range(sessions)]
+    if strategy == "queue":
+        return None
+    raise ValueError(f"Unknown race strategy: {strategy} (expected one of {', '.join(RACE_STRATEGIES)})")
+
+class BookingClaim:
+    """Lets exactly one racing session click Save at a time, and none after a win"""
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.holder = None
+        self.winner = None
+        self.won = threading.Event()
+        # Set by a win, or by a Save that may have won; every other session stops
+        self.ended = threading.Event()
+        # (session id, entry) of a Save whose outcome isn't known yet
+        self.uncertain = None
+
+    def acquire(self, session_id):
+        """Block until this session may click Save; False if the race has ended"""
+        with self.condition:
+            # The holder may click Save again for the next slot of a block
+            while self.holder not in (None, session_id) and not self.ended.is_set():
+                self.condition.wait()
+            if self.ended.is_set():
+                return False
+            self.holder = session_id
+            return True
+
+    def release(self, session_id):
+        """Give up the claim after a failed Save so another session can try"""
+        with self.condition:
+            if self.holder == session_id:
+                self.holder = None
+                self.condition.notify_all()
+
+    def hold(self, session_id, entry):
+        """Keep the claim after a Save that may have booked entry, and stop everyone else"""
+        with self.condition:
+            self.uncertain = (session_id, entry)
+            self.ended.set()
+            self.condition.notify_all()
+
+    def release_hold(self, session_id):
+        """The held Save turned out not to have booked; let Saves happen again"""
+        with self.condition:
+            if self.uncertain is not None and self.uncertain[0] == session_id and not self.won.is_set():
+                self.uncertain = None
+                self.holder = None
+                self.ended.clear()
+                self.condition.notify_all()
+
+    def confirm(self, session_id, entry):
+        """Record the winning booking and cancel everyone else"""
+        with self.condition:
+            self.winner = (session_id, entry)
+            self.holder = None
+            self.uncertain = None
+            self.won.set()
+            self.ended.set()
+            self.condition.notify_all()
+
+class BookingRace:
+    """
+    Runs a pool of booking sessions against one booking date.
+    book_one(session_id, booking, guard, select) books the date with one warm
+    session, like the runner's book_from_schedule: it wraps attempt_candidate
+    with guard, tries only select(ranked candidates), and returns the booked
+    entry or None.
+    """
+    def __init__(self, session_factory, day_schedule, booking_date, org_id, book_one,
+                 sessions=2, strategy=DEFAULT_RACE_STRATEGY, before_attempt=None):
+        self.session_factory = session_factory
+        self.day_schedule = list(day_schedule)
+        self.booking_date = booking_date
+        self.org_id = org_id
+        self.book_one = book_one
+        self.session_count = max(1, min(sessions, len(self.day_schedule)))
+        # Fails early on an unknown strategy
+        split_candidates(self.day_schedule, self.session_count, strategy)
+        self.strategy = strategy
+        # queue strategy: (court, time slot) -> the session that took it
+        self.taken = {}
+        self.queue_lock = threading.Lock()
+        self.before_attempt = before_attempt
+        self.claim = BookingClaim()
+        self.existing_booking = threading.Event()
+        self.barrier = threading.Barrier(self.session_count)
+        self.sessions = []
+        self.results = {}
+
+    def select(self, session_id):
+        """This session's share of its ranked candidates (all of them for the queue strategy)"""
+        def share(candidates):
+            split = split_candidates(candidates, self.session_count, self.strategy)
+            return candidates if split is None else split[session_id]
+        return share
+
+    def take(self, session_id, entry):
+        """queue strategy: True if no other session has tried this candidate"""
+        if self.strategy != "queue":
+            return True
+        key = (int(entry["court"]), entry["time_slot"])
+        with self.queue_lock:
+            return self.taken.setdefault(key, session_id) == session_id
+
+    def stopped(self):
+        return self.claim.ended.is_set() or self.existing_booking.is_set()
+
+    def warm_up(self, session_id, booking):
+        """Start the browser, log in and load the grid; False if the date already has a booking"""
+        booking.start_browser()
+        booking.login()
+        if not booking.navigate_to_date(self.booking_date, self.org_id):
+            self.existing_booking.set()
+            return False
+        return True
+
+    def guard(self, session_id):
+        """
+        Wrap attempt(booking, candidates, entry, before_save=None) for one
+        session: stop once the race has ended, skip candidates another session
+        took off the queue, and only click Save under the claim
+        """
+        prefix = f"[session {session_id + 1}]"
+
+        def wrap(attempt):
+            def guarded(booking, candidates, entry):
+                held = self.claim.uncertain
+                if held is not None and held[0] == session_id:
+                    # The engine only tries again once My Reservations showed no booking
+                    self.claim.release_hold(session_id)
+                if self.stopped():
+                    raise Cancelled()
+                if not self.take(session_id, entry):
+                    booking.last_failure = SLOT_TAKEN
+                    return False
+                log.info("%s Trying Court %s at %s", prefix, entry["court"], entry["time_slot"],
+                         extra={"session": session_id + 1, "court": entry["court"], "time_slot": entry["time_slot"]})
+                booked = False
+                try:
+                    booked = attempt(booking, candidates, entry, before_save=lambda: self.claim.acquire(session_id))
+                finally:
+                    if booked:
+                        self.claim.confirm(session_id, entry)
+                    elif booking.last_failure == SAVE_UNCERTAIN:
+                        # Save was clicked under the claim; nobody else may book until we know
+                        self.claim.hold(session_id, entry)
+                    else:
+                        self.claim.release(session_id)
+                return booked
+            return guarded
+        return wrap
+
+    def run_session(self, session_id):
+        booking = self.sessions[session_id]
+        prefix = f"[session {session_id + 1}]"
+        try:
+            warmed = self.warm_up(session_id, booking)
+        except Exception as e:
+            log.warning("%s Warm-up failed: %s", prefix, e)
+            self.results[session_id] = "warm-up failed"
+            self.barrier.abort()
+            return
+        try:
+            # Line everyone up so the attempts really start together
+            self.barrier.wait(timeout=WARMUP_BARRIER_TIMEOUT)
+        except threading.BrokenBarrierError:
+            pass
+        if not warmed:
+            self.results[session_id] = "existing booking"
+            return
+
+        try:
+            if self.before_attempt is not None and not self.stopped():
+                self.before_attempt(booking)
+            if self.stopped():
+                self.results[session_id] = "cancelled"
+                return
+            entry = self.book_one(session_id, booking, self.guard(session_id), self.select(session_id))
+        except Cancelled:
+            entry = None
+        except SaveUncertain as e:
+            # The claim stays held: the date may be booked
+            log.error("%s %s", prefix, e, extra={"session": session_id + 1})
+            held = self.claim.uncertain
+            court, timeslot = (held[1]["court"], held[1]["time_slot"]) if held else ("?", "?")
+            self.results[session_id] = f"save uncertain on Court {court} at {timeslot}"
+            return
+        except BudgetExhausted:
+            entry = None
+        except Exception as e:
+            self.claim.release(session_id)
+            log.error("%s Error: %s", prefix, e, extra={"session": session_id + 1})
+            self.results[session_id] = f"error: {e}"
+            return
+        if entry:
+            if not self.claim.won.is_set():
+                # Found in My Reservations after an uncertain Save
+                self.claim.confirm(session_id, entry)
+            self.results[session_id] = f"booked Court {entry['court']} at {entry['time_slot']}"
+            return
+        # My Reservations showed no booking for a Save this session still held
+        self.claim.release_hold(session_id)
+        self.claim.release(session_id)
+        self.results[session_id] = "cancelled" if self.stopped() else "no open slot"
+
+    def run(self):
+        """Run all sessions to completion; returns the winning schedule entry or None"""
+        self.sessions = [self.session_factory() for _ in range(self.session_count)]
+        threads = [
+            threading.Thread(target=self.run_session, args=(i,), name=f"race-session-{i + 1}")
+            for i in range(self.session_count)
+        ]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            for booking in self.sessions:
+                try:
+                    booking.close()
+                except Exception:
+                    pass
+        return self.claim.winner[1] if self.claim.winner else None
+
+    def print_summary(self):
+        for session_id in range(self.session_count):
+            log.info("  Session %s: %s", session_id + 1, self.results.get(session_id, 'not started'))
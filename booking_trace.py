@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# booking_trace.py
+#
+# Per-run tracing for booking runs. trace_booking() wraps the phase methods
+# of a booking backend (SquashBooking or ClubLockerHTTPBooking) so every call
+# becomes a timed span carrying the number of WebDriver commands (or HTTP
+# requests) it issued, and every ranked candidate gets an outcome. At the end
+# of a run the tracer writes <run_id>.jsonl and <run_id>.prom into the trace
+# directory so latency can be tracked across days.
+
+import os
+import json
+import time
+import uuid
+import datetime
+import threading
+import functools
+from contextlib import contextmanager
+
+DEFAULT_TRACE_DIR = "traces"
+TRACED_METHODS = [
+    "start_browser",
+    "login",
+    "navigate_to_date",
+    "check_existing_bookings",
+    "snapshot_grid",
+    "refresh_grid",
+    "check_slot_availability",
+    "attempt_booking",
+    "confirm_prepared",
+]
+
+class RunTracer:
+    """Collects spans, command counts and candidate outcomes for one run"""
+    def __init__(self, output_dir=DEFAULT_TRACE_DIR, run_id=None):
+        started = datetime.datetime.now()
+        self.output_dir = output_dir
+        self.run_id = run_id or f"{started.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.started_at = time.time()
+        self.started_perf = time.perf_counter()
+        self.lock = threading.Lock()
+        self.spans = []
+        self.candidates = []
+        self.command_counts = {}
+        self.command_total = 0
+        self.outcome = None
+        self.attributes = {}
+        self.local = threading.local()
+
+    def count_command(self, name):
+        with self.lock:
+            self.command_counts[name] = self.command_counts.get(name, 0) + 1
+            self.command_total += 1
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time a block; nested spans record their parent"""
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        parent = stack[-1] if stack else None
+        stack.append(name)
+        record = {
+            "type": "span",
+            "name": name,
+            "parent": parent,
+            "thread": threading.current_thread().name,
+            "start": time.time(),
+            "attributes": attributes,
+        }
+        commands_before = self.command_total
+        started = time.perf_counter()
+        try:
+            yield record
+            record.setdefault("status", "ok")
+        except Exception as e:
+            record["status"] = "error"
+            record["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            stack.pop()
+            record["duration"] = time.perf_counter() - started
+            # Approximate under racing, where sessions share the counter
+            record["commands"] = self.command_total - commands_before
+            with self.lock:
+                self.spans.append(record)
+
+    def record_candidate(self, court, time_slot, outcome, date=None):
+        """Record the availability check of one ranked candidate"""
+        record = {
+            "type": "candidate",
+            "date": date,
+            "court": court,
+            "time_slot": time_slot,
+            "outcome": outcome,
+            "thread": threading.current_thread().name,
+            "at": time.time(),
+        }
+        with self.lock:
+            self.candidates.append(record)
+        self.local.last_candidate = record
+
+    def update_last_candidate(self, outcome):
+        """Set the outcome of this thread's most recently checked candidate"""
+        record = getattr(self.local, "last_candidate", None)
+        if record is not None:
+            record["outcome"] = outcome
+
+    def clear(self):
+        """Drop the spans and candidates recorded so far (a long-lived session's last run)"""
+        with self.lock:
+            self.spans = []
+            self.candidates = []
+
+    def finish(self, outcome, **attributes):
+        """Set the run's final outcome (e.g. "booked", "no_slot", "existing_booking", "error")"""
+        self.outcome = outcome
+        self.attributes.update(attributes)
+
+    def phase_totals(self):
+        totals = {}
+        for span in self.spans:
+            seconds, calls = totals.get(span["name"], (0.0, 0))
+            totals[span["name"]] = (seconds + span["duration"], calls + 1)
+        return totals
+
+    def write(self):
+        """Write the JSON lines and Prometheus text files; returns their paths"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        duration = time.perf_counter() - self.started_perf
+        base = os.path.join(self.output_dir, self.run_id)
+
+        with open(f"{base}.jsonl", "w") as f:
+            for record in sorted(self.spans, key=lambda r: r["start"]) + self.candidates:
+                f.write(json.dumps(dict(record, run_id=self.run_id), default=str) + "\n")
+            f.write(json.dumps({
+                "type": "run",
+                "run_id": self.run_id,
+                "start": self.started_at,
+                "duration": duration,
+                "outcome": self.outcome,
+                "commands": self.command_total,
+                "command_counts": self.command_counts,
+                "attributes": self.attributes,
+            }, default=str) + "\n")
+
+        label = f'run_id="{self.run_id}"'
+        lines = [
+            "# HELP squash_booking_run_timestamp_seconds Start time of the booking run",
+            "# TYPE squash_booking_run_timestamp_seconds gauge",
+            f"squash_booking_run_timestamp_seconds{{{label}}} {self.started_at:.3f}",
+            "# HELP squash_booking_run_duration_seconds Wall-clock duration of the booking run",
+            "# TYPE squash_booking_run_duration_seconds gauge",
+            f"squash_booking_run_duration_seconds{{{label}}} {duration:.6f}",
+            "# HELP squash_booking_run_success Whether the run confirmed a booking",
+            "# TYPE squash_booking_run_success gauge",
+            f"squash_booking_run_success{{{label},outcome=\"{self.outcome}\"}} {1 if self.outcome == 'booked' else 0}",
+            "# HELP squash_booking_phase_seconds Total wall-clock time spent in each phase",
+            "# TYPE squash_booking_phase_seconds gauge",
+        ]
+        totals = self.phase_totals()
+        for phase, (seconds, _) in sorted(totals.items()):
+            lines.append(f'squash_booking_phase_seconds{{{label},phase="{phase}"}} {seconds:.6f}')
+        lines += [
+            "# HELP squash_booking_phase_calls_total Number of calls to each phase",
+            "# TYPE squash_booking_phase_calls_total counter",
+        ]
+        for phase, (_, calls) in sorted(totals.items()):
+            lines.append(f'squash_booking_phase_calls_total{{{label},phase="{phase}"}} {calls}')
+        lines += [
+            "# HELP squash_booking_commands_total WebDriver commands or HTTP requests issued",
+            "# TYPE squash_booking_commands_total counter",
+        ]
+        for command, count in sorted(self.command_counts.items()):
+            lines.append(f'squash_booking_commands_total{{{label},command="{command}"}} {count}')
+        outcomes = {}
+        for candidate in self.candidates:
+            outcomes[candidate["outcome"]] = outcomes.get(candidate["outcome"], 0) + 1
+        lines += [
+            "# HELP squash_booking_candidates_total Ranked candidates by observed outcome",
+            "# TYPE squash_booking_candidates_total counter",
+        ]
+        for outcome, count in sorted(outcomes.items()):
+            lines.append(f'squash_booking_candidates_total{{{label},outcome="{outcome}"}} {count}')
+        with open(f"{base}.prom", "w") as f:
+            f.write("\n".join(lines) + "\n")
+        return f"{base}.jsonl", f"{base}.prom"
+
+def _instrument_commands(booking, tracer):
+    """Count the backend's round trips: WebDriver commands or HTTP requests"""
+    driver = getattr(booking, "driver", None)
+    if driver is not None and not getattr(driver, "_traced", False):
+        execute = driver.execute
+
+        @functools.wraps(execute)
+        def traced_execute(driver_command, params=None):
+            tracer.count_command(driver_command)
+            return execute(driver_command, params)
+
+        driver.execute = traced_execute
+        driver._traced = True
+    session = getattr(booking, "session", None)
+    if session is not None and not getattr(session, "_traced", False):
+        request = session.request
+
+        @functools.wraps(request)
+        def traced_request(method, url, *args, **kwargs):
+            tracer.count_command(f"http_{method.upper()}")
+            return request(method, url, *args, **kwargs)
+
+        session.request = traced_request
+        session._traced = True
+
+def trace_booking(booking, tracer):
+    """Wrap a booking backend's phase methods in tracer spans; returns the booking"""
+    for name in TRACED_METHODS:
+        method = getattr(booking, name, None)
+        if method is None:
+            continue
+        setattr(booking, name, _traced_method(booking, tracer, name, method))
+    return booking
+
+def _traced_method(booking, tracer, name, method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        attributes = {}
+        if name == "check_slot_availability" and len(args) >= 2:
+            attributes = {"court": args[0], "time_slot": args[1]}
+        elif name in ("navigate_to_date", "check_existing_bookings") and args:
+            attributes = {"date": args[0]}
+        with tracer.span(name, **attributes) as span:
+            result = method(*args, **kwargs)
+            span["result"] = bool(result)
+        if name == "start_browser":
+            _instrument_commands(booking, tracer)
+        elif name == "check_slot_availability" and len(args) >= 2:
+            tracer.record_candidate(args[0], args[1], "open" if result else "unavailable", booking.booking_date)
+        elif name == "attempt_booking":
+            tracer.update_last_candidate("booked" if result else "attempt_failed")
+        elif name == "confirm_prepared" and result:
+            # The one-call confirm checks and books in the page
+            tracer.record_candidate(result["court"], result["time_slot"], "booked", booking.booking_date)
+        return result
+    return wrapper
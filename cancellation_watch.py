@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# cancellation_watch.py
+#
+# Watches the next few days for cancellations and books them. One logged-in
+# session polls the grid of every watched date; whenever a slot from the
+# ranked schedule is open it is booked. The last snapshot of each date is
+# kept in memory and diffed against the new one, but only to log what changed
+# and to back off: the poll interval shrinks as play time approaches and
+# grows while nothing on the grids changes. Play times are read in the club's
+# timezone (release.timezone), whatever the machine's local zone is.
+#
+# Usage:
+#   python cancellation_watch.py --verbose
+#   python cancellation_watch.py --days 2 --until 21:00
+
+import time
+import logging
+import argparse
+import datetime
+from zoneinfo import ZoneInfo
+
+import release_timer
+import run_scheduled_bookings as runner
+from timetable import parse_time
+from preferences import SlotOptimizer
+from retry_engine import SaveUncertain
+from booking_log import setup_logging
+
+log = logging.getLogger(__name__)
+
+DEFAULT_WATCH_DAYS = 5
+DEFAULT_MIN_INTERVAL = 15.0
+DEFAULT_MAX_INTERVAL = 300.0
+DEFAULT_BACKOFF = 1.5
+# Poll at the minimum interval inside NEAR_PLAY_SECONDS of the next ranked
+# slot, at the maximum beyond FAR_PLAY_SECONDS, and scale linearly between
+NEAR_PLAY_SECONDS = 2 * 3600
+FAR_PLAY_SECONDS = 48 * 3600
+# Backing off never stretches the interval past this multiple of the base
+MAX_BACKOFF_FACTOR = 4
+# Slots starting sooner than this can't be booked in time
+MIN_LEAD_MINUTES = 15
+# Give up after this many consecutive failed polls
+MAX_CONSECUTIVE_ERRORS = 5
+
+def candidate_start(booking_date, entry, timezone=release_timer.DEFAULT_RELEASE_TIMEZONE):
+    """Aware datetime, in the club's timezone, at which a ranked candidate's slot starts"""
+    day = datetime.datetime.strptime(booking_date, "%Y-%m-%d")
+    start = day + datetime.timedelta(minutes=parse_time(entry["time_slot"].split(" - ")[0]))
+    return start.replace(tzinfo=ZoneInfo(timezone))
+
+class AdaptivePoller:
+    """Poll interval that shrinks as play time nears and backs off while nothing changes"""
+    def __init__(self, min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL, backoff=DEFAULT_BACKOFF):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.idle_polls = 0
+
+    def base_interval(self, seconds_to_play):
+        if seconds_to_play <= NEAR_PLAY_SECONDS:
+            return self.min_interval
+        if seconds_to_play >= FAR_PLAY_SECONDS:
+            return self.max_interval
+        fraction = (seconds_to_play - NEAR_PLAY_SECONDS) / (FAR_PLAY_SECONDS - NEAR_PLAY_SECONDS)
+        return self.min_interval + fraction * (self.max_interval - self.min_interval)
+
+    def next_interval(self, seconds_to_play, changed):
+        """Seconds to sleep before the next poll"""
+        self.idle_polls = 0 if changed else self.idle_polls + 1
+        base = self.base_interval(seconds_to_play)
+        backed_off = base * min(self.backoff ** self.idle_polls, MAX_BACKOFF_FACTOR)
+        return min(backed_off, self.max_interval)
+
+class CancellationWatcher:
+    """Polls the grids of the watched dates and books ranked slots that open up"""
+    def __init__(self, session_factory, targets, poller, clock=time.time, sleep=time.sleep, optimizer=None,
+                 timezone=release_timer.DEFAULT_RELEASE_TIMEZONE):
+        self.session_factory = session_factory
+        self.targets = dict(targets)
+        self.poller = poller
+        self.optimizer = optimizer or SlotOptimizer()
+        self.clock = clock
+        self.sleep = sleep
+        self.timezone = timezone
+        self.booking = None
+        self.snapshots = {}
+        self.results = {}
+        self.polls = 0
+        self.changes = 0
+
+    def start_session(self):
+        if self.booking is not None:
+            self.booking.close()
+        self.booking = self.session_factory()
+        self.booking.start_browser()
+        self.booking.login()
+
+    def upcoming(self, booking_date, now):
+        """Ranked candidates for a date that start far enough in the future to book"""
+        local_now = datetime.datetime.fromtimestamp(now, ZoneInfo(self.timezone))
+        earliest = local_now + datetime.timedelta(minutes=MIN_LEAD_MINUTES)
+        return [
+            entry for entry in self.targets[booking_date]
+            if candidate_start(booking_date, entry, self.timezone) >= earliest
+        ]
+
+    def watched_dates(self, now):
+        return [d for d in self.targets if d not in self.results and self.upcoming(d, now)]
+
+    def seconds_to_play(self, dates, now):
+        starts = [
+            candidate_start(d, entry, self.timezone).timestamp() for d in dates for entry in self.upcoming(d, now)
+        ]
+        return min(starts) - now if starts else FAR_PLAY_SECONDS
+
+    def poll_date(self, booking_date, now):
+        """Refresh one date's grid; book the best ranked slot that is open. Returns True if the grid changed."""
+        self.booking.navigate_to_date(booking_date, runner.ORG_ID, check_existing=False)
+        # The HTTP backend snapshots while navigating; the browser reads the grid here
+        snapshot = self.booking.grid_snapshot or self.booking.snapshot_grid()
+        previous = self.snapshots.get(booking_date)
+        opened, closed = snapshot.diff(previous)
+        self.snapshots[booking_date] = snapshot
+        changed = previous is not None and bool(opened or closed)
+        if changed:
+            log.info("[%s] %s slot(s) opened, %s closed", booking_date, len(opened), len(closed))
+
+        # Book whatever ranked slot is open now, not only what opened since the
+        # last poll: a slot open from the start, or one a failed attempt left
+        # open, is just as bookable
+        upcoming = self.upcoming(booking_date, now)
+        _, best = next(snapshot.availability().open_candidates(upcoming), (None, None))
+        if best is not None:
+            log.info("Ranked slot open on %s: Court %s at %s", booking_date, best['court'], best['time_slot'],
+                     extra={"banner": "*"})
+            self.book(booking_date, upcoming)
+        return changed
+
+    def book(self, booking_date, upcoming):
+        """Try the ranked candidates that are open, best first"""
+        # Re-read existing bookings now: the member may have booked by hand since the watch began
+        self.booking.clear_reservations()
+        if not self.booking.navigate_to_date(booking_date, runner.ORG_ID):
+            self.results[booking_date] = ("existing_booking", None)
+            return
+        try:
+            entry = runner.book_from_schedule(self.booking, upcoming, optimizer=self.optimizer)
+        except SaveUncertain as e:
+            # Stop watching the date rather than risk a second court on it
+            log.error("Stopped watching %s: %s", booking_date, e, extra={"booking_date": booking_date})
+            self.results[booking_date] = ("save_uncertain", None)
+            return
+        if entry:
+            # Part of a block is still a booking on the date; it is not watched any further
+            self.results[booking_date] = (runner.booked_outcome(entry), entry)
+        # The page changed; take a fresh baseline on the next poll
+        self.snapshots.pop(booking_date, None)
+
+    def run(self, until=None):
+        """Watch until every date is resolved, nothing bookable is left, or until (epoch) passes"""
+        self.start_session()
+        for booking_date in list(self.targets):
+            if not self.booking.navigate_to_date(booking_date, runner.ORG_ID):
+                self.results[booking_date] = ("existing_booking", None)
+
+        errors = 0
+        while True:
+            now = self.clock()
+            dates = self.watched_dates(now)
+            if not dates:
+                log.info("Nothing left to watch", extra={"gap": True})
+                break
+            changed = False
+            try:
+                for booking_date in dates:
+                    changed = self.poll_date(booking_date, now) or changed
+                errors = 0
+            except Exception as e:
+                errors += 1
+                log.warning("Poll failed (%s); restarting the session (%s/%s)", e, errors, MAX_CONSECUTIVE_ERRORS)
+                if errors >= MAX_CONSECUTIVE_ERRORS:
+                    raise
+                self.snapshots.clear()
+                self.start_session()
+            self.polls += 1
+            self.changes += changed
+
+            interval = self.poller.next_interval(self.seconds_to_play(self.watched_dates(now), now), changed)
+            if until is not None and now + interval > until:
+                log.info("Watch window over", extra={"gap": True})
+                break
+            log.info("Next poll in %.0fs (watching %s date(s))", interval, len(dates))
+            self.sleep(interval)
+        return self.results
+
+    def close(self):
+        if self.booking is not None:
+            self.booking.close()
+
+def watch_targets(args, config, now):
+    """(date, ranked schedule) pairs to watch: --dates/--date_range, or today and the next --days days"""
+    final_schedule = runner.load_final_schedule(config)
+    if args.dates or args.date_range:
+        dates = runner.resolve_target_dates(args, now)
+    else:
+        days = args.days if args.days is not None else config.get("watch", {}).get("days", DEFAULT_WATCH_DAYS)
+        dates = [now.date() + datetime.timedelta(days=i) for i in range(days + 1)]
+    targets = []
+    for target in dates:
+        day_schedule = final_schedule.get(target.strftime("%A"), [])
+        if day_schedule:
+            targets.append((target.strftime("%Y-%m-%d"), day_schedule))
+    return targets
+
+def parse_until(until, now):
+    """Epoch of the next HH:MM (today, or tomorrow if already past)"""
+    minutes = parse_time(until)
+    end = now.replace(hour=minutes // 60, minute=minutes % 60, second=0, microsecond=0)
+    if end <= now:
+        end += datetime.timedelta(days=1)
+    return end.timestamp()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Watch for cancellations and book ranked slots as they open.")
+    parser.add_argument("--days", type=int, default=None,
+                        help=f"Watch today and this many following days (default: {DEFAULT_WATCH_DAYS})")
+    parser.add_argument("--dates", type=str, default=None, help="Comma-separated dates to watch (YYYY-MM-DD)")
+    parser.add_argument("--date_range", type=str, default=None, help="Inclusive range of dates to watch (YYYY-MM-DD:YYYY-MM-DD)")
+    parser.add_argument("--until", type=str, default=None, help="Stop watching at this time (HH:MM, club timezone)")
+    parser.add_argument("--min_interval", type=float, default=None, help="Fastest poll interval in seconds")
+    parser.add_argument("--max_interval", type=float, default=None, help="Slowest poll interval in seconds")
+    parser.add_argument("--backend", type=str, choices=sorted(runner.BACKENDS), default="browser",
+                        help="Watch through headless Chrome (browser, the live site) or the stand-in's API "
+                             "(http: clublocker_standin.py only, needs a local --base_url)")
+    parser.add_argument("--base_url", type=str, default=runner.CLUBLOCKER_BASE_URL,
+                        help="Site to watch (e.g. a local clublocker_standin.py)")
+    parser.add_argument("--test", action="store_true", help="Run in test (dry-run) mode.")
+    parser.add_argument("--verbose", action="store_true", help="Output detailed debug information.")
+    parser.add_argument("--show_browser", action="store_true", help="Show browser window while watching")
+    parser.add_argument("--no_session_cache", action="store_true", help="Always log in with the form")
+    args = parser.parse_args()
+    runner.check_backend(parser, args)
+    return args
+
+def main():
+    args = parse_args()
+    setup_logging(args.verbose)
+    config = runner.load_config()
+    watch_config = config.get("watch", {})
+    timezone = config.get("release", {}).get("timezone", release_timer.DEFAULT_RELEASE_TIMEZONE)
+    # The club's today, not the machine's
+    now = datetime.datetime.now(ZoneInfo(timezone))
+    targets = watch_targets(args, config, now)
+    if not targets:
+        log.info("No ranked schedule for any watched date; exiting")
+        return
+
+    poller = AdaptivePoller(
+        min_interval=args.min_interval or watch_config.get("min_interval_seconds", DEFAULT_MIN_INTERVAL),
+        max_interval=args.max_interval or watch_config.get("max_interval_seconds", DEFAULT_MAX_INTERVAL),
+        backoff=watch_config.get("backoff", DEFAULT_BACKOFF),
+    )
+    until = parse_until(args.until, now) if args.until else None
+
+    log.info("Cancellation Watch Test Mode" if args.test else "Cancellation Watch", extra={"banner": "-"})
+    log.info("Watching: %s", ', '.join(d for d, _ in targets))
+    log.info("Poll interval: %.0fs near play time, up to %.0fs", poller.min_interval, poller.max_interval)
+
+    watcher = CancellationWatcher(
+        lambda: runner.make_booking(args, config), targets, poller, optimizer=SlotOptimizer.from_config(config),
+        timezone=timezone
+    )
+    try:
+        watcher.run(until)
+    except KeyboardInterrupt:
+        log.info("Stopped", extra={"gap": True})
+    except Exception as e:
+        log.error("Watch stopped after repeated errors: %s", e, extra={"gap": True})
+    finally:
+        watcher.close()
+
+    log.info("Watch results", extra={"banner": "-"})
+    log.info("Polls: %s  Polls with grid changes: %s", watcher.polls, watcher.changes)
+    for booking_date, _ in targets:
+        outcome, entry = watcher.results.get(booking_date, ("not_booked", None))
+        detail = runner.describe_booking(entry) if entry else ""
+        log.info("  %s %-17s %s", booking_date, outcome, detail)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# chrome_supervisor.py
+#
+# Keeps one Chrome, and a chromedriver for it, running between booking runs.
+# Runs attach to them instead of spawning their own, so start_browser() only
+# opens a WebDriver session:
+#   python chrome_supervisor.py --browser_profile lean
+#   python run_scheduled_bookings.py --attach 127.0.0.1:9222 --remote_driver http://127.0.0.1:9515
+# Chrome is launched with the switches start_browser() would use, plus
+# --remote-debugging-port and a --user-data-dir of its own, so cookies survive
+# between runs. Every check_interval_seconds the supervisor checks Chrome's
+# DevTools endpoint (/json/version) and chromedriver's /status. It restarts a
+# process that has exited, stopped answering for MAX_MISSED_CHECKS checks in a
+# row, or (Chrome) grown past max_rss_mb. SIGTERM or Ctrl-C stops both.
+
+import os
+import time
+import shutil
+import signal
+import logging
+import argparse
+import subprocess
+
+import requests
+
+import run_scheduled_bookings as runner
+from squash_booking import chrome_arguments, browser_rss, BROWSER_PROFILES
+from booking_log import setup_logging
+
+log = logging.getLogger(__name__)
+
+DEFAULT_DEBUGGING_PORT = 9222
+DEFAULT_DRIVER_PORT = 9515
+DEFAULT_USER_DATA_DIR = "chrome_profile"
+DEFAULT_CHECK_INTERVAL = 5
+DEFAULT_MAX_RSS_MB = 1024
+# Seconds a freshly started process has to answer its first check
+STARTUP_TIMEOUT = 20
+MAX_MISSED_CHECKS = 3
+CHROME_BINARIES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+
+def find_binary(names):
+    """First of names found on PATH, or None"""
+    for name in names:
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+def endpoint_ok(url, timeout=2.0):
+    """True if url answers with HTTP 200 within timeout seconds"""
+    try:
+        return requests.get(url, timeout=timeout).status_code == 200
+    except requests.RequestException:
+        return False
+
+class SupervisedProcess:
+    """One long-lived child process and the URL that says it is healthy"""
+    def __init__(self, name, command, health_url):
+        self.name = name
+        self.command = command
+        self.health_url = health_url
+        self.process = None
+        self.missed = 0
+        self.restarts = 0
+
+    def start(self, sleep=time.sleep):
+        """Launch the process and wait until it answers; False if it never does"""
+        log.info("Starting %s", self.name)
+        log.debug("  %s", " ".join(self.command))
+        self.process = subprocess.Popen(self.command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.missed = 0
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                log.error("%s exited on startup with code %s", self.name, self.process.returncode)
+                return False
+            if endpoint_ok(self.health_url):
+                log.info("%s is up (pid %s)", self.name, self.process.pid, extra={"pid": self.process.pid})
+                return True
+            sleep(0.2)
+        log.error("%s did not answer %s within %ss", self.name, self.health_url, STARTUP_TIMEOUT)
+        return False
+
+    def stop(self):
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.process = None
+
+    def problem(self, max_rss=None):
+        """Why the process needs a restart, or None if it is healthy"""
+        if self.process is None:
+            return "not running"
+        if self.process.poll() is not None:
+            return f"exited with code {self.process.returncode}"
+        if endpoint_ok(self.health_url):
+            self.missed = 0
+        else:
+            self.missed += 1
+            if self.missed >= MAX_MISSED_CHECKS:
+                return f"{self.health_url} did not answer {self.missed} checks in a row"
+        if max_rss:
+            rss = browser_rss(self.process.pid)
+            if rss and rss > max_rss:
+                return f"RSS {rss / 2**20:.0f} MB is over {max_rss / 2**20:.0f} MB"
+        return None
+
+    def restart(self, reason, sleep=time.sleep):
+        log.info("Restarting %s: %s", self.name, reason, extra={"banner": "-"})
+        self.restarts += 1
+        self.stop()
+        return self.start(sleep)
+
+class ChromeSupervisor:
+    """Keeps Chrome (and optionally chromedriver) running for booking runs to attach to"""
+    def __init__(self, args, config, sleep=time.sleep):
+        self.sleep = sleep
+        supervisor_config = config.get("supervisor", {})
+        self.debugging_port = args.debugging_port or supervisor_config.get("debugging_port", DEFAULT_DEBUGGING_PORT)
+        self.driver_port = args.driver_port
+        if self.driver_port is None:
+            self.driver_port = supervisor_config.get("driver_port", DEFAULT_DRIVER_PORT)
+        self.check_interval = supervisor_config.get("check_interval_seconds", DEFAULT_CHECK_INTERVAL)
+        self.max_rss = supervisor_config.get("max_rss_mb", DEFAULT_MAX_RSS_MB) * 2**20
+
+        chrome = args.chrome or supervisor_config.get("chrome_binary") or find_binary(CHROME_BINARIES)
+        if not chrome:
+            raise RuntimeError(f"No Chrome found on PATH (tried {', '.join(CHROME_BINARIES)}); pass --chrome")
+        user_data_dir = os.path.abspath(args.user_data_dir or supervisor_config.get("user_data_dir", DEFAULT_USER_DATA_DIR))
+        profile = args.browser_profile or config.get("browser", {}).get("profile", "default")
+        self.chrome = SupervisedProcess(
+            "Chrome",
+            [chrome, *chrome_arguments(args.show_browser, profile),
+             f"--remote-debugging-port={self.debugging_port}", f"--user-data-dir={user_data_dir}", "about:blank"],
+            f"http://127.0.0.1:{self.debugging_port}/json/version"
+        )
+        self.processes = [self.chrome]
+        if self.driver_port:
+            chromedriver = args.chromedriver or supervisor_config.get("chromedriver") or find_binary(("chromedriver",))
+            if not chromedriver:
+                raise RuntimeError("No chromedriver found on PATH; pass --chromedriver, or --driver_port 0 to skip it")
+            self.driver = SupervisedProcess(
+                "chromedriver",
+                [chromedriver, f"--port={self.driver_port}", "--log-level=OFF"],
+                f"http://127.0.0.1:{self.driver_port}/status"
+            )
+            self.processes.append(self.driver)
+
+    def attach_arguments(self):
+        """The runner options that use this supervisor's processes"""
+        arguments = f"--attach 127.0.0.1:{self.debugging_port}"
+        if self.driver_port:
+            arguments += f" --remote_driver http://127.0.0.1:{self.driver_port}"
+        return arguments
+
+    def check(self):
+        """Restart whatever has died, hung or grown too big"""
+        for supervised in self.processes:
+            reason = supervised.problem(self.max_rss if supervised is self.chrome else None)
+            if reason is not None:
+                supervised.restart(reason, self.sleep)
+            else:
+                log.debug("[HEALTH] %s ok", supervised.name, extra={"component": supervised.name})
+
+    def run(self):
+        """Start everything, then check on it until interrupted"""
+        for supervised in self.processes:
+            supervised.start(self.sleep)
+        log.info("Attach booking runs with: %s", self.attach_arguments())
+        while True:
+            self.sleep(self.check_interval)
+            self.check()
+
+    def stop(self):
+        for supervised in reversed(self.processes):
+            supervised.stop()
+        log.info("Restarts: %s", ", ".join(f"{p.name} {p.restarts}" for p in self.processes))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Keep a Chrome and chromedriver running for booking runs to attach to.")
+    parser.add_argument("--chrome", type=str, default=None, help="Chrome binary (default: config or found on PATH)")
+    parser.add_argument("--chromedriver", type=str, default=None, help="chromedriver binary (default: config or found on PATH)")
+    parser.add_argument("--debugging_port", type=int, default=None,
+                        help=f"Chrome remote debugging port (default: config or {DEFAULT_DEBUGGING_PORT})")
+    parser.add_argument("--driver_port", type=int, default=None,
+                        help=f"chromedriver port, 0 to not run one (default: config or {DEFAULT_DRIVER_PORT})")
+    parser.add_argument("--user_data_dir", type=str, default=None,
+                        help=f"Chrome profile directory (default: config or {DEFAULT_USER_DATA_DIR})")
+    parser.add_argument("--browser_profile", type=str, choices=BROWSER_PROFILES, default=None,
+                        help="Launch Chrome with this profile's switches (default: config or default)")
+    parser.add_argument("--show_browser", action="store_true", help="Run Chrome with a window instead of headless")
+    parser.add_argument("--verbose", action="store_true", help="Output detailed debug information.")
+    parser.add_argument("--log_file", type=str, default=None, help="Also write every log record to this file as JSON lines")
+    return parser.parse_args()
+
+def stop_on_sigterm(signum, frame):
+    # Let the finally block stop Chrome when a service manager stops us
+    raise KeyboardInterrupt()
+
+def main():
+    args = parse_args()
+    setup_logging(args.verbose, args.log_file)
+    signal.signal(signal.SIGTERM, stop_on_sigterm)
+    try:
+        supervisor = ChromeSupervisor(args, runner.load_config())
+    except RuntimeError as e:
+        log.error("%s", e)
+        return
+    log.info("Chrome Supervisor", extra={"banner": "-"})
+    try:
+        supervisor.run()
+    except KeyboardInterrupt:
+        log.info("Stopped", extra={"gap": True})
+    finally:
+        supervisor.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# clublocker_http.py
+#
+# Browser-free booking backend for clublocker_standin.py and the benchmarks.
+# ClubLockerHTTPBooking has the same interface as SquashBooking but talks to
+# reservation endpoints directly over one pooled keep-alive requests.Session,
+# so a run needs no Chrome and no DOM round trips. The endpoint paths live in
+# API_ROUTES. They are the stand-in's, not a documented ClubLocker API, so
+# this backend cannot book on the live site: it refuses any base_url that
+# isn't on this machine, and the runners reject --backend http without one.
+
+import os
+import time
+import logging
+import ipaddress
+import requests
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from grid_snapshot import GridSnapshot
+from session_cache import cache_key
+from reservations import ReservationCache
+from retry_engine import classify_failure, SAVE_UNCERTAIN
+
+log = logging.getLogger(__name__)
+
+# Load credentials from .env file
+load_dotenv()
+CLUBLOCKER_USERNAME = os.getenv("CLUBLOCKER_USERNAME")
+CLUBLOCKER_PASSWORD = os.getenv("CLUBLOCKER_PASSWORD")
+CLUBLOCKER_BASE_URL = "https://clublocker.com"
+
+API_ROUTES = {
+    "login": "/api/login",
+    "session": "/api/session",
+    "grid": "/api/organizations/{org_id}/reservations/{date}/grid",
+    "book": "/api/organizations/{org_id}/reservations/{date}",
+    "my_reservations": "/api/reservations/mine",
+}
+# Per-request timeouts in seconds, keyed like SquashBooking.timeouts
+DEFAULT_TIMEOUTS = {
+    "login": 15,
+    "grid": 15,
+    "reservations": 10,
+    "save": 10,
+}
+POOL_CONNECTIONS = 4
+
+class BookingHTTPError(Exception):
+    """Raised when an API call returns an unexpected status"""
+    def __init__(self, route, status, message=""):
+        super().__init__(f"{route} returned HTTP {status}{': ' + message if message else ''}")
+        self.route = route
+        self.status = status
+
+def is_loopback(base_url):
+    """True if base_url points at this machine (where the stand-in runs)"""
+    host = urlsplit(base_url).hostname or ""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+def save_failure(error):
+    """
+    Failure kind of a booking POST that raised. Only a refused connection or a
+    4xx answer means nothing was booked; a read timeout, a dropped connection
+    or a 5xx may come after the server saved the booking.
+    """
+    if isinstance(error, requests.ConnectTimeout):
+        return classify_failure(error)
+    if isinstance(error, BookingHTTPError) and error.status < 500:
+        return classify_failure(error)
+    return SAVE_UNCERTAIN
+
+def grid_to_raw_slots(grid):
+    """Convert the grid endpoint's JSON into the raw slot rows GridSnapshot expects"""
+    raw_slots = []
+    for column in grid.get("courts", []):
+        court = int(column["court"])
+        for slot in column.get("slots", []):
+            status = slot.get("status", "")
+            raw_slots.append({
+                "court": court,
+                "title": f"{slot['start']} - {slot['end']}",
+                "classes": f"slot {status}",
+                # The "element" of an HTTP slot is what the booking call needs
+                "element": {"court": court, "start": slot["start"], "end": slot["end"]},
+            })
+    return raw_slots
+
+class ClubLockerHTTPBooking:
+    def __init__(self, show_browser=False, test_mode=False, verbose=False, timeouts=None, base_url=CLUBLOCKER_BASE_URL,
+                 session_cache=None, username=None, password=None, profile=None, blocked_urls=None,
+                 capture_dir=None, profiler=None, debugger_address=None, remote_driver=None):
+        # show_browser, profile, blocked_urls, capture_dir, debugger_address and remote_driver
+        # are accepted for interface compatibility; there is no browser and no rendered page
+        if not is_loopback(base_url):
+            raise ValueError(
+                f"The HTTP backend only talks to clublocker_standin.py, not {base_url}: its API_ROUTES are the "
+                "stand-in's. Pass --base_url http://127.0.0.1:<port>, or use --backend browser."
+            )
+        self.test_mode = test_mode
+        self.verbose = verbose
+        self.base_url = base_url.rstrip("/")
+        self.session = None
+        self.token = None
+        self.org_id = None
+        self.booking_date = None
+        self.grid_snapshot = None
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update({k: v for k, v in timeouts.items() if k in DEFAULT_TIMEOUTS})
+        self.wait_timings = []
+        self.session_cache = session_cache
+        # Times every HTTP request when set (see command_profiler.py)
+        self.profiler = profiler
+        # Default to the account from the environment; the fleet runner passes its own
+        self.username = username or CLUBLOCKER_USERNAME
+        self.password = password or CLUBLOCKER_PASSWORD
+        self.session_key = cache_key(self.username, self.base_url)
+        self.session_restored = False
+        # Failure kind of the last attempt_booking that returned False (see retry_engine)
+        self.last_failure = None
+        # The member's reservations, fetched once per session
+        self.reservations = None
+
+    def start_browser(self):
+        """Open the pooled keep-alive HTTP session (named to match SquashBooking)"""
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_CONNECTIONS)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Accept": "application/json"})
+        if self.profiler is not None:
+            self.profiler.instrument(self)
+        if self.session_cache is not None:
+            self.session_restored = self.restore_session()
+
+    def restore_session(self):
+        """Reuse a cached API token if one cheap session check still accepts it"""
+        cached = self.session_cache.load(self.session_key)
+        if not cached or not cached.get("token"):
+            return False
+        self.session.headers["Authorization"] = f"Bearer {cached['token']}"
+        try:
+            self.request("GET", "session", "login")
+        except Exception:
+            log.info("Cached session is no longer valid; logging in again")
+            self.session.headers.pop("Authorization", None)
+            self.session_cache.clear(self.session_key)
+            return False
+        self.token = cached["token"]
+        log.info("Restored cached session")
+        return True
+
+    def request(self, method, route, phase, expected=(200,), **kwargs):
+        """Call an API route, record how long it took and check the status"""
+        url = self.base_url + API_ROUTES[route].format(org_id=self.org_id, date=self.booking_date)
+        started = time.perf_counter()
+        response = self.session.request(method, url, timeout=self.timeouts.get(phase, 10), **kwargs)
+        elapsed = time.perf_counter() - started
+        self.wait_timings.append((phase, f"{method} {route} -> {response.status_code}", elapsed, True))
+        log.debug("[HTTP] %s %s -> %s in %.3fs", method, url, response.status_code, elapsed,
+                  extra={"phase": phase, "route": route, "status": response.status_code, "seconds": elapsed})
+        if response.status_code not in expected:
+            raise BookingHTTPError(route, response.status_code, response.text[:200])
+        return response
+
+    def login(self):
+        """Log in and keep the bearer token on the session"""
+        log.info("Step 1: Login", extra={"heading": True})
+        if self.session_restored:
+            log.info("Using restored session; skipping login")
+            return
+        response = self.request(
+            "POST", "login", "login",
+            json={"username": self.username, "password": self.password},
+        )
+        self.token = response.json()["token"]
+        self.session.headers["Authorization"] = f"Bearer {self.token}"
+        log.info("Login complete.")
+        if self.session_cache is not None:
+            try:
+                self.session_cache.save(self.session_key, {"token": self.token})
+            except Exception as e:
+                log.warning("Note: Could not save session cache: %s", e)
+
+    def prepare_speculative(self, entries):
+        """Booking is already a single POST; there is nothing to pre-position"""
+        return False
+
+    def confirm_prepared(self):
+        return None
+
+    def session_alive(self):
+        """True if the API still accepts our token"""
+        if self.session is None:
+            return False
+        try:
+            self.request("GET", "session", "login")
+        except Exception as e:
+            log.warning("Session check failed: %s", e)
+            return False
+        return True
+
+    def current_rss(self):
+        """No browser to measure (matches SquashBooking)"""
+        return None
+
+    def load_reservations(self):
+        """Fetch the member's reservations once and cache their dates"""
+        try:
+            rows = self.request("GET", "my_reservations", "reservations").json().get("reservations", [])
+        except Exception as e:
+            log.error("Error checking existing bookings: %s", e)
+            return None
+        self.reservations = ReservationCache(row.get("date") for row in rows if row.get("date"))
+        log.info("Loaded %s reservation(s) on %s date(s)", len(rows), len(self.reservations))
+        return self.reservations
+
+    def clear_reservations(self):
+        """Forget the cached reservations so the next check fetches them again"""
+        self.reservations = None
+
+    def check_existing_bookings(self, target_date):
+        """Check if there are any existing bookings on the target date"""
+        log.info("Checking for existing bookings on %s", target_date, extra={"heading": True})
+        if self.reservations is None and self.load_reservations() is None:
+            return False
+        if target_date in self.reservations:
+            log.info("Found existing booking on %s", target_date, extra={"booking_date": target_date})
+            return True
+        log.info("No existing bookings found for this date")
+        return False
+
+    def navigate_to_date(self, booking_date, org_id, check_existing=True):
+        """Load the grid for the specified date"""
+        log.info("Step 2: Loading booking date %s", booking_date, extra={"heading": True})
+        self.org_id = org_id
+        self.booking_date = booking_date
+        self.grid_snapshot = None
+
+        if check_existing and self.check_existing_bookings(booking_date):
+            log.info("Found existing booking for this date!", extra={"banner": "!"})
+            return False
+        self.snapshot_grid()
+        return True
+
+    def snapshot_grid(self):
+        """Fetch the whole grid in one request and index it"""
+        grid = self.request("GET", "grid", "grid").json()
+        self.grid_snapshot = GridSnapshot(grid_to_raw_slots(grid))
+        log.debug("Grid snapshot: %d slots across %d courts", len(self.grid_snapshot),
+                  len(self.grid_snapshot.court_counts))
+        return self.grid_snapshot
+
+    def refresh_grid(self):
+        """Re-fetch the grid for the current date"""
+        return self.snapshot_grid()
+
+    def check_slot_availability(self, court_number, time_slot):
+        """Return the slot if it is open in the current snapshot, else None"""
+        log.info("Step 3: Checking availability for Court %s at %s", court_number, time_slot, extra={"heading": True})
+        snapshot = self.grid_snapshot or self.snapshot_grid()
+        fields = {"court": court_number, "time_slot": time_slot}
+        entry = snapshot.get(court_number, time_slot.split(" - ")[0])
+        if entry is None:
+            log.info("[NOT FOUND] No slot found for Court %s at %s", court_number, time_slot,
+                     extra=dict(fields, state="missing"))
+            return None
+        if entry["open"]:
+            log.info("  [AVAILABLE] %s is available for booking", entry["time_range"], extra=dict(fields, state="open"))
+            return entry["element"]
+        log.info("  [UNAVAILABLE] %s is not available", entry["time_range"], extra=dict(fields, state="taken"))
+        return None
+
+    def attempt_booking(self, slot, before_save=None):
+        """Book the slot with a single POST; before_save works as in SquashBooking"""
+        log.info("Step 4: Attempting to book slot", extra={"heading": True})
+        if before_save is not None and not before_save():
+            log.info("[CANCELLED] Booking cancelled before Save")
+            return False
+        if self.test_mode:
+            log.info("TEST MODE: Would book court %s at %s.", slot['court'], slot['start'])
+            return True
+        try:
+            self.request(
+                "POST", "book", "save", expected=(200, 201),
+                json={"court": slot["court"], "start": slot["start"]},
+            )
+        except (BookingHTTPError, requests.RequestException) as e:
+            self.last_failure = save_failure(e)
+            log.error("[ERROR] Error during booking: %s", e, extra={"failure": self.last_failure})
+            return False
+        finally:
+            # The grid has changed either way
+            self.grid_snapshot = None
+        log.info("[SUCCESS] Booking confirmed!", extra={"booking_date": self.booking_date, "outcome": "booked"})
+        if self.reservations is not None:
+            self.reservations.add(self.booking_date)
+        return True
+
+    def close(self):
+        """Close the HTTP session"""
+        if self.session:
+            self.session.close()
+            self.session = None
+
+    def print_wait_summary(self):
+        """Print how long each API call took"""
+        if not self.wait_timings:
+            return
+        log.info("Request timings", extra={"banner": "-"})
+        total = 0.0
+        for phase, description, elapsed, _ in self.wait_timings:
+            total += elapsed
+            log.info("  %-13s %6.3fs  %s", phase, elapsed, description, extra={"phase": phase, "seconds": elapsed})
+        log.info("  total         %6.3fs", total)
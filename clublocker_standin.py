@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# clublocker_standin.py
+#
+# A small local imitation of the ClubLocker pages that SquashBooking uses:
+# the login form, the reservation grid (with My Reservations / All
+# Reservations views and the booking dialog) and the HTTP Date header.
+# It also serves the JSON reservation endpoints used by the browser-free
+# backend in clublocker_http.py (see API_ROUTES there).
+# Slots only turn "slot open" once the configured release instant has
+# passed on the stand-in's own clock, which can be offset or faked.
+# response_delay/delay_jitter slow every request down, and contention makes
+# simulated rival members grab that share of slots within rival_window
+# seconds of release, for benchmarking under realistic conditions.
+#
+# Usage:
+#   python clublocker_standin.py --port 8765 --release_in 30
+#   python run_scheduled_bookings.py --base_url http://127.0.0.1:8765 --release_at ...
+
+import argparse
+import datetime
+import html
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from timetable import DEFAULT_TIMETABLE, format_range
+
+SESSION_COOKIE = "standin_session"
+# Page decoration like the real grid pulls in: (content type, size in bytes)
+STATIC_ASSETS = {
+    "/static/banner.png": ("image/png", 400 * 1024),
+    "/static/brand.woff2": ("font/woff2", 120 * 1024),
+    "/static/fonts.css": ("text/css", 0),
+    "/static/analytics.js": ("application/javascript", 80 * 1024),
+}
+FONTS_CSS = "@font-face { font-family: Brand; src: url(/static/brand.woff2); } body { font-family: Brand, sans-serif; }"
+
+GRID_PATH = re.compile(r"^/organizations/(?P<org>[^/]+)/reservations/(?P<date>\d{4}-\d{2}-\d{2})/grid/?$")
+BOOK_PATH = re.compile(r"^/organizations/(?P<org>[^/]+)/reservations/(?P<date>\d{4}-\d{2}-\d{2})/book/?$")
+API_GRID_PATH = re.compile(r"^/api/organizations/(?P<org>[^/]+)/reservations/(?P<date>\d{4}-\d{2}-\d{2})/grid/?$")
+API_BOOK_PATH = re.compile(r"^/api/organizations/(?P<org>[^/]+)/reservations/(?P<date>\d{4}-\d{2}-\d{2})/?$")
+
+def court_slots(court, timetable=DEFAULT_TIMETABLE):
+    """Return the list of "start - end" ranges offered on a court"""
+    return [format_range(start, timetable.slot_end(court, start)) for start in timetable.slot_starts(court)]
+
+class StandInState:
+    """Shared, thread-safe state of the stand-in site"""
+    def __init__(self, courts=7, release_at=None, clock=time.time, clock_offset=0.0, reserved=None,
+                 response_delay=0.0, delay_jitter=0.0, contention=0.0, rival_window=5.0, seed=0, asset_delay=0.0):
+        self.courts = courts
+        self.release_at = release_at
+        self.clock = clock
+        self.clock_offset = clock_offset
+        self.lock = threading.Lock()
+        # (date, court, start time) -> member that holds it
+        self.bookings = {}
+        # Slots that are taken by other members regardless of release
+        self.reserved = set(reserved or [])
+        # API bearer token -> member
+        self.tokens = {}
+        self.response_delay = response_delay
+        self.delay_jitter = delay_jitter
+        self.contention = contention
+        self.rival_window = rival_window
+        self.seed = seed
+        # Extra latency of the static assets, like a slow CDN
+        self.asset_delay = asset_delay
+        self.started_at = self.now()
+
+    def now(self):
+        """Current time on the server's clock (epoch seconds)"""
+        return self.clock() + self.clock_offset
+
+    def released(self):
+        return self.release_at is None or self.now() >= self.release_at
+
+    def delay(self):
+        """Simulated server think time, applied to every request"""
+        if self.response_delay or self.delay_jitter:
+            time.sleep(self.response_delay + random.uniform(0, self.delay_jitter))
+
+    def taken_by_rival(self, date, court, start):
+        """Deterministically decide whether (and when) a rival member takes this slot"""
+        if not self.contention:
+            return False
+        rng = random.Random(f"{self.seed}:{date}:{court}:{start}")
+        if rng.random() >= self.contention:
+            return False
+        base = self.release_at if self.release_at is not None else self.started_at
+        return self.now() >= base + rng.uniform(0, self.rival_window)
+
+    def slot_open(self, date, court, start):
+        key = (date, court, start)
+        return (
+            self.released()
+            and key not in self.bookings
+            and key not in self.reserved
+            and not self.taken_by_rival(date, court, start)
+        )
+
+    def book(self, date, court, start, member):
+        """Book a slot; returns False if it is not open any more"""
+        with self.lock:
+            if not self.slot_open(date, court, start):
+                return False
+            self.bookings[(date, court, start)] = member
+            return True
+
+    def cancel(self, date, court, start):
+        """Free a slot, as if its holder cancelled"""
+        with self.lock:
+            self.bookings.pop((date, court, start), None)
+            self.reserved.discard((date, court, start))
+
+    def issue_token(self, member):
+        token = secrets.token_hex(16)
+        with self.lock:
+            self.tokens[token] = member
+        return token
+
+    def grid(self, date):
+        """The grid as JSON-friendly data, as served by the API"""
+        courts = []
+        for court in range(1, self.courts + 1):
+            slots = []
+            for time_range in court_slots(court):
+                start, end = time_range.split(" - ")
+                status = "open" if self.slot_open(date, court, start) else "reserved"
+                slots.append({"start": start, "end": end, "status": status})
+            courts.append({"court": court, "slots": slots})
+        return {"date": date, "courts": courts}
+
+    def member_bookings(self, member):
+        return sorted(
+            (date, court, start) for (date, court, start), owner in self.bookings.items() if owner == member
+        )
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><title>Login | ClubLocker stand-in</title></head>
+<body>
+<form method="post" action="/login">
+  <input id="login" name="login" type="text">
+  <input id="loginpass" name="password" type="password">
+  <div class="login-btn"><button type="submit">Log In</button></div>
+</form>
+</body></html>
+"""
+
+GRID_SCRIPT = """
+function showView(name) {
+  document.getElementById('grid-view').style.display = name === 'grid' ? '' : 'none';
+  document.getElementById('reservations-view').style.display = name === 'reservations' ? '' : 'none';
+}
+let selected = null;
+function openDialog(slot) {
+  selected = slot;
+  document.getElementById('dialog-message').textContent = slot.getAttribute('title').split('\\n')[0];
+  document.getElementById('save-button').disabled = false;
+  document.getElementById('dialog').style.display = '';
+}
+function save() {
+  const button = document.getElementById('save-button');
+  button.disabled = true;
+  fetch(window.location.pathname.replace(/\\/grid\\/?$/, '/book'), {
+    method: 'POST',
+    headers: {'Content-Type': 'application/json'},
+    body: JSON.stringify({court: Number(selected.dataset.court), start: selected.dataset.start})
+  }).then((response) => {
+    if (response.ok) {
+      selected.className = 'slot reserved';
+      document.getElementById('dialog').style.display = 'none';
+    } else {
+      document.getElementById('dialog-message').textContent = 'This slot is no longer available';
+    }
+  });
+}
+"""
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Request handler; the server instance carries the StandInState"""
+    server_version = "ClubLockerStandIn/1.0"
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, format, *args):
+        if getattr(self.server, "verbose", False):
+            super().log_message(format, *args)
+
+    def date_time_string(self, timestamp=None):
+        # Report the stand-in clock in the Date header so offsets can be tested
+        return super().date_time_string(self.state.now() if timestamp is None else timestamp)
+
+    def member(self):
+        authorization = self.headers.get("Authorization", "")
+        if authorization.startswith("Bearer "):
+            return self.state.tokens.get(authorization[len("Bearer "):])
+        cookies = self.headers.get("Cookie", "")
+        match = re.search(rf"{SESSION_COOKIE}=([^;]+)", cookies)
+        return match.group(1) if match else None
+
+    def send_json(self, status, payload):
+        return self.send_body(status, json.dumps(payload), "application/json")
+
+    def send_body(self, status, body, content_type="text/html; charset=utf-8", headers=None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length).decode("utf-8") if length else ""
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        self.state.delay()
+        path = self.path.split("?")[0]
+        if path == "/login":
+            return self.send_body(200, LOGIN_PAGE)
+        if path.startswith("/api/"):
+            return self.api_get(path)
+        match = GRID_PATH.match(path)
+        if match:
+            if not self.member():
+                # Like the real site: pages behind login redirect to the login form
+                return self.send_body(302, "", headers={"Location": "/login"})
+            return self.send_body(200, self.render_grid(match.group("date")))
+        if path == "/":
+            return self.send_body(200, "<html><head><title>ClubLocker stand-in</title></head><body>Home</body></html>")
+        if path in STATIC_ASSETS:
+            return self.send_asset(path)
+        return self.send_body(404, "Not found", "text/plain")
+
+    def send_asset(self, path):
+        if self.state.asset_delay:
+            time.sleep(self.state.asset_delay)
+        content_type, size = STATIC_ASSETS[path]
+        if path == "/static/fonts.css":
+            return self.send_body(200, FONTS_CSS, content_type)
+        body = "/* padding */" if content_type == "application/javascript" else ""
+        return self.send_body(200, body.ljust(size), content_type)
+
+    def do_POST(self):
+        self.state.delay()
+        path = self.path.split("?")[0]
+        if path.startswith("/api/"):
+            return self.api_post(path)
+        if path == "/login":
+            form = parse_qs(self.read_body())
+            username = form.get("login", [""])[0] or "member"
+            return self.send_body(302, "", headers={
+                "Location": "/",
+                "Set-Cookie": f"{SESSION_COOKIE}={username}; Path=/; HttpOnly",
+            })
+        match = BOOK_PATH.match(path)
+        if match:
+            member = self.member()
+            if not member:
+                return self.send_body(401, json.dumps({"error": "not logged in"}), "application/json")
+            payload = json.loads(self.read_body() or "{}")
+            ok = self.state.book(match.group("date"), int(payload.get("court", 0)), payload.get("start", ""), member)
+            status = 200 if ok else 409
+            return self.send_body(status, json.dumps({"booked": ok}), "application/json")
+        return self.send_body(404, "Not found", "text/plain")
+
+    def api_get(self, path):
+        member = self.member()
+        if not member:
+            return self.send_json(401, {"error": "not logged in"})
+        if path == "/api/session":
+            return self.send_json(200, {"member": member})
+        if path == "/api/reservations/mine":
+            reservations = []
+            for date, court, start in self.state.member_bookings(member):
+                reservations.append({"date": date, "court": court, "start": start})
+            return self.send_json(200, {"reservations": reservations})
+        match = API_GRID_PATH.match(path)
+        if match:
+            return self.send_json(200, self.state.grid(match.group("date")))
+        return self.send_json(404, {"error": "not found"})
+
+    def api_post(self, path):
+        try:
+            payload = json.loads(self.read_body() or "{}")
+        except ValueError:
+            return self.send_json(400, {"error": "invalid JSON"})
+        if path == "/api/login":
+            if not payload.get("username") or not payload.get("password"):
+                return self.send_json(401, {"error": "invalid credentials"})
+            return self.send_json(200, {"token": self.state.issue_token(payload["username"])})
+        member = self.member()
+        if not member:
+            return self.send_json(401, {"error": "not logged in"})
+        match = API_BOOK_PATH.match(path)
+        if match:
+            date = match.group("date")
+            ok = self.state.book(date, int(payload.get("court", 0)), payload.get("start", ""), member)
+            if not ok:
+                return self.send_json(409, {"error": "slot not available"})
+            return self.send_json(201, {"date": date, "court": int(payload["court"]), "start": payload["start"]})
+        return self.send_json(404, {"error": "not found"})
+
+    def render_grid(self, date):
+        columns = []
+        for court in range(1, self.state.courts + 1):
+            slots = []
+            for time_range in court_slots(court):
+                start = time_range.split(" - ")[0]
+                status = "slot open" if self.state.slot_open(date, court, start) else "slot reserved"
+                title = html.escape(f"{time_range}\nCourt {court}")
+                slots.append(
+                    f'<usq-reservation-grid-slot><div class="{status}" title="{title}" '
+                    f'data-court="{court}" data-start="{start}" onclick="openDialog(this)"></div>'
+                    f'</usq-reservation-grid-slot>'
+                )
+            columns.append(f'<div class="column slots">{"".join(slots)}</div>')
+
+        rows = []
+        for booked_date, court, start in self.state.member_bookings(self.member()):
+            day = datetime.datetime.strptime(booked_date, "%Y-%m-%d")
+            rows.append(
+                f'<div class="row"><div class="date-and-time"><div class="date">{day.strftime("%a, %b %d")}</div>'
+                f'<div class="time">{start} Court {court}</div></div></div>'
+            )
+
+        return f"""<!DOCTYPE html>
+<html><head><title>Reservations {date} | ClubLocker stand-in</title>
+<link rel="stylesheet" href="/static/fonts.css">
+<script async src="/static/analytics.js"></script></head>
+<body>
+<img src="/static/banner.png" alt="" width="1" height="1">
+<button onclick="showView('reservations')"><span>My Reservations</span></button>
+<button onclick="showView('grid')"><span>All Reservations</span></button>
+<div id="grid-view"><div class="courts-container-inner">{"".join(columns)}</div></div>
+<div id="reservations-view" style="display:none">{"".join(rows)}</div>
+<div id="dialog" style="display:none"><p id="dialog-message"></p>
+<button id="save-button" onclick="save()"><span>Save</span></button></div>
+<script>{GRID_SCRIPT}</script>
+</body></html>
+"""
+
+def start_standin(host="127.0.0.1", port=0, verbose=False, **state_kwargs):
+    """Start the stand-in on a background thread; returns (server, base_url)"""
+    server = ThreadingHTTPServer((host, port), StandInHandler)
+    server.state = StandInState(**state_kwargs)
+    server.verbose = verbose
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Local ClubLocker stand-in server")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--release_in", type=float, default=None, help="Open slots this many seconds after start")
+    parser.add_argument("--clock_offset", type=float, default=0.0, help="Seconds the server clock runs ahead of this machine")
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random delay of up to this many seconds")
+    parser.add_argument("--contention", type=float, default=0.0, help="Share of slots (0-1) rival members grab after release")
+    parser.add_argument("--rival_window", type=float, default=5.0, help="Rivals grab their slots within this many seconds")
+    parser.add_argument("--asset_delay", type=float, default=0.0, help="Seconds added to images, fonts and scripts")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    release_at = None
+    if args.release_in is not None:
+        release_at = time.time() + args.clock_offset + args.release_in
+    server, base_url = start_standin(
+        args.host, args.port, verbose=args.verbose, release_at=release_at, clock_offset=args.clock_offset,
+        response_delay=args.delay, delay_jitter=args.jitter, contention=args.contention, rival_window=args.rival_window,
+        asset_delay=args.asset_delay
+    )
+    print(f"ClubLocker stand-in listening on {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# command_profiler.py
+#
+# Profiles the round trips a booking backend makes. The browser backend's
+# cost is the WebDriver commands hidden inside find_elements, get_attribute,
+# click and wait.until, each one an HTTP call to chromedriver. With
+# --profile, the driver's command executor (or the HTTP backend's session)
+# is wrapped so every command is counted and timed. Each command is tagged
+# with the booking method it came from (navigate_to_date, attempt_booking,
+# ...) by walking the Python stack. The stack walk happens before the timer
+# starts.
+#
+# At the end of the run a sorted report is printed. A folded-stack file is
+# also written: one "frame;frame;...;command microseconds" line per distinct
+# stack. The frames are this repo's functions, plus the Selenium (or
+# requests) call each one made. flamegraph.pl, speedscope and inferno read
+# it directly:
+#   flamegraph.pl profiles/<run>.folded > profile.svg
+
+import os
+import re
+import sys
+import time
+import logging
+import datetime
+import threading
+
+DEFAULT_PROFILE_DIR = "profiles"
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__)) + os.sep
+# Wrappers whose frames would only add noise to the stacks
+SKIPPED_FILES = {REPO_ROOT + name for name in ("command_profiler.py", "booking_trace.py")}
+NUMBER = re.compile(r"\d+")
+
+log = logging.getLogger(__name__)
+
+def frame_name(code):
+    return getattr(code, "co_qualname", code.co_name)
+
+class CommandProfiler:
+    """Counts and times every command a booking backend sends, by calling method"""
+    def __init__(self, output_dir=DEFAULT_PROFILE_DIR):
+        self.output_dir = output_dir
+        self.lock = threading.Lock()
+        # (booking method, command) -> [calls, total seconds, max seconds]
+        self.commands = {}
+        # folded stack -> total seconds
+        self.stacks = {}
+
+    def call_stack(self, class_name):
+        """
+        (booking method, frames) for the command being sent. frames runs from
+        the outermost repo function inward; every run of library frames is
+        reduced to the library call the repo code made.
+        """
+        frames = []
+        outside = None
+        frame = sys._getframe(2)
+        while frame is not None:
+            code = frame.f_code
+            if code.co_filename in SKIPPED_FILES:
+                pass
+            elif code.co_filename.startswith(REPO_ROOT) and "site-packages" not in code.co_filename:
+                if outside is not None:
+                    frames.append(outside)
+                    outside = None
+                frames.append(frame_name(code))
+            else:
+                outside = frame_name(code)
+            frame = frame.f_back
+        if not frames and outside is not None:
+            frames.append(outside)
+        frames.reverse()
+        # The outermost backend method is the phase the runner called
+        method = next((name.split(".", 1)[1] for name in frames if name.startswith(class_name + ".")), "(other)")
+        return method, frames
+
+    def record(self, method, frames, command, elapsed):
+        with self.lock:
+            stats = self.commands.setdefault((method, command), [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] = max(stats[2], elapsed)
+            key = ";".join(frames + [command])
+            self.stacks[key] = self.stacks.get(key, 0.0) + elapsed
+
+    def instrument(self, booking):
+        """Wrap the booking's driver command executor or HTTP session"""
+        class_name = type(booking).__name__
+        driver = getattr(booking, "driver", None)
+        if driver is not None and not getattr(driver.command_executor, "_profiled", False):
+            executor = driver.command_executor
+            execute = executor.execute
+
+            def profiled_execute(command, params):
+                method, frames = self.call_stack(class_name)
+                started = time.perf_counter()
+                try:
+                    return execute(command, params)
+                finally:
+                    self.record(method, frames, command, time.perf_counter() - started)
+
+            executor.execute = profiled_execute
+            executor._profiled = True
+        session = getattr(booking, "session", None)
+        if session is not None and not getattr(session, "_profiled", False):
+            request = session.request
+
+            def profiled_request(method_name, url, *args, **kwargs):
+                method, frames = self.call_stack(class_name)
+                # One name per route, whatever the date or organization
+                path = NUMBER.sub("N", url.split("://", 1)[-1].partition("/")[2].split("?")[0])
+                started = time.perf_counter()
+                try:
+                    return request(method_name, url, *args, **kwargs)
+                finally:
+                    self.record(method, frames, f"{method_name.upper()} /{path}", time.perf_counter() - started)
+
+            session.request = profiled_request
+            session._profiled = True
+
+    def print_report(self):
+        log.info("Command profile", extra={"banner": "-"})
+        if not self.commands:
+            log.info("  No commands recorded")
+            return
+        with self.lock:
+            commands = dict(self.commands)
+        calls = sum(stats[0] for stats in commands.values())
+        total = sum(stats[1] for stats in commands.values())
+        log.info("%s commands, %.3fs in round trips", calls, total)
+
+        by_method = {}
+        for (method, _), (count, seconds, _) in commands.items():
+            method_calls, method_seconds = by_method.get(method, (0, 0.0))
+            by_method[method] = (method_calls + count, method_seconds + seconds)
+        log.info("  method                      calls      total  share", extra={"gap": True})
+        for method, (count, seconds) in sorted(by_method.items(), key=lambda item: -item[1][1]):
+            share = seconds / total * 100 if total else 0.0
+            log.info("  %-26s %6s %8.1fms %5.0f%%", method, count, seconds * 1000, share)
+
+        width = max(24, max(len(command) for _, command in commands))
+        log.info("  %-26s %-*s %6s %10s %9s %9s", "method", width, "command", "calls", "total", "mean", "max",
+                 extra={"gap": True})
+        for (method, command), (count, seconds, longest) in sorted(commands.items(), key=lambda item: -item[1][1]):
+            log.info("  %-26s %-*s %6s %8.1fms %7.1fms %7.1fms", method, width, command, count, seconds * 1000,
+                     seconds / count * 1000, longest * 1000)
+
+    def write_folded(self, run_id=None):
+        """Write the folded stacks (values in microseconds); returns the path"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        run_id = run_id or datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.output_dir, f"{run_id}.folded")
+        with self.lock:
+            stacks = sorted(self.stacks.items())
+        with open(path, "w") as f:
+            for stack, seconds in stacks:
+                f.write(f"{stack.replace(' ', '_')} {max(1, round(seconds * 1e6))}\n")
+        return path
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# fleet.py
+#
+# Books for many member accounts at once. Member profiles (credentials and a
+# final_schedule each) are read from a fleet file and run concurrently with
+# asyncio through a bounded pool of browser or HTTP sessions. A shared
+# CourtClaims registry keeps two of our own members from going after the
+# same court at the same time.
+#
+# Fleet file format (see fleet_members.example.json):
+#   {
+#     "pool_size": 3,
+#     "members": [
+#       {"name": "alice", "username_env": "ALICE_USERNAME", "password_env": "ALICE_PASSWORD",
+#        "final_schedule": {"Tuesday": [{"court": 1, "time_slot": "6:20 PM - 7:00 PM"}, ...]}}
+#     ]
+#   }
+# Credentials are read from the named environment variables, so the fleet
+# file itself never contains passwords.
+#
+# Usage:
+#   python fleet.py --fleet_file fleet_members.json --verbose
+
+import os
+import json
+import time
+import logging
+import asyncio
+import argparse
+import datetime
+import threading
+
+import run_scheduled_bookings as runner
+from preferences import SlotOptimizer
+from retry_engine import RetryEngine, BudgetExhausted, SaveUncertain, SLOT_TAKEN, SAVE_UNCERTAIN
+from booking_log import setup_logging
+
+log = logging.getLogger(__name__)
+
+DEFAULT_FLEET_FILE = "fleet_members.json"
+DEFAULT_POOL_SIZE = 3
+
+class CourtClaims:
+    """Thread-safe registry of which member is going for which (date, court, start time)"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.claims = {}
+
+    def claim(self, booking_date, court, start_time, member):
+        """True if member may go for this slot (unclaimed, or already theirs)"""
+        key = (booking_date, int(court), start_time)
+        with self.lock:
+            owner = self.claims.setdefault(key, member)
+            return owner == member
+
+    def release(self, booking_date, court, start_time, member):
+        """Give a slot back after a failed attempt"""
+        key = (booking_date, int(court), start_time)
+        with self.lock:
+            if self.claims.get(key) == member:
+                del self.claims[key]
+
+def load_fleet(path):
+    """Read the fleet file and resolve each member's credentials"""
+    with open(path, "r") as f:
+        fleet = json.load(f)
+    members = []
+    for profile in fleet.get("members", []):
+        name = profile["name"]
+        username = profile.get("username") or os.getenv(profile.get("username_env", ""), "")
+        password = os.getenv(profile.get("password_env", ""), "")
+        if not username or not password:
+            log.warning("Skipping member %s: credentials not set (set %s / %s)", name,
+                        profile.get('username_env', 'username'), profile.get('password_env'))
+            continue
+        members.append({
+            "name": name,
+            "username": username,
+            "password": password,
+            "final_schedule": profile.get("final_schedule", {}),
+        })
+    return fleet, members
+
+def claimed_attempt(member, booking_date, claims):
+    """
+    runner.attempt_candidate, but only for slots no teammate has claimed. The
+    claims are given back after a plain failure; after an uncertain Save they
+    are kept, since that court may be ours.
+    """
+    def attempt(booking, candidates, entry):
+        court = entry["court"]
+        starts = [timeslot.split(" - ")[0] for timeslot in entry.get("slots", [entry["time_slot"]])]
+        for n, start_time in enumerate(starts):
+            if not claims.claim(booking_date, court, start_time, member["name"]):
+                log.info("[%s] Court %s at %s is claimed by a teammate; skipping", member['name'], court, start_time)
+                for held in starts[:n]:
+                    claims.release(booking_date, court, held, member["name"])
+                booking.last_failure = SLOT_TAKEN
+                return False
+        booked = False
+        try:
+            booked = runner.attempt_candidate(booking, candidates, entry)
+        finally:
+            if not booked and booking.last_failure != SAVE_UNCERTAIN:
+                for start_time in starts:
+                    claims.release(booking_date, court, start_time, member["name"])
+        return booked
+    return attempt
+
+def book_member_date(booking, member, booking_date, day_schedule, claims, engine, optimizer):
+    """
+    Book one date for one member through the runner's optimizer and retry
+    engine, skipping slots a teammate has claimed
+    """
+    try:
+        if not engine.navigate(booking, booking_date, runner.ORG_ID):
+            return "existing_booking", None
+        entry = runner.book_from_schedule(booking, day_schedule, engine, optimizer,
+                                          attempt=claimed_attempt(member, booking_date, claims))
+    except BudgetExhausted:
+        return "budget_exhausted", None
+    except SaveUncertain as e:
+        # Booking another court could double-book this member; leave the date for a human to check
+        log.error("[%s] Stopped booking %s: %s", member['name'], booking_date, e,
+                  extra={"member": member["name"], "booking_date": booking_date})
+        return "save_uncertain", None
+    if entry:
+        return runner.booked_outcome(entry), entry
+    if engine.remaining() <= 0:
+        return "budget_exhausted", None
+    return "no_slot", None
+
+def run_member(args, config, member, target_dates, claims):
+    """Blocking: log one member in and book all of their target dates"""
+    results = {}
+    started = time.perf_counter()
+    # Members book in parallel under their own logins, so each gets its own Chrome
+    booking = runner.make_booking(args, config, username=member["username"], password=member["password"], attach=False)
+    engine = RetryEngine.from_config(config)
+    optimizer = SlotOptimizer.from_config(config)
+    try:
+        booking.start_browser()
+        booking.login()
+        for target in target_dates:
+            day_schedule = member["final_schedule"].get(target.strftime("%A"), [])
+            if not day_schedule:
+                continue
+            booking_date = target.strftime("%Y-%m-%d")
+            results[booking_date] = book_member_date(booking, member, booking_date, day_schedule, claims,
+                                                     engine, optimizer)
+    except Exception as e:
+        log.error("[%s] Error: %s", member['name'], e, extra={"member": member["name"]})
+        results["error"] = (f"error: {e}", None)
+    finally:
+        booking.close()
+    return results, time.perf_counter() - started
+
+async def run_fleet(args, config, members, target_dates, pool_size):
+    """Run every member through a pool of at most pool_size concurrent sessions"""
+    pool = asyncio.Semaphore(pool_size)
+    claims = CourtClaims()
+
+    async def run_one(member):
+        async with pool:
+            return member["name"], await asyncio.to_thread(run_member, args, config, member, target_dates, claims)
+
+    return await asyncio.gather(*(run_one(member) for member in members))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Book for a fleet of member accounts.")
+    parser.add_argument("--fleet_file", type=str, default=DEFAULT_FLEET_FILE, help="Member profiles JSON file")
+    parser.add_argument("--pool_size", type=int, default=None,
+                        help=f"Maximum concurrent sessions (default: fleet file pool_size or {DEFAULT_POOL_SIZE})")
+    parser.add_argument("--backend", type=str, choices=sorted(runner.BACKENDS), default="browser",
+                        help="Book through headless Chrome (browser, the live site) or the stand-in's API "
+                             "(http: clublocker_standin.py only, needs a local --base_url)")
+    parser.add_argument("--base_url", type=str, default=runner.CLUBLOCKER_BASE_URL,
+                        help="Site to book against (e.g. a local clublocker_standin.py)")
+    parser.add_argument("--current_date", type=str, default=None, help="Simulated current date (YYYY-MM-DD)")
+    parser.add_argument("--dates", type=str, default=None, help="Comma-separated target dates (YYYY-MM-DD)")
+    parser.add_argument("--date_range", type=str, default=None, help="Inclusive target date range (YYYY-MM-DD:YYYY-MM-DD)")
+    parser.add_argument("--test", action="store_true", help="Run in test (dry-run) mode.")
+    parser.add_argument("--verbose", action="store_true", help="Output detailed debug information.")
+    parser.add_argument("--show_browser", action="store_true", help="Show browser windows during booking")
+    parser.add_argument("--no_session_cache", action="store_true", help="Always log in with the form")
+    args = parser.parse_args()
+    runner.check_backend(parser, args)
+    return args
+
+def main():
+    args = parse_args()
+    setup_logging(args.verbose)
+    config = runner.load_config()
+    fleet, members = load_fleet(args.fleet_file)
+    if not members:
+        log.info("No members with credentials found; exiting")
+        return
+
+    if args.current_date:
+        current_dt = datetime.datetime.strptime(args.current_date, "%Y-%m-%d")
+    else:
+        current_dt = datetime.datetime.now()
+    target_dates = runner.resolve_target_dates(args, current_dt)
+    pool_size = args.pool_size or fleet.get("pool_size", DEFAULT_POOL_SIZE)
+
+    log.info("Fleet Booking Runner Test Mode" if args.test else "Fleet Booking Runner", extra={"banner": "-"})
+    log.info("Members: %s  Pool size: %s  Backend: %s", len(members), pool_size, args.backend)
+    log.info("Target booking dates: %s", ', '.join(str(d) for d in target_dates))
+
+    started = time.perf_counter()
+    outcomes = asyncio.run(run_fleet(args, config, members, target_dates, pool_size))
+    elapsed = time.perf_counter() - started
+
+    log.info("Fleet results", extra={"banner": "-"})
+    booked = 0
+    attempted = 0
+    for name, (results, member_seconds) in outcomes:
+        if not results:
+            log.info("  %-16s nothing scheduled (%.1fs)", name, member_seconds)
+        for booking_date, (outcome, entry) in sorted(results.items()):
+            attempted += 1
+            detail = ""
+            if entry:
+                booked += 1
+                detail = f"Court {entry['court']} at {entry['time_slot']}"
+            log.info("  %-16s %-10s %-17s %s (%.1fs)", name, booking_date, outcome, detail, member_seconds)
+
+    log.info("Throughput", extra={"banner": "-"})
+    log.info("  Wall time:      %.1fs", elapsed)
+    log.info("  Members/minute: %.1f", len(members) / elapsed * 60)
+    log.info("  Bookings:       %s/%s member-dates", booked, attempted)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# grid_snapshot.py
+#
+# Backend-independent index of one day's reservation grid. The browser
+# backend fills it from a single execute_script call, the HTTP backend from
+# the grid endpoint's JSON.
+
+from availability import AvailabilityMatrix, parse_clock
+
+class GridSnapshot:
+    """In-memory index of the reservation grid keyed by (court, start time)"""
+    def __init__(self, raw_slots):
+        self.slots = {}
+        self.court_counts = {}
+        self._availability = None
+        for raw in raw_slots:
+            court = int(raw["court"])
+            self.court_counts[court] = self.court_counts.get(court, 0) + 1
+            
+            # The first line of the title holds the time range, e.g. "6:00 PM - 6:40 PM"
+            time_range = (raw.get("title") or "").split("\n")[0]
+            start_time, _, end_time = time_range.partition(" - ")
+            key = (court, start_time)
+            if key in self.slots:
+                # Keep the first match, like the old linear scan did
+                continue
+            classes = raw.get("classes") or ""
+            self.slots[key] = {
+                "court": court,
+                "time_range": time_range,
+                "start_minute": parse_clock(start_time),
+                "end_minute": parse_clock(end_time),
+                "classes": classes,
+                "open": "slot open" in classes,
+                "element": raw.get("element"),
+            }
+            
+    def __len__(self):
+        return len(self.slots)
+        
+    def get(self, court_number, start_time):
+        """Return the slot entry for a court and start time, or None"""
+        return self.slots.get((int(court_number), start_time))
+        
+    def open_slots(self):
+        """Return all open slot entries"""
+        return [entry for entry in self.slots.values() if entry["open"]]
+        
+    def availability(self):
+        """Bitmap view of this grid (built on first use)"""
+        if self._availability is None:
+            self._availability = AvailabilityMatrix.from_snapshot(self)
+        return self._availability
+        
+    def open_keys(self):
+        """Return the set of (court, start time) keys that are open"""
+        return {key for key, entry in self.slots.items() if entry["open"]}
+        
+    def diff(self, previous):
+        """
+        Compare with an earlier snapshot of the same day.
+        Returns (opened, closed): sets of (court, start time) keys.
+        """
+        before = previous.open_keys() if previous is not None else set()
+        after = self.open_keys()
+        return after - before, before - after
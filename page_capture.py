@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# page_capture.py
+#
+# Saves the pages a live browser run reads, for offline replay. Each capture
+# is a pair of files under <directory>/<booking date>/:
+#   <timestamp>-grid.html          the rendered page (driver.page_source)
+#   <timestamp>-grid.json          what the live script extracted from it
+# (and the same for "reservations"). The JSON is the expected result:
+# benchmarks/bench_replay.py re-parses the HTML with page_parser.py and
+# checks that it gets the same slots and rows.
+
+import os
+import json
+import datetime
+
+DEFAULT_CAPTURE_DIR = "captures"
+CAPTURE_KINDS = ("grid", "reservations")
+
+class PageCapture:
+    """Writes page captures for one run"""
+    def __init__(self, directory=DEFAULT_CAPTURE_DIR):
+        self.directory = directory
+        self.saved = 0
+
+    def save(self, kind, booking_date, page_html, extracted, url=None):
+        """Write one capture; returns the path of its HTML file"""
+        day_dir = os.path.join(self.directory, booking_date or "undated")
+        os.makedirs(day_dir, exist_ok=True)
+        now = datetime.datetime.now()
+        base = os.path.join(day_dir, f"{now.strftime('%Y%m%d-%H%M%S-%f')}-{kind}")
+        with open(base + ".html", "w", encoding="utf-8") as f:
+            f.write(page_html)
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump({
+                "kind": kind,
+                "booking_date": booking_date,
+                "captured_at": now.isoformat(timespec="seconds"),
+                "url": url,
+                "extracted": extracted,
+            }, f, indent=4)
+        self.saved += 1
+        return base + ".html"
+
+def load_captures(directory=DEFAULT_CAPTURE_DIR, kind=None):
+    """Every capture under directory in capture order, as its JSON dict plus an "html" path"""
+    captures = []
+    if not os.path.isdir(directory):
+        return captures
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not name.endswith(".json"):
+                continue
+            html_path = os.path.join(root, name[:-len(".json")] + ".html")
+            if not os.path.exists(html_path):
+                continue
+            with open(os.path.join(root, name), "r", encoding="utf-8") as f:
+                capture = json.load(f)
+            if kind is not None and capture.get("kind") != kind:
+                continue
+            capture["html"] = html_path
+            captures.append(capture)
+    captures.sort(key=lambda c: (c.get("captured_at") or "", c["html"]))
+    return captures
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# page_parser.py
+#
+# Offline parsing of saved ClubLocker pages (see page_capture.py). It pulls
+# out the same data the browser backend reads with a script call:
+#   parse_grid_html          -> raw slots, like GRID_SNAPSHOT_SCRIPT
+#   parse_reservations_html  -> {date, time} rows, like RESERVATIONS_SCRAPE_SCRIPT
+# The selectors mirror those scripts, so a change there must be made here too.
+# lxml (in requirements.txt) is the parser. A slower parser built on the
+# standard library's HTMLParser gives the same results; it is used when asked
+# for with parser="stdlib", and as a fallback, with a warning, when lxml is
+# not installed.
+
+import logging
+from html.parser import HTMLParser
+
+try:
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
+log = logging.getLogger(__name__)
+
+PARSERS = ("lxml", "stdlib")
+RESERVATION_ROW_XPATH = "//div[contains(@class, 'row')]//div[contains(@class, 'date-and-time')]"
+# Elements that never get an end tag
+VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+_warned_fallback = False
+
+def default_parser():
+    """lxml, or stdlib (with a one-time warning) if lxml is missing"""
+    global _warned_fallback
+    if lxml_html is not None:
+        return "lxml"
+    if not _warned_fallback:
+        log.warning("lxml is not installed (pip install -r requirements.txt); using the slower stdlib parser")
+        _warned_fallback = True
+    return "stdlib"
+
+def class_token_xpath(name):
+    """XPath predicate for a CSS class selector (.name)"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+def parse_grid_html(text, parser=None):
+    """Raw grid slots ({court, title, classes}) from a saved grid page"""
+    if (parser or default_parser()) == "lxml":
+        return _lxml_grid(text)
+    reader = _GridReader()
+    reader.feed(text)
+    reader.close()
+    return reader.slots
+
+def parse_reservations_html(text, parser=None):
+    """{date, time} rows from a saved My Reservations page"""
+    if (parser or default_parser()) == "lxml":
+        return _lxml_reservations(text)
+    reader = _ReservationsReader()
+    reader.feed(text)
+    reader.close()
+    return reader.rows
+
+def _lxml_grid(text):
+    if lxml_html is None:
+        raise ImportError("lxml is not installed (pip install lxml)")
+    inner = lxml_html.fromstring(text).xpath(f"(//div[{class_token_xpath('courts-container-inner')}])[1]")
+    if not inner:
+        return []
+    columns = [
+        child for child in inner[0]
+        if isinstance(child.tag, str) and "column slots" in (child.get("class") or "")
+    ]
+    slots = []
+    for index, column in enumerate(columns):
+        for el in column.xpath(".//usq-reservation-grid-slot//div"):
+            classes = el.get("class") or ""
+            if "slot" not in classes:
+                continue
+            slots.append({"court": index + 1, "title": el.get("title") or "", "classes": classes})
+    return slots
+
+def _lxml_reservations(text):
+    if lxml_html is None:
+        raise ImportError("lxml is not installed (pip install lxml)")
+    rows = []
+    for row in lxml_html.fromstring(text).xpath(RESERVATION_ROW_XPATH):
+        date = row.xpath(f".//*[{class_token_xpath('date')}]")
+        time = row.xpath(f".//*[{class_token_xpath('time')}]")
+        rows.append({
+            "date": date[0].text_content().strip() if date else "",
+            "time": time[0].text_content().strip() if time else "",
+        })
+    return rows
+
+class _TreeReader(HTMLParser):
+    """HTMLParser that keeps the stack of open elements"""
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        depth = len(self.stack)
+        if tag not in VOID_ELEMENTS:
+            self.stack.append(tag)
+        self.open_element(tag, attrs.get("class") or "", attrs, depth)
+
+    def handle_endtag(self, tag):
+        if tag in VOID_ELEMENTS or tag not in self.stack:
+            return
+        while self.stack.pop() != tag:
+            pass
+        self.closed_to(len(self.stack))
+
+    def close(self):
+        super().close()
+        # Unclosed elements end with the document
+        self.stack = []
+        self.closed_to(0)
+
+    def open_element(self, tag, classes, attrs, depth):
+        pass
+
+    def closed_to(self, depth):
+        """Every element at this depth or deeper has been closed"""
+        pass
+
+class _GridReader(_TreeReader):
+    def __init__(self):
+        super().__init__()
+        self.slots = []
+        self.inner_depth = None
+        self.inner_seen = False
+        self.columns = 0
+        self.column_depth = None
+        self.host_depth = None
+
+    def open_element(self, tag, classes, attrs, depth):
+        if self.inner_depth is None:
+            # Only the first courts-container-inner counts, like querySelector
+            if not self.inner_seen and tag == "div" and "courts-container-inner" in classes.split():
+                self.inner_depth = depth
+                self.inner_seen = True
+            return
+        if depth == self.inner_depth + 1:
+            if "column slots" in classes:
+                self.columns += 1
+                self.column_depth = depth
+            return
+        if self.column_depth is None:
+            return
+        if tag == "usq-reservation-grid-slot":
+            if self.host_depth is None:
+                self.host_depth = depth
+        elif self.host_depth is not None and tag == "div" and "slot" in classes:
+            self.slots.append({"court": self.columns, "title": attrs.get("title") or "", "classes": classes})
+
+    def closed_to(self, depth):
+        if self.host_depth is not None and depth <= self.host_depth:
+            self.host_depth = None
+        if self.column_depth is not None and depth <= self.column_depth:
+            self.column_depth = None
+        if self.inner_depth is not None and depth <= self.inner_depth:
+            self.inner_depth = None
+
+class _ReservationsReader(_TreeReader):
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        # Depths of the open div.row-like and div.date-and-time-like elements
+        self.row_depths = []
+        self.entry_depth = None
+        # field -> depth of the element whose text is being collected
+        self.collecting = {}
+        self.text = {}
+
+    def open_element(self, tag, classes, attrs, depth):
+        if tag != "div" and self.entry_depth is None:
+            return
+        if self.entry_depth is None:
+            if "date-and-time" in classes and self.row_depths:
+                self.entry_depth = depth
+                self.rows.append({"date": "", "time": ""})
+                self.collecting = {}
+                self.text = {}
+            elif "row" in classes:
+                self.row_depths.append(depth)
+            return
+        tokens = classes.split()
+        for field in ("date", "time"):
+            # First match only, like querySelector
+            if field in tokens and field not in self.text:
+                self.text[field] = []
+                self.collecting[field] = depth
+
+    def handle_data(self, data):
+        for field in self.collecting:
+            self.text[field].append(data)
+
+    def closed_to(self, depth):
+        for field, field_depth in list(self.collecting.items()):
+            if depth <= field_depth:
+                del self.collecting[field]
+                self.rows[-1][field] = "".join(self.text[field]).strip()
+        if self.entry_depth is not None and depth <= self.entry_depth:
+            self.entry_depth = None
+        while self.row_depths and depth <= self.row_depths[-1]:
+            self.row_depths.pop()
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# preferences.py
+#
+# Weighted scoring of the open slots in a grid snapshot. The saved schedule
+# nests time rank outside court rank, so the 2nd-ranked time on the best
+# court always beats the best time on the 5th-ranked court. Here every open
+# (court, start) listed in the schedule gets a score instead (lower is better):
+#
+#   time_weight * time rank + court_weight * court rank + group weight of the court
+#
+# Ranks are 0-based and read from the order of the day's schedule. The group
+# weight is looked up by the court's timetable group (courts 1-3, courts 4-7).
+# Without a time_weight, time rank always wins and the order is exactly the
+# saved schedule's.
+#
+# A goal of `slots` > 1 asks for that many back-to-back slots on one court
+# (e.g. 2 x 40 minutes for doubles). Such a block is scored by its first slot.
+# Candidate starts come from the AvailabilityMatrix bitmaps, ANDed with a
+# per-court mask of the (court, start) pairs the schedule lists, so one pass
+# over the open bits scores everything and nothing unlisted is ever booked.
+
+from availability import bits, parse_clock
+from timetable import Timetable, format_range
+
+class SlotOptimizer:
+    """Scores open slots (or blocks of back-to-back slots) against the day's rankings"""
+    def __init__(self, time_weight=None, court_weight=1.0, group_weights=None, slots=1, timetable=None):
+        self.time_weight = time_weight
+        self.court_weight = court_weight
+        self.group_weights = list(group_weights or [])
+        self.slots = max(1, int(slots))
+        self.timetable = timetable or Timetable.from_config({})
+        # court -> group weight
+        self.court_group_weight = {}
+        for index, group in enumerate(self.timetable.groups):
+            weight = self.group_weights[index] if index < len(self.group_weights) else 0.0
+            for court in group.courts:
+                self.court_group_weight[court] = weight
+
+    @classmethod
+    def from_config(cls, config):
+        preferences = config.get("preferences", {})
+        return cls(
+            time_weight=preferences.get("time_weight"),
+            court_weight=preferences.get("court_weight", 1.0),
+            group_weights=preferences.get("group_weights"),
+            slots=preferences.get("slots", 1),
+            timetable=Timetable.from_config(config),
+        )
+
+    @staticmethod
+    def rankings(day_schedule):
+        """(start minute -> time rank, court -> court rank) in order of first appearance"""
+        time_rank = {}
+        court_rank = {}
+        for entry in day_schedule:
+            start = parse_clock(entry["time_slot"].split(" - ")[0])
+            if start is not None:
+                time_rank.setdefault(start, len(time_rank))
+            court_rank.setdefault(int(entry["court"]), len(court_rank))
+        return time_rank, court_rank
+
+    def effective_time_weight(self, court_rank):
+        if self.time_weight is not None:
+            return self.time_weight
+        # Big enough that no court preference outweighs one step of time rank
+        return self.court_weight * max(len(court_rank), 1) + max(self.court_group_weight.values(), default=0)
+
+    def scored(self, matrix, day_schedule):
+        """Yield (score, time rank, court rank, court, start minute) for every open listed candidate"""
+        time_rank, court_rank = self.rankings(day_schedule)
+        time_weight = self.effective_time_weight(court_rank)
+        # tick -> (time rank, start minute) for the ranked times that fall on a tick
+        ranked_ticks = {}
+        for start, rank in time_rank.items():
+            tick = matrix.tick(start)
+            if tick is not None:
+                ranked_ticks[tick] = (rank, start)
+        # court -> bitmap of the start ticks listed for it; other pairs are never booked
+        listed = {}
+        for entry in day_schedule:
+            tick = matrix.tick(parse_clock(entry["time_slot"].split(" - ")[0]))
+            if tick is not None:
+                court = int(entry["court"])
+                listed[court] = listed.get(court, 0) | 1 << tick
+        for court, c_rank in court_rank.items():
+            court_score = self.court_weight * c_rank + self.court_group_weight.get(court, 0.0)
+            for tick in bits(matrix.run_starts(court, self.slots) & listed.get(court, 0)):
+                t_rank, start = ranked_ticks[tick]
+                yield (time_weight * t_rank + court_score, t_rank, c_rank, court, start)
+
+    def entry(self, matrix, court, start, score):
+        """A schedule entry for the candidate; "slots" lists every slot of a block"""
+        length = matrix.slot_ticks[court] * matrix.tick_minutes
+        slots = [format_range(start + n * length, start + (n + 1) * length) for n in range(self.slots)]
+        return {"court": court, "time_slot": slots[0], "slots": slots, "score": score}
+
+    def rank(self, matrix, day_schedule):
+        """Open candidates as schedule entries, best score first"""
+        return [
+            self.entry(matrix, court, start, score)
+            for score, _, _, court, start in sorted(self.scored(matrix, day_schedule))
+        ]
+
+    def block_slots(self, entry):
+        """
+        The time slots of the block that starts at entry, read off the
+        timetable; None if the court has fewer than `slots` slots left
+        """
+        if self.slots == 1:
+            return [entry["time_slot"]]
+        court = int(entry["court"])
+        start = parse_clock(entry["time_slot"].split(" - ")[0])
+        slots = []
+        for _ in range(self.slots):
+            end = self.timetable.slot_end(court, start) if start is not None else None
+            if end is None:
+                return None
+            slots.append(format_range(start, end))
+            start = end
+        return slots
+
+    def order(self, day_schedule):
+        """
+        The day's candidates sorted by score alone, for use before release
+        when nothing is open yet to score against. With `slots` > 1 each
+        entry lists its block's slots; starts without a full block are left out.
+        """
+        time_rank, court_rank = self.rankings(day_schedule)
+        time_weight = self.effective_time_weight(court_rank)
+        keyed = []
+        for entry in day_schedule:
+            slots = self.block_slots(entry)
+            if slots is None:
+                continue
+            court = int(entry["court"])
+            t_rank = time_rank.get(parse_clock(entry["time_slot"].split(" - ")[0]), len(time_rank))
+            c_rank = court_rank[court]
+            score = time_weight * t_rank + self.court_weight * c_rank + self.court_group_weight.get(court, 0.0)
+            keyed.append((score, t_rank, c_rank, dict(entry, slots=slots, score=score)))
+        keyed.sort(key=lambda item: item[:3])
+        return [entry for _, _, _, entry in keyed]
+
+    def best(self, matrix, day_schedule):
+        """The best open candidate, or None"""
+        found = min(self.scored(matrix, day_schedule), default=None)
+        if found is None:
+            return None
+        score, _, _, court, start = found
+        return self.entry(matrix, court, start, score)
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# release_timer.py
+#
+# Helpers for firing a booking at the exact moment courts are released.
+# The local clock is corrected against the server's HTTP Date header, and
+# every function takes its clock/sleep as parameters so the whole flow can be
+# exercised against clublocker_standin.py with a FakeClock.
+
+import time
+import datetime
+from zoneinfo import ZoneInfo
+
+DEFAULT_RELEASE_TIMEZONE = "America/New_York"
+# How long to keep probing for the server's Date header to tick over
+OFFSET_PROBE_SECONDS = 1.5
+# Sleep in coarse steps until this close to the target, then in fine steps
+FINE_WAIT_SECONDS = 0.5
+FINE_SLEEP_SECONDS = 0.002
+
+class FakeClock:
+    """Deterministic stand-in for time.time/time.sleep"""
+    def __init__(self, start=0.0):
+        self.now = float(start)
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(0.0, seconds)
+
+def fetch_server_date(url, timeout=5):
+    """Return the server's Date header as epoch seconds (whole-second resolution)"""
+    # Imported here: urllib.request is slow to load and planning runs never need it
+    import urllib.request
+    from email.utils import parsedate_to_datetime
+    request = urllib.request.Request(url, method="HEAD")
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        header = response.headers.get("Date")
+    if not header:
+        raise ValueError(f"No Date header returned by {url}")
+    return parsedate_to_datetime(header).timestamp()
+
+def measure_clock_offset(url, clock=time.time, fetch=fetch_server_date, probe_seconds=OFFSET_PROBE_SECONDS):
+    """
+    Estimate server_time - local_time in seconds.
+
+    The Date header only has one-second resolution, so requests are sent back
+    to back until the reported second ticks over. The tick happened between
+    the last request that saw the old second and the first one that saw the
+    new second, which pins the offset down to roughly one round trip.
+    """
+    previous = None
+    fallback = None
+    deadline = clock() + probe_seconds
+    while True:
+        sent = clock()
+        server_second = fetch(url)
+        received = clock()
+        if fallback is None:
+            # Date truncates, so the true server time is on average half a second later
+            fallback = server_second + 0.5 - (sent + received) / 2
+        if previous is not None and server_second > previous[0]:
+            boundary_local = (previous[1] + received) / 2
+            return server_second - boundary_local
+        previous = (server_second, sent)
+        if clock() >= deadline:
+            return fallback
+
+def release_instant(release_time, on_date, timezone=DEFAULT_RELEASE_TIMEZONE):
+    """Return the epoch seconds for "HH:MM[:SS]" on on_date in the given timezone"""
+    fmt = "%H:%M:%S" if release_time.count(":") == 2 else "%H:%M"
+    parsed = datetime.datetime.strptime(release_time, fmt).time()
+    moment = datetime.datetime.combine(on_date, parsed, tzinfo=ZoneInfo(timezone))
+    return moment.timestamp()
+
+def wait_until(target, clock=time.time, sleep=time.sleep):
+    """Sleep until the local clock reaches target; returns how late we woke (seconds)"""
+    while True:
+        remaining = target - clock()
+        if remaining <= 0:
+            return -remaining
+        if remaining > FINE_WAIT_SECONDS:
+            sleep(remaining - FINE_WAIT_SECONDS)
+        else:
+            sleep(min(remaining, FINE_SLEEP_SECONDS))
+
+def wait_for_release(release_epoch, clock_offset, clock=time.time, sleep=time.sleep):
+    """Wait until the server clock reaches release_epoch; returns lateness in seconds"""
+    local_target = release_epoch - clock_offset
+    return wait_until(local_target, clock=clock, sleep=sleep)
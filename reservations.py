@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# reservations.py
+#
+# The member's own reservations, read once per session and kept as a set of
+# "YYYY-MM-DD" dates. Both booking backends consult it before booking a date
+# and add to it after a successful booking, so the My Reservations view is
+# only opened once per run.
+
+import logging
+import datetime
+
+log = logging.getLogger(__name__)
+
+WEEKDAY_ABBREVIATIONS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+def parse_reservation_date(text, reference=None):
+    """
+    Resolve a yearless row date like "Thu, Apr 10" to a date.
+
+    The list has no year, so the year is chosen among the reference year and
+    its neighbours: the candidate whose weekday matches wins, nearest to the
+    reference date (today by default). This keeps "Mon, Jan 5" seen on
+    Dec 30 in the right year. Returns None if the text can't be read.
+    """
+    reference = reference or datetime.date.today()
+    try:
+        weekday, month_day = [part.strip() for part in text.split(",", 1)]
+    except (AttributeError, ValueError):
+        return None
+    matches = []
+    for year in (reference.year - 1, reference.year, reference.year + 1):
+        try:
+            candidate = datetime.datetime.strptime(f"{month_day} {year}", "%b %d %Y").date()
+        except ValueError:
+            # e.g. Feb 29 outside a leap year
+            continue
+        if WEEKDAY_ABBREVIATIONS[candidate.weekday()] == weekday[:3].title():
+            matches.append(candidate)
+    if not matches:
+        return None
+    return min(matches, key=lambda d: abs((d - reference).days))
+
+class ReservationCache:
+    """Dates (YYYY-MM-DD) on which the member already holds a reservation"""
+    def __init__(self, dates=()):
+        self.dates = set(dates)
+
+    @classmethod
+    def from_rows(cls, rows, reference=None):
+        """Build from scraped {"date": "Thu, Apr 10", "time": ...} rows"""
+        cache = cls()
+        for row in rows:
+            parsed = parse_reservation_date(row.get("date"), reference)
+            if parsed is None:
+                log.warning("Error parsing booking date: %r", row.get('date'))
+                continue
+            cache.add(parsed.strftime("%Y-%m-%d"))
+        return cache
+
+    def add(self, booking_date):
+        self.dates.add(booking_date)
+
+    def __contains__(self, booking_date):
+        return booking_date in self.dates
+
+    def __len__(self):
+        return len(self.dates)
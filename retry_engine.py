@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# retry_engine.py
+#
+# Deadline-aware retries for the booking phase. Every failed navigation or
+# booking attempt is sorted into a failure kind, and the kind decides how to
+# recover:
+#   stale            the grid re-rendered under us  -> re-snapshot, retry the candidate
+#   timeout          a wait ran out (e.g. Save never enabled) -> re-snapshot, retry
+#   slot_taken       someone else got it            -> next candidate, no delay
+#   session_expired  logged out / browser gone      -> new session, log in, retry
+#   navigation       transient network/page error   -> reload the date, retry
+#   save_uncertain   failed after Save was clicked  -> re-read reservations first:
+#                    booked means done, otherwise reload the date and retry
+#   unknown          anything else                  -> re-snapshot, next candidate
+# A Save that may have gone through is never followed by another court on the
+# same date until the reservations show it didn't (SaveUncertain otherwise).
+# Loading a date is retried only for the transient kinds. Retries back off
+# with full jitter and never sleep past the run's budget. Exceptions are
+# matched by class name so this module imports neither Selenium nor requests.
+
+import time
+import random
+import logging
+
+log = logging.getLogger(__name__)
+
+STALE = "stale"
+TIMEOUT = "timeout"
+SLOT_TAKEN = "slot_taken"
+SESSION_EXPIRED = "session_expired"
+NAVIGATION = "navigation"
+SAVE_UNCERTAIN = "save_uncertain"
+UNKNOWN = "unknown"
+
+RESNAPSHOT = "resnapshot"
+NEXT_CANDIDATE = "next_candidate"
+RELOGIN = "relogin"
+RENAVIGATE = "renavigate"
+VERIFY = "verify"
+
+# Failure kind -> (recovery, retry the same candidate?)
+RECOVERY = {
+    STALE: (RESNAPSHOT, True),
+    TIMEOUT: (RESNAPSHOT, True),
+    SLOT_TAKEN: (NEXT_CANDIDATE, False),
+    SESSION_EXPIRED: (RELOGIN, True),
+    NAVIGATION: (RENAVIGATE, True),
+    SAVE_UNCERTAIN: (VERIFY, True),
+    UNKNOWN: (RESNAPSHOT, False),
+}
+# Kinds worth loading a date again for; anything else is a bug or a real answer
+TRANSIENT = {STALE, TIMEOUT, SESSION_EXPIRED, NAVIGATION}
+
+DEFAULT_BUDGET_SECONDS = 90.0
+DEFAULT_BASE_DELAY = 0.2
+DEFAULT_MAX_DELAY = 2.0
+DEFAULT_MAX_ATTEMPTS = 3
+
+SESSION_EXPIRED_MESSAGES = ("invalid session id", "session deleted", "no such window", "not logged in")
+# Exception class names per failure kind (Selenium, requests and builtins)
+STALE_ERRORS = {"StaleElementReferenceException", "ElementClickInterceptedException", "ElementNotInteractableException"}
+TIMEOUT_ERRORS = {"TimeoutException", "Timeout", "ReadTimeout", "TimeoutError"}
+NAVIGATION_ERRORS = {"ConnectionError", "ConnectTimeout", "WebDriverException", "URLError", "OSError"}
+
+def classify_failure(error):
+    """Map an exception (or HTTP status) to a failure kind"""
+    if isinstance(error, str):
+        return error
+    names = {cls.__name__ for cls in type(error).__mro__}
+    message = str(error).lower()
+    status = getattr(error, "status", None)
+    if status in (401, 403) or any(text in message for text in SESSION_EXPIRED_MESSAGES):
+        return SESSION_EXPIRED
+    if status == 409:
+        return SLOT_TAKEN
+    if names & STALE_ERRORS:
+        return STALE
+    if names & TIMEOUT_ERRORS:
+        return TIMEOUT
+    if names & NAVIGATION_ERRORS or (status is not None and status >= 500):
+        return NAVIGATION
+    return UNKNOWN
+
+class BudgetExhausted(Exception):
+    """Raised when the run's retry budget is spent"""
+
+class Cancelled(Exception):
+    """Raised by attempt_one to stop booking at once (another racing session has the date)"""
+
+class SaveUncertain(Exception):
+    """Raised when Save may have booked a court but the reservations can't be read to tell"""
+    def __init__(self, booking_date):
+        super().__init__(f"could not confirm whether the booking on {booking_date} went through")
+        self.booking_date = booking_date
+
+class RetryEngine:
+    """Books a day's candidates, recovering from failures until the time budget runs out"""
+    def __init__(self, budget_seconds=DEFAULT_BUDGET_SECONDS, base_delay=DEFAULT_BASE_DELAY,
+                 max_delay=DEFAULT_MAX_DELAY, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                 clock=time.monotonic, sleep=time.sleep, rng=random.random):
+        self.budget = budget_seconds
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng
+        self.deadline = None
+        # (kind, recovery, candidate or None) for every failure seen
+        self.failures = []
+
+    @classmethod
+    def from_config(cls, config, budget_seconds=None):
+        retry_config = config.get("retry", {})
+        return cls(
+            budget_seconds=budget_seconds or retry_config.get("budget_seconds", DEFAULT_BUDGET_SECONDS),
+            base_delay=retry_config.get("base_delay_seconds", DEFAULT_BASE_DELAY),
+            max_delay=retry_config.get("max_delay_seconds", DEFAULT_MAX_DELAY),
+            max_attempts=retry_config.get("max_attempts_per_candidate", DEFAULT_MAX_ATTEMPTS),
+        )
+
+    def start(self):
+        """Start the budget clock (first use starts it automatically)"""
+        if self.deadline is None:
+            self.deadline = self.clock() + self.budget
+
+    def restart(self):
+        """Start the budget afresh, e.g. once a deliberate wait for release is over"""
+        self.deadline = self.clock() + self.budget
+
+    def remaining(self):
+        self.start()
+        return max(0.0, self.deadline - self.clock())
+
+    def backoff(self, attempt):
+        """Sleep a full-jitter delay for this attempt, capped by the remaining budget"""
+        delay = self.rng() * min(self.max_delay, self.base_delay * (2 ** attempt))
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise BudgetExhausted()
+        self.sleep(min(delay, remaining))
+
+    def record(self, kind, entry=None):
+        recovery = RECOVERY[kind][0]
+        self.failures.append((kind, recovery, entry))
+        label = f" on Court {entry['court']} at {entry['time_slot']}" if entry else ""
+        log.info("[RETRY] %s%s -> %s (%.1fs left)", kind, label, recovery.replace('_', ' '), self.remaining(),
+                 extra={"failure": kind, "recovery": recovery,
+                        "court": entry["court"] if entry else None, "time_slot": entry["time_slot"] if entry else None})
+        return recovery
+
+    def recover(self, booking, recovery, booking_date, org_id):
+        """Run a recovery action; failures inside it are left to the caller's loop"""
+        if recovery == RELOGIN:
+            if booking.session_cache is not None:
+                # The cached session is the one that just expired
+                booking.session_cache.clear(booking.session_key)
+            booking.close()
+            booking.session_restored = False
+            booking.start_browser()
+            booking.login()
+            booking.navigate_to_date(booking_date, org_id, check_existing=False)
+        elif recovery == RENAVIGATE:
+            booking.navigate_to_date(booking_date, org_id, check_existing=False)
+        elif recovery == RESNAPSHOT:
+            booking.refresh_grid()
+
+    def save_went_through(self, booking, booking_date, org_id):
+        """
+        After a Save with an unknown outcome, re-read the member's reservations:
+        True if booking_date now has a booking. Raises SaveUncertain if they
+        can't be read, since booking another court could then double-book.
+        """
+        for attempt in range(2):
+            booking.clear_reservations()
+            booked = booking.check_existing_bookings(booking_date)
+            if booking.reservations is not None:
+                return booked
+            if attempt == 0:
+                try:
+                    # A dialog left open can hide the reservations button; start from a clean grid
+                    booking.navigate_to_date(booking_date, org_id, check_existing=False)
+                except Exception as e:
+                    log.warning("[RETRY] Reloading %s failed: %s", booking_date, e,
+                                extra={"booking_date": booking_date})
+        raise SaveUncertain(booking_date)
+
+    def navigate(self, booking, booking_date, org_id):
+        """navigate_to_date with retries for transient failures; returns its result"""
+        attempt = 0
+        while True:
+            try:
+                return booking.navigate_to_date(booking_date, org_id)
+            except Exception as e:
+                kind = classify_failure(e)
+                if kind not in TRANSIENT:
+                    raise
+                log.warning("[RETRY] Loading %s failed: %s", booking_date, e, extra={"booking_date": booking_date})
+                recovery = self.record(kind)
+                attempt += 1
+                self.backoff(attempt)
+                if recovery == RELOGIN:
+                    try:
+                        self.recover(booking, RELOGIN, booking_date, org_id)
+                    except Exception as relogin_error:
+                        log.warning("[RETRY] Log-in failed: %s", relogin_error)
+
+    def book(self, booking, candidates, booking_date, org_id, attempt_one):
+        """
+        Work through the open candidates (best first) with attempt_one(entry),
+        which returns a true value once something is booked (True, or a
+        partial outcome for part of a block), False (not open) or raises
+        (Cancelled passes straight through).
+        Returns the booked entry, or None when the candidates or the budget run out.
+        Raises SaveUncertain if a Save may have booked and that can't be checked.
+        """
+        self.start()
+        queue = list(candidates)
+        index = 0
+        attempt = 0
+        while index < len(queue):
+            if self.remaining() <= 0:
+                log.info("[RETRY] Time budget used up")
+                return None
+            entry = queue[index]
+            try:
+                booking.last_failure = None
+                if attempt_one(entry):
+                    return entry
+                kind = getattr(booking, "last_failure", None) or SLOT_TAKEN
+            except (BudgetExhausted, Cancelled):
+                raise
+            except Exception as e:
+                kind = classify_failure(e)
+            recovery = self.record(kind, entry)
+            if recovery == VERIFY:
+                if self.save_went_through(booking, booking_date, org_id):
+                    log.info("[RETRY] The reservations show a booking on %s; Save went through", booking_date,
+                             extra={"booking_date": booking_date, "outcome": "booked"})
+                    return entry
+                # Not booked; reservations were read off another view, so load the date again
+                recovery = RENAVIGATE
+            attempt += 1
+            if not RECOVERY[kind][1] or attempt >= self.max_attempts:
+                index += 1
+                attempt = 0
+            if recovery == NEXT_CANDIDATE:
+                continue
+            try:
+                self.backoff(attempt)
+                self.recover(booking, recovery, booking_date, org_id)
+            except BudgetExhausted:
+                log.info("[RETRY] Time budget used up")
+                return None
+            except Exception as e:
+                # Recovery itself failed; count it and let the loop try again
+                self.record(classify_failure(e))
+        return None
+
+    def print_summary(self):
+        if not self.failures:
+            return
+        counts = {}
+        for kind, recovery, _ in self.failures:
+            counts[(kind, recovery)] = counts.get((kind, recovery), 0) + 1
+        log.info("Retries:", extra={"gap": True})
+        for (kind, recovery), count in sorted(counts.items()):
+            log.info("  %-16s x%-3s -> %s", kind, count, recovery.replace('_', ' '))
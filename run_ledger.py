@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# run_ledger.py
+#
+# Local SQLite history of booking runs. During a run nothing touches the
+# database: the ledger only keeps references to the grid snapshots it is
+# shown. When the run ends, write() stores everything in one transaction:
+#   runs          one row per run (outcome, duration, backend, test mode,
+#                 site it booked against)
+#   targets       one row per target date with its outcome and booked slot
+#   observations  the state (open/taken/missing) of every ranked slot in the
+#                 grid the run booked from
+#   attempts      every candidate checked, from the run tracer
+#   phases        every traced phase span with its duration
+# Running this file prints win rates per court and time, and latency
+# percentiles per phase, for real runs against the live site: test runs and
+# runs against the stand-in or any other base_url are left out.
+#
+# Usage:
+#   python run_ledger.py                    # report on every real run
+#   python run_ledger.py --day Tuesday --since 2025-01-01
+
+import os
+import math
+import time
+import uuid
+import argparse
+import datetime
+
+from availability import parse_clock
+from booking_log import format_line
+
+DEFAULT_LEDGER_PATH = "booking_ledger.sqlite3"
+PRODUCTION_BASE_URL = "https://clublocker.com"
+DAYS_OF_WEEK = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started_at REAL,
+    duration REAL,
+    outcome TEXT,
+    backend TEXT,
+    test_mode INTEGER,
+    base_url TEXT
+);
+CREATE TABLE IF NOT EXISTS targets (
+    run_id TEXT,
+    booking_date TEXT,
+    weekday TEXT,
+    outcome TEXT,
+    court INTEGER,
+    time_slot TEXT
+);
+CREATE TABLE IF NOT EXISTS observations (
+    run_id TEXT,
+    booking_date TEXT,
+    weekday TEXT,
+    rank INTEGER,
+    court INTEGER,
+    time_slot TEXT,
+    state TEXT
+);
+CREATE TABLE IF NOT EXISTS attempts (
+    run_id TEXT,
+    booking_date TEXT,
+    weekday TEXT,
+    court INTEGER,
+    time_slot TEXT,
+    outcome TEXT,
+    at REAL
+);
+CREATE TABLE IF NOT EXISTS phases (
+    run_id TEXT,
+    phase TEXT,
+    start REAL,
+    seconds REAL,
+    commands INTEGER,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS observations_slot ON observations (weekday, court, time_slot);
+CREATE INDEX IF NOT EXISTS attempts_slot ON attempts (weekday, court, time_slot);
+CREATE INDEX IF NOT EXISTS phases_phase ON phases (phase);
+"""
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+def weekday_of(booking_date):
+    return datetime.datetime.strptime(booking_date, "%Y-%m-%d").strftime("%A")
+
+def connect(path=DEFAULT_LEDGER_PATH):
+    """Open the ledger, creating its tables on first use"""
+    # Only the end of a run needs sqlite3; keep it off the startup path
+    import sqlite3
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    # Ledgers written before runs had a base_url column
+    if "base_url" not in [row[1] for row in conn.execute("PRAGMA table_info(runs)")]:
+        conn.execute("ALTER TABLE runs ADD COLUMN base_url TEXT")
+    return conn
+
+class RunLedger:
+    """Buffers one run in memory and writes it to the ledger in a single transaction"""
+    def __init__(self, path=DEFAULT_LEDGER_PATH, clock=time.time):
+        self.path = path
+        self.clock = clock
+        self.started_at = self.clock()
+        # (booking date, day schedule, snapshot); states are worked out in write()
+        self.observed = []
+
+    def observe(self, booking_date, day_schedule, snapshot):
+        """Remember the grid a date was booked from"""
+        self.observed.append((booking_date, day_schedule, snapshot))
+
+    def observation_rows(self, run_id):
+        rows = []
+        for booking_date, day_schedule, snapshot in self.observed:
+            weekday = weekday_of(booking_date)
+            for rank, entry in enumerate(day_schedule, start=1):
+                slot = snapshot.get(entry["court"], entry["time_slot"].split(" - ")[0])
+                state = "missing" if slot is None else ("open" if slot["open"] else "taken")
+                rows.append((run_id, booking_date, weekday, rank, int(entry["court"]), entry["time_slot"], state))
+        return rows
+
+    def write(self, outcome, results, tracer=None, run_id=None, backend=None, test_mode=False, base_url=None):
+        """
+        Store the run: results is {date: (outcome, entry or None)}; attempts and
+        phases come from the tracer's records since this ledger was created.
+        base_url is the site the run booked against. Returns the run id.
+        """
+        if run_id is None and tracer is not None:
+            run_id = tracer.run_id
+        if run_id is None:
+            started = datetime.datetime.fromtimestamp(self.started_at)
+            run_id = f"{started.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        duration = self.clock() - self.started_at
+        targets = [
+            (run_id, booking_date, weekday_of(booking_date), date_outcome,
+             int(entry["court"]) if entry else None, entry["time_slot"] if entry else None)
+            for booking_date, (date_outcome, entry) in results.items()
+        ]
+        attempts = []
+        phases = []
+        if tracer is not None:
+            with tracer.lock:
+                candidates = [c for c in tracer.candidates if c["at"] >= self.started_at]
+                spans = [s for s in tracer.spans if s["start"] >= self.started_at]
+            attempts = [
+                (run_id, c.get("date"), weekday_of(c["date"]) if c.get("date") else None,
+                 int(c["court"]), c["time_slot"], c["outcome"], c["at"])
+                for c in candidates
+            ]
+            phases = [
+                (run_id, s["name"], s["start"], s["duration"], s.get("commands"), s.get("status"))
+                for s in spans
+            ]
+
+        conn = connect(self.path)
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO runs (run_id, started_at, duration, outcome, backend, test_mode, base_url) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (run_id, self.started_at, duration, outcome, backend, 1 if test_mode else 0,
+                     base_url.rstrip("/") if base_url else None)
+                )
+                conn.executemany("INSERT INTO targets VALUES (?, ?, ?, ?, ?, ?)", targets)
+                conn.executemany("INSERT INTO observations VALUES (?, ?, ?, ?, ?, ?, ?)", self.observation_rows(run_id))
+                conn.executemany("INSERT INTO attempts VALUES (?, ?, ?, ?, ?, ?, ?)", attempts)
+                conn.executemany("INSERT INTO phases VALUES (?, ?, ?, ?, ?, ?)", phases)
+        finally:
+            conn.close()
+        return run_id
+
+def run_filter(since=None, include_test=False, base_url=PRODUCTION_BASE_URL):
+    """
+    SQL condition and parameters selecting runs from the ledger. Runs recorded
+    before the base_url column existed count as production runs.
+    """
+    base_url = base_url.rstrip("/")
+    if base_url == PRODUCTION_BASE_URL:
+        conditions = ["(base_url = ? OR base_url IS NULL)"]
+    else:
+        conditions = ["base_url = ?"]
+    params = [base_url]
+    if not include_test:
+        conditions.append("test_mode = 0")
+    if since:
+        conditions.append("started_at >= ?")
+        params.append(datetime.datetime.strptime(since, "%Y-%m-%d").timestamp())
+    where = " AND ".join(conditions)
+    return f"run_id IN (SELECT run_id FROM runs WHERE {where})", params
+
+def win_rates(conn, since=None, day=None, include_test=False, base_url=PRODUCTION_BASE_URL):
+    """
+    Per (weekday, court, time slot): times seen in a booking grid, times open,
+    times tried and times booked
+    """
+    runs, params = run_filter(since, include_test, base_url)
+    day_filter = " AND weekday = ?" if day else ""
+    day_params = [day] if day else []
+    stats = {}
+    for weekday, court, time_slot, seen, open_count in conn.execute(
+        f"SELECT weekday, court, time_slot, COUNT(*), SUM(state = 'open') FROM observations "
+        f"WHERE {runs}{day_filter} GROUP BY weekday, court, time_slot", params + day_params
+    ):
+        stats[(weekday, court, time_slot)] = {"seen": seen, "open": open_count, "tried": 0, "booked": 0}
+    for weekday, court, time_slot, tried, booked in conn.execute(
+        f"SELECT weekday, court, time_slot, COUNT(*), SUM(outcome = 'booked') FROM attempts "
+        f"WHERE {runs}{day_filter} AND weekday IS NOT NULL GROUP BY weekday, court, time_slot", params + day_params
+    ):
+        row = stats.setdefault((weekday, court, time_slot), {"seen": 0, "open": 0, "tried": 0, "booked": 0})
+        row["tried"] = tried
+        row["booked"] = booked
+    return stats
+
+def latency_percentiles(conn, since=None, include_test=False, base_url=PRODUCTION_BASE_URL):
+    """{phase: {"n", "p50", "p95", "p99", "max"}} in seconds, with whole runs as "run" """
+    runs, params = run_filter(since, include_test, base_url)
+    samples = {}
+    for phase, seconds in conn.execute(f"SELECT phase, seconds FROM phases WHERE {runs}", params):
+        samples.setdefault(phase, []).append(seconds)
+    samples["run"] = [row[0] for row in conn.execute(
+        f"SELECT duration FROM runs WHERE {runs} AND duration IS NOT NULL", params
+    )]
+    return {
+        phase: {
+            "n": len(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+            "max": max(values),
+        }
+        for phase, values in samples.items() if values
+    }
+
+def slot_sort_key(item):
+    (weekday, court, time_slot), _ = item
+    start = parse_clock(time_slot.split(" - ")[0])
+    return (DAYS_OF_WEEK.index(weekday) if weekday in DAYS_OF_WEEK else 7, start if start is not None else 0, court)
+
+def print_report(conn, since=None, day=None, include_test=False, base_url=PRODUCTION_BASE_URL):
+    runs, params = run_filter(since, include_test, base_url)
+    outcomes = conn.execute(
+        f"SELECT outcome, COUNT(*) FROM targets WHERE {runs} GROUP BY outcome ORDER BY COUNT(*) DESC", params
+    ).fetchall()
+    print("\n" + format_line("Target outcomes"))
+    if not outcomes:
+        print("  No matching runs in the ledger")
+        return
+    for outcome, count in outcomes:
+        print(f"  {outcome:<17} {count:>5}")
+
+    print("\n" + format_line("Win rates per court and time"))
+    print(f"  {'day':<10} {'court':>5}  {'time slot':<19} {'seen':>5} {'open':>6} {'tried':>6} {'booked':>6} {'win':>6}")
+    stats = win_rates(conn, since, day, include_test, base_url)
+    for (weekday, court, time_slot), row in sorted(stats.items(), key=slot_sort_key):
+        open_rate = f"{row['open'] / row['seen']:.0%}" if row["seen"] else "-"
+        win_rate = f"{row['booked'] / row['tried']:.0%}" if row["tried"] else "-"
+        print(f"  {weekday:<10} {court:>5}  {time_slot:<19} {row['seen']:>5} {open_rate:>6} "
+              f"{row['tried']:>6} {row['booked']:>6} {win_rate:>6}")
+
+    print("\n" + format_line("Latency per phase"))
+    print(f"  {'phase':<24} {'n':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for phase, stats in sorted(latency_percentiles(conn, since, include_test, base_url).items()):
+        print(f"  {phase:<24} {stats['n']:>5} {stats['p50']:8.3f}s {stats['p95']:8.3f}s "
+              f"{stats['p99']:8.3f}s {stats['max']:8.3f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Report win rates and latency from the booking run ledger.")
+    parser.add_argument("--ledger", type=str, default=DEFAULT_LEDGER_PATH, help="Ledger database to read")
+    parser.add_argument("--since", type=str, default=None, help="Only runs started on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--day", type=str, choices=DAYS_OF_WEEK, default=None, help="Only win rates for this weekday")
+    parser.add_argument("--include_test", action="store_true", help="Include test (dry-run) runs")
+    parser.add_argument("--base_url", type=str, default=PRODUCTION_BASE_URL,
+                        help=f"Report on runs against this site, e.g. a stand-in (default: {PRODUCTION_BASE_URL})")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.ledger):
+        print(f"No ledger at {args.ledger} yet; it is written at the end of each booking run")
+        return
+    conn = connect(args.ledger)
+    try:
+        print_report(conn, args.since, args.day, args.include_test, args.base_url)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
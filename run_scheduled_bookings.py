@@ -5,109 +5,628 @@
 
 import argparse
 import json
+import logging
 import datetime
+import importlib
 import os
-from squash_booking import SquashBooking
+import time
+# The booking backends (Selenium, requests, .env loading) are imported only
+# when a session is actually created; planning never pays for them.
+import release_timer
+from session_cache import SessionCache, DEFAULT_MAX_AGE_HOURS
+from booking_race import BookingRace, RACE_STRATEGIES, DEFAULT_RACE_STRATEGY
+from booking_trace import RunTracer, trace_booking, DEFAULT_TRACE_DIR
+from timetable import PLAN_FILE, load_plan, plan_to_final_schedule
+from retry_engine import RetryEngine, BudgetExhausted, SaveUncertain, SAVE_UNCERTAIN
+from preferences import SlotOptimizer
+from page_capture import DEFAULT_CAPTURE_DIR
+from run_ledger import RunLedger, DEFAULT_LEDGER_PATH
+from command_profiler import CommandProfiler, DEFAULT_PROFILE_DIR
+from booking_log import setup_logging
+
+log = logging.getLogger(__name__)
 
 CONFIG_FILE = "booking_config.json"
 ORG_ID = "10515"
+CLUBLOCKER_BASE_URL = "https://clublocker.com"
+BROWSER_PROFILES = ("default", "lean")
+# Ranked candidates the speculative confirm tries before handing back
+DEFAULT_SPECULATIVE_CANDIDATES = 5
+# Outcome of a date where only the first slots of a back-to-back block were booked
+PARTIAL_BLOCK = "partial_block"
+# Backend name -> (module, class), imported on first use
+BACKENDS = {
+    "browser": ("squash_booking", "SquashBooking"),
+    "http": ("clublocker_http", "ClubLockerHTTPBooking"),
+}
 
 def load_config():
     with open(CONFIG_FILE, "r") as f:
         return json.load(f)
 
+def load_final_schedule(config):
+    """The compiled booking plan if it is current, else the config's final_schedule"""
+    plan = load_plan(PLAN_FILE, config)
+    if plan is not None:
+        return plan_to_final_schedule(plan)
+    if os.path.exists(PLAN_FILE):
+        log.warning("%s is out of date with %s; using final_schedule (recompile with: python timetable.py)", PLAN_FILE,
+                    CONFIG_FILE)
+    return config.get("final_schedule", {})
+
 def parse_args():
     parser = argparse.ArgumentParser(description="Run scheduled bookings.")
     parser.add_argument("--test", action="store_true", help="Run in test (dry-run) mode.")
     parser.add_argument("--verbose", action="store_true", help="Output detailed debug information.")
     parser.add_argument("--current_date", type=str, default=None, help="Simulated current date (YYYY-MM-DD)")
     parser.add_argument("--show_browser", action="store_true", help="Show browser window during booking")
-    return parser.parse_args()
+    parser.add_argument("--dates", type=str, default=None,
+                        help="Comma-separated target dates to book in one session (YYYY-MM-DD,YYYY-MM-DD)")
+    parser.add_argument("--date_range", type=str, default=None,
+                        help="Inclusive range of target dates to book in one session (YYYY-MM-DD:YYYY-MM-DD)")
+    parser.add_argument("--release_at", type=str, default=None,
+                        help="Pre-warm the session, then book at this release time (HH:MM[:SS], server timezone)")
+    parser.add_argument("--release_tz", type=str, default=None,
+                        help=f"Timezone of --release_at (default: {release_timer.DEFAULT_RELEASE_TIMEZONE})")
+    parser.add_argument("--release_window", type=float, default=None,
+                        help="Seconds to keep refreshing the grid after release while nothing is open (default: 30)")
+    parser.add_argument("--base_url", type=str, default=CLUBLOCKER_BASE_URL,
+                        help="Site to book against (e.g. a local clublocker_standin.py)")
+    parser.add_argument("--backend", type=str, choices=sorted(BACKENDS), default="browser",
+                        help="Book through headless Chrome (browser, the live site) or the stand-in's API "
+                             "(http: clublocker_standin.py and benchmarks only, needs a local --base_url)")
+    parser.add_argument("--no_session_cache", action="store_true",
+                        help="Always log in with the form instead of reusing a cached session")
+    parser.add_argument("--browser_profile", type=str, choices=BROWSER_PROFILES, default=None,
+                        help="lean blocks images, fonts and analytics and loads pages eagerly (default: config or default)")
+    parser.add_argument("--attach", type=str, default=None, metavar="HOST:PORT",
+                        help="Use the Chrome already listening for DevTools here (see chrome_supervisor.py) (default: config)")
+    parser.add_argument("--remote_driver", type=str, default=None, metavar="URL",
+                        help="Use a running chromedriver or Selenium server instead of spawning one (default: config)")
+    parser.add_argument("--race", type=int, default=None, metavar="N",
+                        help="Race N logged-in sessions on different top-ranked candidates")
+    parser.add_argument("--race_strategy", type=str, choices=RACE_STRATEGIES, default=None,
+                        help=f"How candidates are spread across racing sessions (default: {DEFAULT_RACE_STRATEGY})")
+    parser.add_argument("--trace_dir", type=str, default=None,
+                        help=f"Directory for per-run trace files (default: {DEFAULT_TRACE_DIR})")
+    parser.add_argument("--no_trace", action="store_true", help="Don't write trace files for this run")
+    parser.add_argument("--ledger", type=str, default=None,
+                        help=f"SQLite run ledger to record this run in (default: config or {DEFAULT_LEDGER_PATH})")
+    parser.add_argument("--no_ledger", action="store_true", help="Don't record this run in the ledger")
+    parser.add_argument("--profile", action="store_true",
+                        help="Count and time every WebDriver command (or HTTP request) by booking method")
+    parser.add_argument("--profile_dir", type=str, default=None,
+                        help=f"Directory for the folded-stack profile (default: {DEFAULT_PROFILE_DIR})")
+    parser.add_argument("--log_file", type=str, default=None,
+                        help="Also write every log record, debug included, to this file as JSON lines (default: config)")
+    parser.add_argument("--budget", type=float, default=None, metavar="SECONDS",
+                        help="Time budget for retries once booking starts (default: config or 90)")
+    parser.add_argument("--speculative", action="store_true",
+                        help="With --release_at, book the top candidates with one script call at release")
+    parser.add_argument("--capture", action="store_true",
+                        help="Save every grid and reservations page read (browser backend) for offline replay")
+    parser.add_argument("--capture_dir", type=str, default=None,
+                        help=f"Directory for page captures (default: config or {DEFAULT_CAPTURE_DIR})")
+    parser.add_argument("--plan_only", "--dry_plan", action="store_true",
+                        help="Print the ordered candidates for each target date and exit without a browser")
+    args = parser.parse_args()
+    check_backend(parser, args)
+    return args
+
+def check_backend(parser, args):
+    """
+    Stop with a usage error if --backend http points anywhere but a local
+    stand-in: its routes are clublocker_standin.py's, not the live site's
+    """
+    if args.backend != "http":
+        return
+    from clublocker_http import is_loopback
+    if not is_loopback(args.base_url):
+        parser.error(f"--backend http only works against clublocker_standin.py, not {args.base_url}. "
+                     "Pass --base_url http://127.0.0.1:<port>, or use --backend browser for the live site.")
+
+def make_tracer(args, config):
+    """Create the run tracer, or None if tracing is switched off"""
+    trace_config = config.get("tracing", {})
+    if args.no_trace or not trace_config.get("enabled", True):
+        return None
+    return RunTracer(output_dir=args.trace_dir or trace_config.get("directory", DEFAULT_TRACE_DIR))
+
+def make_ledger(args, config):
+    """Create the run ledger, or None if it is switched off"""
+    ledger_config = config.get("ledger", {})
+    if getattr(args, "no_ledger", False) or not ledger_config.get("enabled", True):
+        return None
+    return RunLedger(getattr(args, "ledger", None) or ledger_config.get("path", DEFAULT_LEDGER_PATH))
+
+def backend_class(name):
+    """Import and return a booking backend class"""
+    module_name, class_name = BACKENDS[name]
+    return getattr(importlib.import_module(module_name), class_name)
+
+def make_booking(args, config, tracer=None, username=None, password=None, profiler=None, attach=True):
+    """
+    Create a booking backend configured from the command line and config file.
+    attach=False starts a new Chrome for this session even with --attach.
+    """
+    cache_config = config.get("session_cache", {})
+    browser_config = config.get("browser", {})
+    capture_config = config.get("capture", {})
+    capture_dir = None
+    if getattr(args, "capture", False) or capture_config.get("enabled", False):
+        capture_dir = getattr(args, "capture_dir", None) or capture_config.get("directory", DEFAULT_CAPTURE_DIR)
+    session_cache = None
+    if cache_config.get("enabled", True) and not args.no_session_cache:
+        session_cache = SessionCache(
+            path=cache_config.get("path"),
+            max_age_hours=cache_config.get("max_age_hours", DEFAULT_MAX_AGE_HOURS)
+        )
+    debugger_address = None
+    if attach:
+        debugger_address = getattr(args, "attach", None) or browser_config.get("attach")
+    booking = backend_class(args.backend)(
+        show_browser=args.show_browser,
+        test_mode=args.test,
+        verbose=args.verbose,
+        timeouts=config.get("timeouts"),
+        base_url=args.base_url,
+        session_cache=session_cache,
+        username=username,
+        password=password,
+        profile=getattr(args, "browser_profile", None) or browser_config.get("profile", "default"),
+        blocked_urls=browser_config.get("blocked_urls"),
+        capture_dir=capture_dir,
+        profiler=profiler,
+        debugger_address=debugger_address,
+        remote_driver=getattr(args, "remote_driver", None) or browser_config.get("remote_driver")
+    )
+    if tracer is not None:
+        trace_booking(booking, tracer)
+    return booking
+
+def resolve_target_dates(args, current_dt):
+    """Target dates from --dates/--date_range, or the usual current + 5 days"""
+    if args.dates:
+        dates = [datetime.datetime.strptime(d.strip(), "%Y-%m-%d").date() for d in args.dates.split(",") if d.strip()]
+    elif args.date_range:
+        start_str, end_str = args.date_range.split(":")
+        start = datetime.datetime.strptime(start_str.strip(), "%Y-%m-%d").date()
+        end = datetime.datetime.strptime(end_str.strip(), "%Y-%m-%d").date()
+        if end < start:
+            raise ValueError("end of --date_range is before its start")
+        dates = [start + datetime.timedelta(days=i) for i in range((end - start).days + 1)]
+    else:
+        # For testing, our target booking is 5 days from now.
+        dates = [current_dt.date() + datetime.timedelta(days=5)]
+    # Keep the given order but drop duplicates
+    return list(dict.fromkeys(dates))
+
+def print_plan(target_dates, final_schedule, optimizer=None):
+    """Print each target date's candidates in the order the optimizer tries them"""
+    optimizer = optimizer or SlotOptimizer()
+    for target in target_dates:
+        day_name = target.strftime("%A")
+        day_schedule = final_schedule.get(day_name, [])
+        log.info("Plan for %s %s", day_name, target, extra={"banner": "-"})
+        if not day_schedule:
+            log.info("  No booking schedule for this day")
+            continue
+        for idx, entry in enumerate(optimizer.order(day_schedule), start=1):
+            log.info("  %3s. Court %-3s %s (score %g)", idx, entry['court'], ', '.join(entry['slots']), entry['score'])
+
+def attempt_candidate(booking, candidates, entry, before_save=None):
+    """
+    Confirm one candidate (every slot of a block) against the live grid and
+    book it. Sets entry["booked_slots"] to the slots actually booked. Returns
+    True if all of them were, PARTIAL_BLOCK if only the first few were (the
+    date then has a booking, so no other candidate is tried) or False.
+    before_save is handed to attempt_booking (racing sessions pass their claim).
+    """
+    court = entry["court"]
+    slots = entry.get("slots", [entry["time_slot"]])
+    # One record for the whole header: a single queue put on the hot path
+    log.info("[%s] Attempting booking (score %g): Court %s at %s", candidates.index(entry) + 1, entry['score'],
+             court, ', '.join(slots),
+             extra={"gap": True, "court": court, "time_slot": slots[0], "slots": len(slots), "score": entry["score"]})
+    
+    for n, timeslot in enumerate(slots):
+        # Confirm against the live grid; it may have changed since the snapshot
+        slot = booking.check_slot_availability(court, timeslot)
+        if not slot:
+            if n:
+                log.info("   Booked %s of %s slots; Court %s at %s was taken", n, len(slots), court, timeslot)
+                entry["booked_slots"] = slots[:n]
+                return PARTIAL_BLOCK
+            log.info("   Slot not available, trying next option...")
+            return False
+        booked = booking.attempt_booking(slot, before_save=before_save) if before_save else booking.attempt_booking(slot)
+        if not booked:
+            if n:
+                log.info("   Booked %s of %s slots; booking %s failed", n, len(slots), timeslot)
+                entry["booked_slots"] = slots[:n]
+                return PARTIAL_BLOCK
+            return False
+    entry["booked_slots"] = slots
+    return True
+
+def booked_outcome(entry):
+    """"booked", or PARTIAL_BLOCK if only part of the entry's block was booked"""
+    slots = entry.get("slots", [entry["time_slot"]])
+    return PARTIAL_BLOCK if len(entry.get("booked_slots", slots)) < len(slots) else "booked"
 
-def format_line(text="", width=80, symbol="-"):
-    # Returns a line with the text centered, padded with the symbol.
-    if text:
-        return f" {text} ".center(width, symbol)
-    return symbol * width
+def describe_booking(entry):
+    """"Court N at <slots>" for the slots of an entry that were booked"""
+    slots = entry.get("booked_slots") or [entry["time_slot"]]
+    return f"Court {entry['court']} at {', '.join(slots)}"
+
+def book_from_schedule(booking, day_schedule, engine=None, optimizer=None, ledger=None, attempt=attempt_candidate,
+                       select=None):
+    """
+    Try the open court/time combinations best score first, retrying recoverable
+    failures within the engine's time budget; returns the booked entry or None.
+    attempt(booking, candidates, entry) books one candidate; callers that share
+    courts with other sessions (fleet, race) wrap attempt_candidate. select,
+    if given, picks this session's share of the ranked candidates.
+    """
+    engine = engine or RetryEngine()
+    optimizer = optimizer or SlotOptimizer()
+    # Read the whole grid once; the optimizer scores the open slots straight off the bitmap
+    snapshot = booking.grid_snapshot or booking.snapshot_grid()
+    if ledger is not None:
+        ledger.observe(booking.booking_date, day_schedule, snapshot)
+    candidates = optimizer.rank(snapshot.availability(), day_schedule)
+    if select is not None:
+        candidates = select(candidates)
+    log.info("Grid snapshot loaded: %s slots, %s open candidate(s) for %s ranked slots", len(snapshot), len(candidates),
+             len(day_schedule), extra={"booking_date": booking.booking_date, "open_candidates": len(candidates)})
+    
+    entry = engine.book(
+        booking, candidates, booking.booking_date, ORG_ID,
+        lambda candidate: attempt(booking, candidates, candidate)
+    )
+    if entry and booked_outcome(entry) == PARTIAL_BLOCK:
+        log.info("Only part of the block was booked: %s", describe_booking(entry), extra={"banner": "!"})
+    elif entry:
+        log.info("Booking successful!", extra={"banner": "*"})
+    return entry
+
+def any_candidate_open(snapshot, day_schedule):
+    """True if any ranked candidate is open in the snapshot"""
+    return snapshot.availability().first_open(day_schedule) is not None
+
+def measure_server_offset(base_url):
+    """Measure server_time - local_time, falling back to 0 if the server can't be reached"""
+    try:
+        offset = release_timer.measure_clock_offset(base_url)
+    except Exception as e:
+        log.warning("Could not measure server clock offset (%s); using local clock", e)
+        offset = 0.0
+    log.info("Server clock offset: %+.3fs", offset, extra={"clock_offset": offset})
+    return offset
+
+def wait_for_release(booking, day_schedule, release_epoch, window, offset, speculative=False):
+    """
+    Wait for the corrected release instant, then refresh until a candidate
+    opens. With speculative (a prepared booking, see prepare_speculative) the
+    first thing after release is the one-call confirm; returns its booked
+    entry, or None once the normal path should take over.
+    """
+    log.info("Waiting for release", extra={"banner": "-"})
+    local_target = release_epoch - offset
+    log.info("Release at %s (server), firing in %.1fs", datetime.datetime.fromtimestamp(release_epoch),
+             local_target - time.time())
+    late = release_timer.wait_for_release(release_epoch, offset)
+    log.info("Release instant reached (%.1f ms late)", late * 1000, extra={"late_seconds": late})
+    if speculative:
+        entry = booking.confirm_prepared()
+        if entry or booking.last_failure == SAVE_UNCERTAIN:
+            # Save may have gone through; the caller checks before anything else is booked
+            return entry
+    
+    # Slots may show up a moment after the nominal release; keep refreshing briefly
+    deadline = time.time() + window
+    refreshes = 0
+    while True:
+        snapshot = booking.refresh_grid()
+        refreshes += 1
+        if any_candidate_open(snapshot, day_schedule) or time.time() >= deadline:
+            break
+    log.info("Grid refreshed %s time(s) after release", refreshes, extra={"refreshes": refreshes})
+    return None
+
+def run_single(args, config, targets, release=None, tracer=None, ledger=None, profiler=None):
+    """
+    Book every (date, day_schedule) target with one logged-in session.
+    Returns {date: (outcome, booked entry or None)}.
+    """
+    booking = make_booking(args, config, tracer, profiler=profiler)
+    try:
+        # Start browser and login once
+        booking.start_browser()
+        booking.login()
+        return book_targets(booking, args, config, targets, release, ledger)
+    finally:
+        booking.print_wait_summary()
+        booking.close()
+
+def book_targets(booking, args, config, targets, release=None, ledger=None):
+    """
+    Book every (date, day_schedule) target with an already logged-in session
+    (a fresh one from run_single, or the daemon's warm one).
+    Returns {date: (outcome, booked entry or None)}.
+    """
+    results = {}
+    engine = RetryEngine.from_config(config, getattr(args, "budget", None))
+    optimizer = SlotOptimizer.from_config(config)
+    speculative_config = config.get("speculative", {})
+    speculative = getattr(args, "speculative", False) or speculative_config.get("enabled", False)
+    try:
+        for booking_date, day_schedule in targets:
+            log.info("Booking %s", booking_date, extra={"banner": "-"})
+            # Load each date's grid once and check for existing bookings
+            try:
+                navigated = engine.navigate(booking, booking_date, ORG_ID)
+            except BudgetExhausted:
+                log.info("Retry budget used up", extra={"banner": "!"})
+                break
+            if not navigated:
+                log.info("Cannot proceed with booking - existing booking found", extra={"banner": "!"})
+                results[booking_date] = ("existing_booking", None)
+                continue
+            
+            # In release mode the session is now warm; hold here until courts open
+            if release is not None:
+                release_epoch, release_window = release
+                offset = measure_server_offset(args.base_url)
+                # Blocks of back-to-back slots need more than one click; they take the normal path
+                prepared = speculative and optimizer.slots == 1 and booking.prepare_speculative(
+                    optimizer.order(day_schedule)[:speculative_config.get("candidates", DEFAULT_SPECULATIVE_CANDIDATES)]
+                )
+                entry = wait_for_release(booking, day_schedule, release_epoch, release_window, offset, prepared)
+                # Dates after the first were released earlier
+                release = None
+                # The budget covers contention after release, not the wait for it
+                engine.restart()
+                if prepared and not entry and booking.last_failure == SAVE_UNCERTAIN:
+                    try:
+                        booked = engine.save_went_through(booking, booking_date, ORG_ID)
+                    except SaveUncertain as e:
+                        log.error("Stopped booking %s: %s", booking_date, e, extra={"booking_date": booking_date})
+                        log.info("Check My Reservations for this date", extra={"banner": "!"})
+                        results[booking_date] = ("save_uncertain", None)
+                        continue
+                    if booked:
+                        # The court is unknown if the script failed before reporting it
+                        entry = booking.unconfirmed_entry
+                        if not entry:
+                            results[booking_date] = ("existing_booking", None)
+                            continue
+                    else:
+                        # Reading the reservations left the grid; load it again for the normal path
+                        booking.navigate_to_date(booking_date, ORG_ID, check_existing=False)
+                if entry:
+                    log.info("Booking successful!", extra={"banner": "*"})
+                    results[booking_date] = ("booked", entry)
+                    continue
+            
+            # Try each court/time combination
+            try:
+                entry = book_from_schedule(booking, day_schedule, engine, optimizer, ledger)
+            except BudgetExhausted:
+                entry = None
+            except SaveUncertain as e:
+                # Booking another court could double-book; leave the date for a human to check
+                log.error("Stopped booking %s: %s", booking_date, e, extra={"booking_date": booking_date})
+                log.info("Check My Reservations for this date", extra={"banner": "!"})
+                results[booking_date] = ("save_uncertain", None)
+                continue
+            if entry:
+                results[booking_date] = (booked_outcome(entry), entry)
+            elif engine.remaining() <= 0:
+                log.info("Retry budget used up", extra={"banner": "!"})
+                results[booking_date] = ("budget_exhausted", None)
+                break
+            else:
+                log.info("No available slots found", extra={"banner": "!"})
+                results[booking_date] = ("no_slot", None)
+        # Dates the budget never reached
+        for booking_date, _ in targets:
+            results.setdefault(booking_date, ("budget_exhausted", None))
+    finally:
+        engine.print_summary()
+    return results
+
+def run_race(args, config, day_schedule, booking_date, sessions, strategy, release=None, tracer=None,
+             profiler=None, ledger=None):
+    """Book using a pool of racing sessions; the first confirmed booking wins"""
+    log.info("Racing %s sessions (%s)", sessions, strategy, extra={"banner": "-"})
+    before_attempt = None
+    if release is not None:
+        release_epoch, release_window = release
+        offset = measure_server_offset(args.base_url)
+        before_attempt = lambda booking: wait_for_release(booking, day_schedule, release_epoch, release_window, offset)
+    optimizer = SlotOptimizer.from_config(config)
+
+    def book_one(session_id, booking, guard, select):
+        # Every session ranks and retries like a single-session run, within its own budget;
+        # the grid is recorded once
+        engine = RetryEngine.from_config(config, getattr(args, "budget", None))
+        return book_from_schedule(booking, day_schedule, engine, optimizer, ledger if session_id == 0 else None,
+                                  attempt=guard(attempt_candidate), select=select)
+    
+    if getattr(args, "attach", None) or config.get("browser", {}).get("attach"):
+        # Racing sessions would fight over the tabs of one attached Chrome
+        log.warning("Note: racing sessions start their own browsers; --attach is ignored for the race")
+    race = BookingRace(
+        lambda: make_booking(args, config, tracer, profiler=profiler, attach=False),
+        day_schedule,
+        booking_date,
+        ORG_ID,
+        book_one,
+        sessions=sessions,
+        strategy=strategy,
+        before_attempt=before_attempt
+    )
+    winner = race.run()
+    log.info("Race results", extra={"banner": "-"})
+    race.print_summary()
+    if race.existing_booking.is_set():
+        log.info("Cannot proceed with booking - existing booking found", extra={"banner": "!"})
+        return "existing_booking", None
+    if winner:
+        log.info("Race won: %s", describe_booking(winner), extra={"banner": "*"})
+        return booked_outcome(winner), winner
+    if race.claim.uncertain is not None:
+        log.info("Check My Reservations for this date", extra={"banner": "!"})
+        return "save_uncertain", None
+    log.info("No available slots found", extra={"banner": "!"})
+    return "no_slot", None
+
+def overall_outcome(results):
+    """Collapse per-date outcomes into one run outcome"""
+    outcomes = [outcome for outcome, _ in results.values()]
+    if not outcomes:
+        return "no_schedule"
+    booked = [outcome for outcome in outcomes if outcome in ("booked", PARTIAL_BLOCK)]
+    if len(booked) == len(outcomes):
+        return PARTIAL_BLOCK if PARTIAL_BLOCK in booked else "booked"
+    if booked:
+        return "partial"
+    if len(set(outcomes)) == 1:
+        return outcomes[0]
+    return "no_slot"
+
+def print_summary(target_dates, results):
+    """Print one line per target date"""
+    log.info("Summary", extra={"banner": "-"})
+    for target in target_dates:
+        booking_date = target.strftime("%Y-%m-%d")
+        outcome, entry = results.get(booking_date, ("no_schedule", None))
+        detail = describe_booking(entry) if entry else ""
+        log.info("  %s %-10s %-17s %s", booking_date, target.strftime('%A'), outcome, detail,
+                 extra={"booking_date": booking_date, "outcome": outcome,
+                        "court": entry["court"] if entry else None, "time_slot": entry["time_slot"] if entry else None})
 
 def main():
     args = parse_args()
     config = load_config()
+    setup_logging(args.verbose, args.log_file or config.get("logging", {}).get("file"))
     
     # Determine current date (from parameter or system)
     if args.current_date:
         try:
             current_dt = datetime.datetime.strptime(args.current_date, "%Y-%m-%d")
         except Exception as e:
-            print("Error parsing --current_date:", e)
+            log.error("Error parsing --current_date: %s", e)
             return
     else:
         current_dt = datetime.datetime.now()
 
-    # For testing, our target booking is 5 days from now.
-    target_date = current_dt.date() + datetime.timedelta(days=5)
-    target_day_name = target_date.strftime("%A")
+    try:
+        target_dates = resolve_target_dates(args, current_dt)
+    except Exception as e:
+        log.error("Error parsing target dates: %s", e)
+        return
     
     # Print header info with formatting
-    print("\n" + format_line("Scheduled Booking Runner Test Mode" if args.test else "Scheduled Booking Runner"))
-    print(f"Simulated current date/time: {current_dt}")
-    print(f"Target booking date (current + 5 days): {target_date} which is a {target_day_name}")
+    log.info("Scheduled Booking Runner Test Mode" if args.test else "Scheduled Booking Runner", extra={"banner": "-"})
+    log.info("Simulated current date/time: %s", current_dt)
+    if len(target_dates) == 1 and not (args.dates or args.date_range):
+        log.info("Target booking date (current + 5 days): %s which is a %s", target_dates[0],
+                 target_dates[0].strftime('%A'))
+    else:
+        log.info("Target booking dates: %s", ', '.join(str(d) for d in target_dates))
     
-    final_schedule = config.get("final_schedule", {})
-    day_schedule = final_schedule.get(target_day_name, [])
-    if not day_schedule:
-        print("\nNo booking schedule found for", target_day_name, "\nExiting.")
+    final_schedule = load_final_schedule(config)
+    if args.plan_only:
+        print_plan(target_dates, final_schedule, SlotOptimizer.from_config(config))
         return
-
-    print("\n" + format_line(f"Booking Attempts for {target_day_name}"))
-    print(f"Found {len(day_schedule)} time slots to attempt")
     
-    # Initialize the booking system
-    booking = SquashBooking(
-        show_browser=args.show_browser,
-        test_mode=args.test,
-        verbose=args.verbose
-    )
+    targets = []
+    for target in target_dates:
+        target_day_name = target.strftime("%A")
+        day_schedule = final_schedule.get(target_day_name, [])
+        if not day_schedule:
+            log.info("No booking schedule found for %s (%s); skipping", target, target_day_name, extra={"gap": True})
+            continue
+        log.info("Booking Attempts for %s %s", target_day_name, target, extra={"banner": "-"})
+        log.info("Found %s time slots to attempt", len(day_schedule))
+        targets.append((target.strftime("%Y-%m-%d"), day_schedule))
+    if not targets:
+        log.info("Nothing to book; exiting", extra={"gap": True})
+        return
     
-    try:
-        # Start browser and login once
-        booking.start_browser()
-        booking.login()
-        
-        # Navigate to the target date once and check for existing bookings
-        if not booking.navigate_to_date(target_date.strftime("%Y-%m-%d"), ORG_ID):
-            print("\n" + format_line("Cannot proceed with booking - existing booking found", symbol="!"))
+    release_epoch = None
+    release_window = None
+    if args.release_at:
+        release_config = config.get("release", {})
+        release_tz = args.release_tz or release_config.get("timezone", release_timer.DEFAULT_RELEASE_TIMEZONE)
+        release_window = args.release_window
+        if release_window is None:
+            release_window = release_config.get("window_seconds", 30)
+        try:
+            release_epoch = release_timer.release_instant(args.release_at, current_dt.date(), release_tz)
+        except Exception as e:
+            log.error("Error parsing --release_at: %s", e)
             return
-        
-        # Try each court/time combination
-        for idx, entry in enumerate(day_schedule, start=1):
-            court = entry["court"]
-            timeslot = entry["time_slot"]
-            print(f"\n[{idx}] Attempting booking:")
-            print(f"   Court: {court}")
-            print(f"   Time Slot: {timeslot}")
-            
-            # Check if slot is available
-            slot = booking.check_slot_availability(court, timeslot)
-            if slot:
-                # Attempt to book if available
-                success = booking.attempt_booking(slot)
-                if success:
-                    print("\n" + format_line("Booking successful!", symbol="*"))
-                    break
-            else:
-                print(f"   Slot not available, trying next option...")
-        
-        if not success:
-            print("\n" + format_line("No available slots found", symbol="!"))
-            
+    
+    race_config = config.get("race", {})
+    race_sessions = args.race if args.race is not None else 0
+    release = (release_epoch, release_window) if release_epoch is not None else None
+    
+    tracer = make_tracer(args, config)
+    ledger = make_ledger(args, config)
+    write_trace = tracer is not None
+    if ledger is not None and tracer is None:
+        # The ledger reads candidates and phase timings off the tracer; keep it in memory only
+        tracer = RunTracer()
+    profiler = CommandProfiler(args.profile_dir or DEFAULT_PROFILE_DIR) if args.profile else None
+    results = {}
+    outcome = "error"
+    try:
+        if race_sessions > 1:
+            race_strategy = args.race_strategy or race_config.get("strategy", DEFAULT_RACE_STRATEGY)
+            for booking_date, day_schedule in targets:
+                results[booking_date] = run_race(
+                    args, config, day_schedule, booking_date, race_sessions, race_strategy, release, tracer, profiler,
+                    ledger
+                )
+                release = None
+        else:
+            results = run_single(args, config, targets, release, tracer, ledger, profiler)
+        outcome = overall_outcome(results)
+        if len(target_dates) > 1:
+            print_summary(target_dates, results)
     except Exception as e:
-        print(f"\nAn error occurred: {str(e)}")
-        import traceback
-        print("Full traceback:")
-        print(traceback.format_exc())
+        log.exception("An error occurred: %s", e, extra={"gap": True})
     finally:
-        booking.close()
+        if ledger is not None:
+            try:
+                ledger.write(outcome, results, tracer, backend=args.backend, test_mode=args.test,
+                             base_url=args.base_url)
+                log.info("Run recorded in %s", ledger.path, extra={"gap": True})
+            except Exception as e:
+                log.warning("Note: Could not write to the run ledger: %s", e)
+        if write_trace:
+            tracer.finish(
+                outcome,
+                target_dates=[booking_date for booking_date, _ in targets],
+                results={d: result[0] for d, result in results.items()},
+                backend=args.backend,
+                race_sessions=race_sessions
+            )
+            try:
+                jsonl_path, prom_path = tracer.write()
+                log.info("Trace written to %s and %s", jsonl_path, prom_path, extra={"gap": True})
+            except Exception as e:
+                log.warning("Note: Could not write trace files: %s", e)
+        if profiler is not None:
+            profiler.print_report()
+            try:
+                folded_path = profiler.write_folded(tracer.run_id if tracer is not None else None)
+                log.info("Folded stacks written to %s", folded_path, extra={"gap": True})
+            except Exception as e:
+                log.warning("Note: Could not write the profile: %s", e)
 
 if __name__ == "__main__":
     main()
@@ -2,115 +2,57 @@
 
 #!/usr/bin/env python
 # scheduler_ui.py
+#
+# Tk is only imported by main(), so the helpers below (load_config,
+# time_slots_between, ...) can be imported on a machine without a display.
 
-import tkinter as tk
-from tkinter import ttk, messagebox
 import json
 import os
-import datetime
+
+from timetable import (
+    DEFAULT_TIMETABLE, TICK_MINUTES, Timetable, PlanError,
+    parse_time, format_minutes, normalize_time, compile_plan, plan_to_final_schedule, write_plan,
+)
 
 CONFIG_FILE = "booking_config.json"
 DAYS_OF_WEEK = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
 
-# ---------------- Reference: Valid Timeslot Mappings ----------------
-# These mappings convert a UI start time (from the ranking lists) into the full timeslot text.
-# All bookings are 40 minutes long.
-
-# For Courts 1-3 (7:00 AM to 8:20 PM)
-COURT_GROUP_1 = {
-    "7:00 AM": "7:00 AM - 7:40 AM",
-    "7:40 AM": "7:40 AM - 8:20 AM",
-    "8:20 AM": "8:20 AM - 9:00 AM",
-    "9:00 AM": "9:00 AM - 9:40 AM",
-    "9:40 AM": "9:40 AM - 10:20 AM",
-    "10:20 AM": "10:20 AM - 11:00 AM",
-    "11:00 AM": "11:00 AM - 11:40 AM",
-    "11:40 AM": "11:40 AM - 12:20 PM",
-    "12:20 PM": "12:20 PM - 1:00 PM",
-    "1:00 PM": "1:00 PM - 1:40 PM",
-    "1:40 PM": "1:40 PM - 2:20 PM",
-    "2:20 PM": "2:20 PM - 3:00 PM",
-    "3:00 PM": "3:00 PM - 3:40 PM",
-    "3:40 PM": "3:40 PM - 4:20 PM",
-    "4:20 PM": "4:20 PM - 5:00 PM",
-    "5:00 PM": "5:00 PM - 5:40 PM",
-    "5:40 PM": "5:40 PM - 6:20 PM",
-    "6:20 PM": "6:20 PM - 7:00 PM",
-    "7:00 PM": "7:00 PM - 7:40 PM",
-    "7:40 PM": "7:40 PM - 8:20 PM",
-    "8:20 PM": "8:20 PM - 9:00 PM"
-}
-
-# For Courts 4-7 (7:20 AM to 8:00 PM)
-COURT_GROUP_2 = {
-    "7:20 AM": "7:20 AM - 8:00 AM",
-    "8:00 AM": "8:00 AM - 8:40 AM",
-    "8:40 AM": "8:40 AM - 9:20 AM",
-    "9:20 AM": "9:20 AM - 10:00 AM",
-    "10:00 AM": "10:00 AM - 10:40 AM",
-    "10:40 AM": "10:40 AM - 11:20 AM",
-    "11:20 AM": "11:20 AM - 12:00 PM",
-    "12:00 PM": "12:00 PM - 12:40 PM",
-    "12:40 PM": "12:40 PM - 1:20 PM",
-    "1:20 PM": "1:20 PM - 2:00 PM",
-    "2:00 PM": "2:00 PM - 2:40 PM",
-    "2:40 PM": "2:40 PM - 3:20 PM",
-    "3:20 PM": "3:20 PM - 4:00 PM",
-    "4:00 PM": "4:00 PM - 4:40 PM",
-    "4:40 PM": "4:40 PM - 5:20 PM",
-    "5:20 PM": "5:20 PM - 6:00 PM",
-    "6:00 PM": "6:00 PM - 6:40 PM",
-    "6:40 PM": "6:40 PM - 7:20 PM",
-    "7:20 PM": "7:20 PM - 8:00 PM"
-}
+# Set by main()
+tk = ttk = messagebox = None
 
 # ---------------- Helper Functions ----------------
 
-def format_time(dt):
-    """Format a datetime object to a time string without leading zeros."""
-    hour = dt.hour % 12
-    if hour == 0:
-        hour = 12
-    return f"{hour}:{dt.strftime('%M %p')}"
-
-def generate_full_time_options():
-    """Generate a full list of times in 20-minute increments from 7:00 AM to 8:20 PM."""
-    times = []
-    current = datetime.datetime.strptime("7:00 AM", "%I:%M %p")
-    end = datetime.datetime.strptime("8:20 PM", "%I:%M %p")
-    while current <= end:
-        times.append(format_time(current))
-        current += datetime.timedelta(minutes=20)
-    return times
-
-FULL_TIME_OPTIONS = generate_full_time_options()
+# Slot times come from the court timetable (timetable.py); the start/end
+# pickers offer every 20-minute start between the earliest and latest slot.
+FULL_TIME_OPTIONS = DEFAULT_TIMETABLE.time_range()
 
-def generate_time_slots(start_str, end_str):
+def time_slots_between(start_str, end_str):
     """
     Return a list of time slots (start times) in 20-minute intervals between start_str and end_str,
-    inclusive of both endpoints.
+    inclusive of both endpoints. Raises ValueError for bad input.
     """
-    try:
-        # Parse the input times, handling both formats (with and without leading zeros)
-        start_dt = datetime.datetime.strptime(start_str, "%I:%M %p")
-        end_dt = datetime.datetime.strptime(end_str, "%I:%M %p")
-    except Exception as e:
-        messagebox.showerror("Error", "Time format error: " + str(e))
-        return []
-    if start_dt > end_dt:
-        messagebox.showerror("Error", "Start time must be earlier than or equal to end time.")
-        return []
-    slots = []
-    current = start_dt
-    while current <= end_dt:
-        # Format time without leading zeros
-        hour = current.hour % 12
-        if hour == 0:
-            hour = 12
-        time_str = f"{hour}:{current.strftime('%M %p')}"
-        slots.append(time_str)
-        current += datetime.timedelta(minutes=20)
-    return slots
+    # Accepts "6:00 PM" as well as "06:00 PM"
+    start = parse_time(start_str)
+    end = parse_time(end_str)
+    if start > end:
+        raise ValueError("Start time must be earlier than or equal to end time.")
+    return [format_minutes(m) for m in range(start, end + 1, TICK_MINUTES)]
+
+def normalize_times(settings):
+    """Rewrite a weekday/weekend block's times in the UI's "6:00 PM" form"""
+    for key in ("start_time", "end_time"):
+        if key in settings:
+            try:
+                settings[key] = normalize_time(settings[key])
+            except ValueError:
+                pass
+    normalized = []
+    for t in settings.get("time_ranking", []):
+        try:
+            normalized.append(normalize_time(t))
+        except ValueError:
+            normalized.append(t)
+    settings["time_ranking"] = normalized
 
 # ---------------- Config File Functions ----------------
 
@@ -136,7 +78,7 @@ def load_config():
         config["weekday"] = {
             "start_time": default_weekday_start,
             "end_time": default_weekday_end,
-            "time_ranking": generate_time_slots(default_weekday_start, default_weekday_end)
+            "time_ranking": time_slots_between(default_weekday_start, default_weekday_end)
         }
     if "weekend" not in config:
         default_weekend_start = "9:00 AM"
@@ -144,10 +86,12 @@ def load_config():
         config["weekend"] = {
             "start_time": default_weekend_start,
             "end_time": default_weekend_end,
-            "time_ranking": generate_time_slots(default_weekend_start, default_weekend_end)
+            "time_ranking": time_slots_between(default_weekend_start, default_weekend_end)
         }
     if "court_ranking" not in config:
         config["court_ranking"] = [1, 2, 3, 4, 5, 6, 7]
+    normalize_times(config["weekday"])
+    normalize_times(config["weekend"])
     return config
 
 def save_config(data):
@@ -159,6 +103,14 @@ def save_config(data):
 
 # ---------------- UI Functions ----------------
 
+def generate_time_slots(start_str, end_str):
+    """time_slots_between(), reporting bad input in a dialog"""
+    try:
+        return time_slots_between(start_str, end_str)
+    except ValueError as e:
+        messagebox.showerror("Error", "Time format error: " + str(e))
+        return []
+
 def generate_weekday_slots():
     start = weekday_start_var.get()
     end = weekday_end_var.get()
@@ -261,41 +213,27 @@ def on_save():
         courts.append(court_num)
     config_data["court_ranking"] = courts
 
-    # Build final_schedule structure
-    final_schedule = {}
-    for day in DAYS_OF_WEEK:
-        if not active_days.get(day, False):
-            continue
-
-        # Determine if day is weekend (Saturday/Sunday) or weekday.
-        if day in ["Saturday", "Sunday"]:
-            day_slots = weekend_slots
-        else:
-            day_slots = weekday_slots
-
-        day_list = []
-        for t in day_slots:
-            for c in courts:
-                if c <= 3:
-                    mapping = COURT_GROUP_1
-                else:
-                    mapping = COURT_GROUP_2
-                if t in mapping:
-                    day_list.append({
-                        "court": c,
-                        "time_slot": mapping[t]
-                    })
-        final_schedule[day] = day_list
-
-    config_data["final_schedule"] = final_schedule
+    # Compile and validate the plan before anything is written
+    try:
+        plan = compile_plan(config_data)
+    except PlanError as e:
+        messagebox.showerror("Invalid schedule", "Configuration not saved:\n\n" + "\n".join(e.problems))
+        return
+    config_data["final_schedule"] = plan_to_final_schedule(plan)
 
     try:
         save_config(config_data)
-        messagebox.showinfo("Saved", "Configuration saved successfully.")
+        write_plan(plan)
+        messagebox.showinfo("Saved", "Configuration and booking plan saved successfully.")
     except Exception as e:
         messagebox.showerror("Error", f"Failed to save configuration: {e}")
 
 def populate_ui_from_config(config_data):
+    # Time pickers follow the configured timetable
+    time_options = Timetable.from_config(config_data).time_range()
+    for cb in (weekday_start_cb, weekday_end_cb, weekend_start_cb, weekend_end_cb):
+        cb["values"] = time_options
+
     # Active days
     for day in DAYS_OF_WEEK:
         active_days_vars[day].set(config_data.get("active_days", {}).get(day, False))
@@ -328,96 +266,106 @@ def populate_ui_from_config(config_data):
 
 # ---------------- Build the UI ----------------
 
-root = tk.Tk()
-root.title("Squash Booking Scheduler Configuration")
-
-# ---- Active Days Frame ----
-days_frame = ttk.LabelFrame(root, text="Active Days (Select the days you want bookings)")
-days_frame.pack(padx=10, pady=5, fill="x")
-
-active_days_vars = {}
-for idx, day in enumerate(DAYS_OF_WEEK):
-    var = tk.BooleanVar()
-    active_days_vars[day] = var
-    chk = ttk.Checkbutton(days_frame, text=day, variable=var)
-    chk.grid(row=0, column=idx, padx=3, pady=3)
-
-# ---- Weekday Time Settings Frame ----
-weekday_frame = ttk.LabelFrame(root, text="Weekday Time Settings")
-weekday_frame.pack(padx=10, pady=5, fill="x")
-
-weekday_start_var = tk.StringVar()
-weekday_end_var = tk.StringVar()
-
-ttk.Label(weekday_frame, text="Start Time:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
-weekday_start_cb = ttk.Combobox(weekday_frame, textvariable=weekday_start_var, state="readonly", width=10)
-weekday_start_cb["values"] = FULL_TIME_OPTIONS
-weekday_start_cb.grid(row=0, column=1, padx=5, pady=5)
-
-ttk.Label(weekday_frame, text="End Time:").grid(row=0, column=2, padx=5, pady=5, sticky="e")
-weekday_end_cb = ttk.Combobox(weekday_frame, textvariable=weekday_end_var, state="readonly", width=10)
-weekday_end_cb["values"] = FULL_TIME_OPTIONS
-weekday_end_cb.grid(row=0, column=3, padx=5, pady=5)
-
-ttk.Button(weekday_frame, text="Generate Weekday Slots", command=generate_weekday_slots).grid(row=0, column=4, padx=5, pady=5)
-
-ttk.Label(weekday_frame, text="Weekday Time Ranking:").grid(row=1, column=0, columnspan=2, padx=5, pady=5, sticky="e")
-weekday_listbox = tk.Listbox(weekday_frame, height=5, exportselection=False)
-weekday_listbox.grid(row=1, column=2, columnspan=2, padx=5, pady=5)
-
-weekday_button_frame = ttk.Frame(weekday_frame)
-weekday_button_frame.grid(row=1, column=4, padx=5, pady=5)
-ttk.Button(weekday_button_frame, text="Move Up", command=move_up_weekday).pack(fill="x", pady=2)
-ttk.Button(weekday_button_frame, text="Move Down", command=move_down_weekday).pack(fill="x", pady=2)
-
-# ---- Weekend Time Settings Frame ----
-weekend_frame = ttk.LabelFrame(root, text="Weekend Time Settings")
-weekend_frame.pack(padx=10, pady=5, fill="x")
-
-weekend_start_var = tk.StringVar()
-weekend_end_var = tk.StringVar()
-
-ttk.Label(weekend_frame, text="Start Time:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
-weekend_start_cb = ttk.Combobox(weekend_frame, textvariable=weekend_start_var, state="readonly", width=10)
-weekend_start_cb["values"] = FULL_TIME_OPTIONS
-weekend_start_cb.grid(row=0, column=1, padx=5, pady=5)
-
-ttk.Label(weekend_frame, text="End Time:").grid(row=0, column=2, padx=5, pady=5, sticky="e")
-weekend_end_cb = ttk.Combobox(weekend_frame, textvariable=weekend_end_var, state="readonly", width=10)
-weekend_end_cb["values"] = FULL_TIME_OPTIONS
-weekend_end_cb.grid(row=0, column=3, padx=5, pady=5)
-
-ttk.Button(weekend_frame, text="Generate Weekend Slots", command=generate_weekend_slots).grid(row=0, column=4, padx=5, pady=5)
-
-ttk.Label(weekend_frame, text="Weekend Time Ranking:").grid(row=1, column=0, columnspan=2, padx=5, pady=5, sticky="e")
-weekend_listbox = tk.Listbox(weekend_frame, height=5, exportselection=False)
-weekend_listbox.grid(row=1, column=2, columnspan=2, padx=5, pady=5)
-
-weekend_button_frame = ttk.Frame(weekend_frame)
-weekend_button_frame.grid(row=1, column=4, padx=5, pady=5)
-ttk.Button(weekend_button_frame, text="Move Up", command=move_up_weekend).pack(fill="x", pady=2)
-ttk.Button(weekend_button_frame, text="Move Down", command=move_down_weekend).pack(fill="x", pady=2)
-
-# ---- Court Ranking Section ----
-court_frame = ttk.LabelFrame(root, text="Court Ranking (shared by all days)")
-court_frame.pack(padx=10, pady=5, fill="x")
-
-court_listbox = tk.Listbox(court_frame, height=7, exportselection=False)
-court_listbox.pack(side="left", padx=5, pady=5)
-
-court_button_frame = ttk.Frame(court_frame)
-court_button_frame.pack(side="left", padx=5, pady=5)
-ttk.Button(court_button_frame, text="Move Up", command=move_up_court).pack(fill="x", pady=2)
-ttk.Button(court_button_frame, text="Move Down", command=move_down_court).pack(fill="x", pady=2)
-
-# ---- Bottom Buttons ----
-bottom_frame = ttk.Frame(root)
-bottom_frame.pack(padx=10, pady=10, fill="x")
-ttk.Button(bottom_frame, text="Save", command=on_save).pack(side="left", padx=5)
-ttk.Button(bottom_frame, text="Quit", command=root.destroy).pack(side="left", padx=5)
-
-# ---- Load configuration and populate UI ----
-config = load_config()
-populate_ui_from_config(config)
-
-root.mainloop()
+def main():
+    global tk, ttk, messagebox, root, active_days_vars
+    global weekday_start_var, weekday_end_var, weekday_listbox, weekend_start_var, weekend_end_var, weekend_listbox
+    global weekday_start_cb, weekday_end_cb, weekend_start_cb, weekend_end_cb, court_listbox
+    import tkinter as tk
+    from tkinter import ttk, messagebox
+
+    root = tk.Tk()
+    root.title("Squash Booking Scheduler Configuration")
+
+    # ---- Active Days Frame ----
+    days_frame = ttk.LabelFrame(root, text="Active Days (Select the days you want bookings)")
+    days_frame.pack(padx=10, pady=5, fill="x")
+
+    active_days_vars = {}
+    for idx, day in enumerate(DAYS_OF_WEEK):
+        var = tk.BooleanVar()
+        active_days_vars[day] = var
+        chk = ttk.Checkbutton(days_frame, text=day, variable=var)
+        chk.grid(row=0, column=idx, padx=3, pady=3)
+
+    # ---- Weekday Time Settings Frame ----
+    weekday_frame = ttk.LabelFrame(root, text="Weekday Time Settings")
+    weekday_frame.pack(padx=10, pady=5, fill="x")
+
+    weekday_start_var = tk.StringVar()
+    weekday_end_var = tk.StringVar()
+
+    ttk.Label(weekday_frame, text="Start Time:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
+    weekday_start_cb = ttk.Combobox(weekday_frame, textvariable=weekday_start_var, state="readonly", width=10)
+    weekday_start_cb["values"] = FULL_TIME_OPTIONS
+    weekday_start_cb.grid(row=0, column=1, padx=5, pady=5)
+
+    ttk.Label(weekday_frame, text="End Time:").grid(row=0, column=2, padx=5, pady=5, sticky="e")
+    weekday_end_cb = ttk.Combobox(weekday_frame, textvariable=weekday_end_var, state="readonly", width=10)
+    weekday_end_cb["values"] = FULL_TIME_OPTIONS
+    weekday_end_cb.grid(row=0, column=3, padx=5, pady=5)
+
+    ttk.Button(weekday_frame, text="Generate Weekday Slots", command=generate_weekday_slots).grid(row=0, column=4, padx=5, pady=5)
+
+    ttk.Label(weekday_frame, text="Weekday Time Ranking:").grid(row=1, column=0, columnspan=2, padx=5, pady=5, sticky="e")
+    weekday_listbox = tk.Listbox(weekday_frame, height=5, exportselection=False)
+    weekday_listbox.grid(row=1, column=2, columnspan=2, padx=5, pady=5)
+
+    weekday_button_frame = ttk.Frame(weekday_frame)
+    weekday_button_frame.grid(row=1, column=4, padx=5, pady=5)
+    ttk.Button(weekday_button_frame, text="Move Up", command=move_up_weekday).pack(fill="x", pady=2)
+    ttk.Button(weekday_button_frame, text="Move Down", command=move_down_weekday).pack(fill="x", pady=2)
+
+    # ---- Weekend Time Settings Frame ----
+    weekend_frame = ttk.LabelFrame(root, text="Weekend Time Settings")
+    weekend_frame.pack(padx=10, pady=5, fill="x")
+
+    weekend_start_var = tk.StringVar()
+    weekend_end_var = tk.StringVar()
+
+    ttk.Label(weekend_frame, text="Start Time:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
+    weekend_start_cb = ttk.Combobox(weekend_frame, textvariable=weekend_start_var, state="readonly", width=10)
+    weekend_start_cb["values"] = FULL_TIME_OPTIONS
+    weekend_start_cb.grid(row=0, column=1, padx=5, pady=5)
+
+    ttk.Label(weekend_frame, text="End Time:").grid(row=0, column=2, padx=5, pady=5, sticky="e")
+    weekend_end_cb = ttk.Combobox(weekend_frame, textvariable=weekend_end_var, state="readonly", width=10)
+    weekend_end_cb["values"] = FULL_TIME_OPTIONS
+    weekend_end_cb.grid(row=0, column=3, padx=5, pady=5)
+
+    ttk.Button(weekend_frame, text="Generate Weekend Slots", command=generate_weekend_slots).grid(row=0, column=4, padx=5, pady=5)
+
+    ttk.Label(weekend_frame, text="Weekend Time Ranking:").grid(row=1, column=0, columnspan=2, padx=5, pady=5, sticky="e")
+    weekend_listbox = tk.Listbox(weekend_frame, height=5, exportselection=False)
+    weekend_listbox.grid(row=1, column=2, columnspan=2, padx=5, pady=5)
+
+    weekend_button_frame = ttk.Frame(weekend_frame)
+    weekend_button_frame.grid(row=1, column=4, padx=5, pady=5)
+    ttk.Button(weekend_button_frame, text="Move Up", command=move_up_weekend).pack(fill="x", pady=2)
+    ttk.Button(weekend_button_frame, text="Move Down", command=move_down_weekend).pack(fill="x", pady=2)
+
+    # ---- Court Ranking Section ----
+    court_frame = ttk.LabelFrame(root, text="Court Ranking (shared by all days)")
+    court_frame.pack(padx=10, pady=5, fill="x")
+
+    court_listbox = tk.Listbox(court_frame, height=7, exportselection=False)
+    court_listbox.pack(side="left", padx=5, pady=5)
+
+    court_button_frame = ttk.Frame(court_frame)
+    court_button_frame.pack(side="left", padx=5, pady=5)
+    ttk.Button(court_button_frame, text="Move Up", command=move_up_court).pack(fill="x", pady=2)
+    ttk.Button(court_button_frame, text="Move Down", command=move_down_court).pack(fill="x", pady=2)
+
+    # ---- Bottom Buttons ----
+    bottom_frame = ttk.Frame(root)
+    bottom_frame.pack(padx=10, pady=10, fill="x")
+    ttk.Button(bottom_frame, text="Save", command=on_save).pack(side="left", padx=5)
+    ttk.Button(bottom_frame, text="Quit", command=root.destroy).pack(side="left", padx=5)
+
+    # ---- Load configuration and populate UI ----
+    config = load_config()
+    populate_ui_from_config(config)
+
+    root.mainloop()
+
+if __name__ == "__main__":
+    main()
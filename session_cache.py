@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# session_cache.py
+#
+# On-disk cache of an authenticated ClubLocker session (cookies, local
+# storage or an API token) so repeat runs can skip the login form.
+# The file is only readable by the current user and entries expire after
+# max_age_hours; anything stale, unreadable or too widely readable is ignored.
+# Racing and fleet sessions share the file, so every read-modify-write holds a
+# lock: a per-file thread lock, plus flock on a side file across processes.
+
+import os
+import json
+import time
+import stat
+import logging
+import hashlib
+import threading
+import contextlib
+try:
+    import fcntl
+except ImportError:
+    # Not on Windows; threads in one process are still serialised
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+# Cache path -> lock shared by every SessionCache on that file in this process
+_file_locks = {}
+_file_locks_guard = threading.Lock()
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "squash_booking", "session.json")
+DEFAULT_MAX_AGE_HOURS = 12
+
+def cache_key(username, base_url):
+    """Entries are per account and per site, without storing the username in clear"""
+    return hashlib.sha256(f"{username}@{base_url}".encode("utf-8")).hexdigest()[:16]
+
+class SessionCache:
+    """JSON file of {key: {"saved_at": epoch, ...session data}}"""
+    def __init__(self, path=None, max_age_hours=DEFAULT_MAX_AGE_HOURS):
+        self.path = path or os.getenv("SQUASH_SESSION_CACHE") or DEFAULT_CACHE_PATH
+        self.max_age = max_age_hours * 3600
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Hold the cache file's lock for a read-modify-write"""
+        with _file_locks_guard:
+            lock = _file_locks.setdefault(os.path.abspath(self.path), threading.Lock())
+        with lock:
+            if fcntl is None:
+                yield
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, mode=0o700, exist_ok=True)
+            fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                # Closing the descriptor releases the flock
+                os.close(fd)
+
+    def _read_all(self):
+        if not os.path.exists(self.path):
+            return {}
+        if os.name == "posix":
+            mode = os.stat(self.path).st_mode
+            if mode & (stat.S_IRWXG | stat.S_IRWXO):
+                log.warning("Ignoring session cache %s: it is readable by other users", self.path)
+                return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            log.warning("Ignoring unreadable session cache: %s", e)
+            return {}
+
+    def _write_all(self, entries):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        # Write to a private temp file first so a crash never leaves a partial cache
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.path)
+        if os.name == "posix":
+            os.chmod(self.path, 0o600)
+
+    def load(self, key):
+        """Return the cached session for key, or None if missing or expired"""
+        entry = self._read_all().get(key)
+        if not entry:
+            return None
+        if time.time() - entry.get("saved_at", 0) > self.max_age:
+            self.clear(key)
+            return None
+        return entry
+
+    def save(self, key, data):
+        """Store session data for key, stamped with the current time"""
+        with self._locked():
+            entries = self._read_all()
+            now = time.time()
+            # Drop other expired entries while we are rewriting the file anyway
+            entries = {k: v for k, v in entries.items() if now - v.get("saved_at", 0) <= self.max_age}
+            entries[key] = dict(data, saved_at=now)
+            self._write_all(entries)
+
+    def clear(self, key):
+        """Forget the cached session for key"""
+        with self._locked():
+            entries = self._read_all()
+            if entries.pop(key, None) is not None:
+                self._write_all(entries)
@@ -1,110 +1,445 @@
 import os
 import time
 import datetime
+import logging
 import argparse
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 from dotenv import load_dotenv
+from grid_snapshot import GridSnapshot
+from session_cache import cache_key
+from reservations import ReservationCache
+from retry_engine import classify_failure, TIMEOUT, NAVIGATION, SAVE_UNCERTAIN
+from page_capture import PageCapture
+from booking_log import setup_logging, flush_logs
+
+log = logging.getLogger(__name__)
 
 # Load credentials from .env file
 load_dotenv()
 CLUBLOCKER_USERNAME = os.getenv("CLUBLOCKER_USERNAME")
 CLUBLOCKER_PASSWORD = os.getenv("CLUBLOCKER_PASSWORD")
+CLUBLOCKER_BASE_URL = "https://clublocker.com"
+
+# Upper bounds (seconds) for each condition-based wait. Waits return as soon
+# as their condition holds, so these only matter when the site is slow.
+DEFAULT_TIMEOUTS = {
+    "login_page": 10,     # login form rendered
+    "login": 15,          # browser has left the login page
+    "grid": 15,           # reservation grid slots rendered
+    "reservations": 10,   # My Reservations / All Reservations view switch
+    "dialog": 10,         # booking dialog open after clicking a slot
+    "save": 10,           # Save button clickable and dialog closed
+}
+WAIT_POLL_INTERVAL = 0.1
+
+# "default" is the plain headless Chrome used so far. "lean" switches off
+# extensions and background networking, returns from page loads at
+# DOMContentLoaded, and blocks the resources below through DevTools.
+BROWSER_PROFILES = ("default", "lean")
+LEAN_CHROME_ARGUMENTS = [
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-translate",
+    "--no-first-run",
+    "--mute-audio",
+    "--blink-settings=imagesEnabled=false",
+]
+# Network.setBlockedURLs patterns: images, fonts, media and analytics hosts
+LEAN_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*.mp4", "*.webm", "*.mp3",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*hotjar.com*", "*segment.io*", "*intercom.io*", "*sentry.io*",
+    "*/analytics.js*", "*/gtag/js*",
+]
+
+def chrome_arguments(show_browser=False, profile="default"):
+    """Chrome switches for a booking browser (chrome_supervisor.py launches with the same ones)"""
+    arguments = [] if show_browser else ["--headless"]
+    arguments += [
+        "--disable-gpu",
+        "--window-size=1920,1080",
+        "--start-maximized",
+        "--disable-dev-shm-usage",
+        "--no-sandbox",
+        "--disable-logging",
+        "--log-level=3",
+    ]
+    if profile == "lean":
+        arguments += LEAN_CHROME_ARGUMENTS
+    return arguments
+
+GRID_SLOT_SELECTOR = "div.courts-container-inner usq-reservation-grid-slot"
+RESERVATION_ROW_XPATH = "//div[contains(@class, 'row')]//div[contains(@class, 'date-and-time')]"
+SAVE_BUTTON_XPATH = "//button[.//span[contains(text(), 'Save')]]"
+# Reads every reservation row (date and time text) in one WebDriver round trip
+RESERVATIONS_SCRAPE_SCRIPT = """
+const rows = document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+const found = [];
+for (let i = 0; i < rows.snapshotLength; i++) {
+    const row = rows.snapshotItem(i);
+    const date = row.querySelector(".date");
+    const time = row.querySelector(".time");
+    found.push({
+        date: date ? date.textContent.trim() : "",
+        time: time ? time.textContent.trim() : ""
+    });
+}
+return found;
+"""
+# Organization whose grid is loaded to check a session before any date is known
+DEFAULT_ORG_ID = "10515"
+
+LOCAL_STORAGE_DUMP_SCRIPT = "return Object.assign({}, window.localStorage);"
+LOCAL_STORAGE_RESTORE_SCRIPT = """
+const data = arguments[0] || {};
+Object.keys(data).forEach((key) => window.localStorage.setItem(key, data[key]));
+"""
 
-def format_line(text="", width=80, symbol="-"):
-    """Format a line with centered text and padding"""
-    if text:
-        return f" {text} ".center(width, symbol)
-    return symbol * width
+# Collects every court/slot on the grid in a single WebDriver round trip.
+# Columns are matched the same way as the old per-court XPath:
+# children of courts-container-inner whose class contains "column slots".
+GRID_SLOTS_FUNCTION = """
+function gridSlots() {
+    const inner = document.querySelector("div.courts-container-inner");
+    if (!inner) { return []; }
+    const columns = Array.from(inner.children).filter(
+        (el) => (el.getAttribute("class") || "").includes("column slots")
+    );
+    const slots = [];
+    columns.forEach((column, index) => {
+        column.querySelectorAll("usq-reservation-grid-slot div").forEach((el) => {
+            const classes = el.getAttribute("class") || "";
+            if (!classes.includes("slot")) { return; }
+            slots.push({
+                court: index + 1,
+                title: el.getAttribute("title") || "",
+                classes: classes,
+                element: el
+            });
+        });
+    });
+    return slots;
+}
+"""
+GRID_SNAPSHOT_SCRIPT = GRID_SLOTS_FUNCTION + "return gridSlots();"
+# Speculative confirm (see SquashBooking.confirm_prepared). In one async call:
+# wait for the reloaded grid, click the first of the prepared "court|start"
+# keys whose slot is open, wait for Save to be enabled, click it and wait for
+# the dialog to close. Polls in the page every 10 ms instead of once per
+# WebDriver round trip. Reports a status the caller can fall back on.
+CONFIRM_SCRIPT = GRID_SLOTS_FUNCTION + """
+const [keys, saveXPath, timeoutMs, testMode] = arguments;
+const done = arguments[arguments.length - 1];
+const started = performance.now();
+const saveButton = () => document.evaluate(
+    saveXPath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+).singleNodeValue;
+const visible = (el) => !!el && !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+function poll(check, onReady, onTimeout) {
+    const tick = () => {
+        const value = check();
+        if (value) { return onReady(value); }
+        if (performance.now() - started > timeoutMs) { return onTimeout(); }
+        setTimeout(tick, 10);
+    };
+    tick();
+}
+poll(() => {
+    const slots = gridSlots();
+    return slots.length ? slots : null;
+}, (slots) => {
+    const byKey = new Map();
+    slots.forEach((slot) => {
+        const key = slot.court + "|" + slot.title.split("\\n")[0].split(" - ")[0];
+        if (!byKey.has(key)) { byKey.set(key, slot); }
+    });
+    const index = keys.findIndex((key) => byKey.has(key) && byKey.get(key).classes.includes("slot open"));
+    if (index < 0) { return done({status: "none_open"}); }
+    const slot = byKey.get(keys[index]).element;
+    slot.scrollIntoView({block: "center"});
+    slot.click();
+    poll(() => {
+        const save = saveButton();
+        return visible(save) && !save.disabled ? save : null;
+    }, (save) => {
+        if (testMode) { return done({status: "ready", index: index}); }
+        save.click();
+        poll(() => !visible(saveButton()),
+             () => done({status: "booked", index: index}),
+             () => done({status: "save_timeout", index: index}));
+    }, () => done({status: "dialog_timeout", index: index}));
+}, () => done({status: "no_grid"}));
+"""
+# Why a speculative confirm handed back to the normal path
+CONFIRM_FALLBACKS = {
+    "none_open": "none of the prepared candidates is open",
+    "no_grid": "the grid did not render",
+    "dialog_timeout": "the booking dialog did not open",
+    "save_timeout": "the dialog did not close after Save",
+}
+
+def browser_peak_rss(root_pid):
+    """
+    Sum of the peak resident set size (VmHWM) of root_pid and all of its
+    descendants, in bytes. Reads /proc, so it returns None off Linux.
+    """
+    return process_tree_memory(root_pid, "VmHWM:")
+
+def browser_rss(root_pid):
+    """Current resident set size (VmRSS) of root_pid and its descendants, in bytes"""
+    return process_tree_memory(root_pid, "VmRSS:")
+
+def process_tree_memory(root_pid, field):
+    """Sum a /proc/<pid>/status memory field (in kB) over root_pid's process tree, in bytes"""
+    if not root_pid or not os.path.isdir("/proc"):
+        return None
+    parents = {}
+    peaks = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/status", "r") as f:
+                for line in f:
+                    if line.startswith("PPid:"):
+                        parents[int(entry)] = int(line.split()[1])
+                    elif line.startswith(field):
+                        peaks[int(entry)] = int(line.split()[1]) * 1024
+        except (OSError, ValueError):
+            continue
+    tree = {root_pid}
+    grew = True
+    while grew:
+        children = {pid for pid, ppid in parents.items() if ppid in tree} - tree
+        tree |= children
+        grew = bool(children)
+    return sum(peaks.get(pid, 0) for pid in tree)
 
 class SquashBooking:
-    def __init__(self, show_browser=False, test_mode=False, verbose=False):
+    def __init__(self, show_browser=False, test_mode=False, verbose=False, timeouts=None, base_url=CLUBLOCKER_BASE_URL,
+                 session_cache=None, username=None, password=None, profile="default", blocked_urls=None,
+                 capture_dir=None, profiler=None, debugger_address=None, remote_driver=None):
         self.test_mode = test_mode
+        self.base_url = base_url.rstrip("/")
         self.verbose = verbose
         self.driver = None
         self.wait = None
         self.show_browser = show_browser
+        self.grid_snapshot = None
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.wait_timings = []
+        self.session_cache = session_cache
+        # Default to the account from the environment; the fleet runner passes its own
+        self.username = username or CLUBLOCKER_USERNAME
+        self.password = password or CLUBLOCKER_PASSWORD
+        self.session_key = cache_key(self.username, self.base_url)
+        self.session_restored = False
+        if profile not in BROWSER_PROFILES:
+            raise ValueError(f"Unknown browser profile {profile!r} (choose from {', '.join(BROWSER_PROFILES)})")
+        self.profile = profile
+        self.blocked_urls = LEAN_BLOCKED_URLS + list(blocked_urls or [])
+        # (date, seconds from driver.get() to a rendered grid) per navigation
+        self.page_loads = []
+        self.peak_rss = None
+        # Failure kind of the last attempt_booking that returned False (see retry_engine)
+        self.last_failure = None
+        # The member's reservations, read once per session (see load_reservations)
+        self.reservations = None
+        self.booking_date = None
+        self.org_id = None
+        # Saves every grid and reservations page read, for offline replay (see page_capture)
+        self.capture = PageCapture(capture_dir) if capture_dir else None
+        # Times every WebDriver command when set (see command_profiler.py)
+        self.profiler = profiler
+        # Ranked candidates the speculative confirm will try (see prepare_speculative)
+        self.prepared = None
+        # Candidate the speculative confirm clicked Save for without seeing it finish
+        self.unconfirmed_entry = None
+        # A Chrome already listening for DevTools (host:port) and/or a running
+        # chromedriver or Selenium server URL; start_browser then spawns nothing
+        self.debugger_address = debugger_address
+        self.remote_driver = remote_driver
         
     def start_browser(self):
-        """Initialize the browser with appropriate options"""
+        """Initialize the browser with appropriate options, or attach to a running one"""
         chrome_options = Options()
-        if not self.show_browser:
-            chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--start-maximized")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-logging")
-        chrome_options.add_argument("--log-level=3")
-        chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
-        
-        self.driver = webdriver.Chrome(options=chrome_options)
+        if self.debugger_address:
+            # Chrome is already running (see chrome_supervisor.py); its switches were set at launch
+            chrome_options.debugger_address = self.debugger_address
+        else:
+            for argument in chrome_arguments(self.show_browser, self.profile):
+                chrome_options.add_argument(argument)
+            chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
+        if self.profile == "lean":
+            # Return from get() at DOMContentLoaded; the grid wait covers the rest
+            chrome_options.page_load_strategy = "eager"
+        
+        if self.remote_driver:
+            log.debug("Starting a session on %s%s", self.remote_driver,
+                      f" attached to Chrome at {self.debugger_address}" if self.debugger_address else "")
+            self.driver = webdriver.Remote(command_executor=self.remote_driver, options=chrome_options)
+        else:
+            if self.debugger_address:
+                log.debug("Attaching to Chrome at %s", self.debugger_address)
+            self.driver = webdriver.Chrome(options=chrome_options)
+        if self.profiler is not None:
+            # Time every WebDriver round trip from the first one on
+            self.profiler.instrument(self)
         self.wait = WebDriverWait(self.driver, 10)
+        if self.profile == "lean":
+            self.block_resources()
+        
+        if self.session_cache is not None:
+            self.session_restored = self.restore_session()
+            
+    def block_resources(self):
+        """Have Chrome drop requests for non-essential resources (lean profile)"""
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.blocked_urls})
+            log.debug("Blocking %d URL patterns", len(self.blocked_urls))
+        except Exception as e:
+            # Not every driver speaks CDP; the lean flags still apply
+            log.warning("Note: Could not block resources: %s", e)
+            
+    def restore_session(self):
+        """Load cached cookies/local storage and check them on the real grid page; True if still valid"""
+        cached = self.session_cache.load(self.session_key)
+        if not cached:
+            return False
+        try:
+            # Cookies and local storage can only be set once we are on the site's origin
+            self.driver.get(f"{self.base_url}/login")
+            now = time.time()
+            for cookie in cached.get("cookies", []):
+                if cookie.get("expiry") and cookie["expiry"] < now:
+                    continue
+                if "expiry" in cookie:
+                    cookie["expiry"] = int(cookie["expiry"])
+                self.driver.add_cookie(cookie)
+            self.driver.execute_script(LOCAL_STORAGE_RESTORE_SCRIPT, cached.get("local_storage", {}))
+            
+            valid = self.grid_page_logged_in()
+        except Exception as e:
+            log.warning("Could not restore cached session: %s", e)
+            valid = False
+        if valid:
+            age_minutes = (time.time() - cached.get("saved_at", time.time())) / 60
+            log.info("Restored cached session (saved %.0f min ago)", age_minutes)
+            return True
+        
+        log.info("Cached session is no longer valid; logging in again")
+        self.session_cache.clear(self.session_key)
+        self.driver.delete_all_cookies()
+        return False
+        
+    def grid_page_logged_in(self):
+        """
+        Load a reservation grid and tell whether the site kept us there (True)
+        or sent us to the login page (False). Raises if neither shows up.
+        """
+        booking_date = self.booking_date or datetime.date.today().strftime("%Y-%m-%d")
+        self.driver.get(f"{self.base_url}/organizations/{self.org_id or DEFAULT_ORG_ID}/reservations/{booking_date}/grid")
+        self.grid_snapshot = None
+        self.wait_for(
+            "grid",
+            lambda d: self.on_login_page(d) or self.grid_rendered(d),
+            "reservation grid or login redirect",
+        )
+        return not self.on_login_page(self.driver)
+        
+    def on_login_page(self, driver):
+        """Wait condition: the site redirected to (or rendered) the login form"""
+        return "/login" in driver.current_url or len(driver.find_elements(By.ID, "loginpass")) > 0
+        
+    def save_session(self):
+        """Store the current cookies and local storage in the session cache"""
+        try:
+            self.session_cache.save(self.session_key, {
+                "cookies": self.driver.get_cookies(),
+                "local_storage": self.driver.execute_script(LOCAL_STORAGE_DUMP_SCRIPT) or {},
+            })
+        except Exception as e:
+            # A cache failure must never break a booking run
+            log.warning("Note: Could not save session cache: %s", e)
+        
+    def wait_for(self, phase, condition, description):
+        """Wait until condition holds, bounded by the phase timeout, and report the time taken"""
+        timeout = self.timeouts.get(phase, DEFAULT_TIMEOUTS.get(phase, 10))
+        started = time.perf_counter()
+        try:
+            result = WebDriverWait(self.driver, timeout, poll_frequency=WAIT_POLL_INTERVAL).until(condition)
+        except TimeoutException:
+            elapsed = time.perf_counter() - started
+            self.wait_timings.append((phase, description, elapsed, False))
+            log.warning("[WAIT] %s: timed out after %.2fs waiting for %s", phase, elapsed, description,
+                        extra={"phase": phase, "seconds": elapsed, "satisfied": False})
+            raise
+        elapsed = time.perf_counter() - started
+        self.wait_timings.append((phase, description, elapsed, True))
+        log.debug("[WAIT] %s: %s after %.2fs", phase, description, elapsed,
+                  extra={"phase": phase, "seconds": elapsed, "satisfied": True})
+        return result
+        
+    def grid_rendered(self, driver):
+        """Wait condition: at least one reservation grid slot is on the page"""
+        return len(driver.find_elements(By.CSS_SELECTOR, GRID_SLOT_SELECTOR)) > 0
         
     def login(self):
         """Log in to the ClubLocker website"""
-        print("\n=== Step 1: Login ===")
-        login_url = "https://clublocker.com/login"
-        print(f"Navigating to login page: {login_url}")
+        log.info("Step 1: Login", extra={"heading": True})
+        if self.session_restored:
+            log.info("Using restored session; skipping login form")
+            return
+        login_url = f"{self.base_url}/login"
+        log.info("Navigating to login page: %s", login_url)
         self.driver.get(login_url)
-        time.sleep(5)
+        self.wait_for("login_page", EC.presence_of_element_located((By.ID, "login")), "login form")
         
-        print("Entering credentials...")
-        self.driver.find_element(By.ID, "login").send_keys(CLUBLOCKER_USERNAME)
-        self.driver.find_element(By.ID, "loginpass").send_keys(CLUBLOCKER_PASSWORD)
+        log.info("Entering credentials...")
+        self.driver.find_element(By.ID, "login").send_keys(self.username)
+        self.driver.find_element(By.ID, "loginpass").send_keys(self.password)
         login_button = self.driver.find_element(By.XPATH, "//div[contains(@class, 'login-btn')]/button[@type='submit']")
         login_button.click()
-        time.sleep(5)
-        print("Login complete. Page title:", self.driver.title)
-        
-    def check_existing_bookings(self, target_date):
-        """Check if there are any existing bookings on the target date"""
-        print(f"\n=== Checking for existing bookings on {target_date} ===")
+        self.wait_for("login", lambda d: "/login" not in d.current_url, "redirect away from login page")
+        log.info("Login complete. Page title: %s", self.driver.title)
+        if self.session_cache is not None:
+            self.save_session()
         
-        # Click the "My Reservations" button to switch to reservations view
+    def load_reservations(self):
+        """Open My Reservations once, scrape every row with one script call, and switch back"""
         try:
             reservations_button = self.wait.until(
                 EC.element_to_be_clickable((By.XPATH, "//button[.//span[contains(text(), 'My Reservations')]]"))
             )
             reservations_button.click()
-            time.sleep(2)  # Wait for the view to switch
-            
-            # Check both upcoming and past reservations
-            booking_elements = self.driver.find_elements(
-                By.XPATH,
-                "//div[contains(@class, 'row')]//div[contains(@class, 'date-and-time')]"
+            # The view has switched once reservation rows show up or the grid is gone
+            self.wait_for(
+                "reservations",
+                lambda d: d.find_elements(By.XPATH, RESERVATION_ROW_XPATH)
+                or not d.find_elements(By.CSS_SELECTOR, GRID_SLOT_SELECTOR),
+                "reservations view",
             )
-            
-            for element in booking_elements:
-                date_element = element.find_element(By.CLASS_NAME, "date")
-                time_element = element.find_element(By.CLASS_NAME, "time")
-                
-                booking_date = date_element.text
-                booking_time = time_element.text
-                
-                # Convert the date format from "Thu, Apr 10" to match our target date format
-                try:
-                    booking_date_obj = datetime.datetime.strptime(booking_date, "%a, %b %d")
-                    # Set the year to match our target date
-                    booking_date_obj = booking_date_obj.replace(year=datetime.datetime.strptime(target_date, "%Y-%m-%d").year)
-                    
-                    if booking_date_obj.strftime("%Y-%m-%d") == target_date:
-                        print(f"Found existing booking: {booking_date} at {booking_time}")
-                        return True
-                except Exception as e:
-                    print(f"Error parsing booking date: {e}")
-                    continue
-            
-            print("No existing bookings found for this date")
-            return False
-            
+            rows = self.driver.execute_script(RESERVATIONS_SCRAPE_SCRIPT, RESERVATION_ROW_XPATH) or []
+            self.capture_page("reservations", rows)
+            self.reservations = ReservationCache.from_rows(rows)
+            for row in rows:
+                log.debug("  Reservation: %s at %s", row["date"], row["time"])
+            log.info("Loaded %s reservation(s) on %s date(s)", len(rows), len(self.reservations))
         except Exception as e:
-            print(f"Error checking existing bookings: {e}")
-            return False
+            log.error("Error checking existing bookings: %s", e)
         finally:
             # Try to switch back to grid view using the "All Reservations" button
             try:
@@ -114,101 +449,299 @@ class SquashBooking:
                 )
                 if all_reservations_button:
                     self.driver.execute_script("arguments[0].click();", all_reservations_button[0])
-                    time.sleep(2)  # Wait for the view to switch back
+                    self.wait_for("reservations", self.grid_rendered, "grid view after switching back")
             except Exception as e:
                 # This is not critical, so we just log it and continue
-                print("Note: Could not switch back to grid view - continuing anyway")
+                log.warning("Note: Could not switch back to grid view - continuing anyway")
+            # Switching views re-renders the grid, so any earlier handles are stale
+            self.grid_snapshot = None
+        return self.reservations
+
+    def clear_reservations(self):
+        """Forget the cached reservations so the next check reads them from the site again"""
+        self.reservations = None
 
-    def navigate_to_date(self, booking_date, org_id):
+    def check_existing_bookings(self, target_date):
+        """Check if there are any existing bookings on the target date"""
+        log.info("Checking for existing bookings on %s", target_date, extra={"heading": True})
+        if self.reservations is None and self.load_reservations() is None:
+            # Couldn't read the list; carry on as before rather than skip the date
+            return False
+        if target_date in self.reservations:
+            log.info("Found existing booking on %s", target_date, extra={"booking_date": target_date})
+            return True
+        log.info("No existing bookings found for this date")
+        return False
+
+    def navigate_to_date(self, booking_date, org_id, check_existing=True):
         """Navigate to the booking page for the specified date"""
-        print(f"\n=== Step 2: Navigating to booking date {booking_date} ===")
-        booking_url = f"https://clublocker.com/organizations/{org_id}/reservations/{booking_date}/grid"
-        print(f"Navigating to booking page: {booking_url}")
+        log.info("Step 2: Navigating to booking date %s", booking_date, extra={"heading": True})
+        self.booking_date = booking_date
+        self.org_id = org_id
+        # Known booked dates don't need their grid loaded at all
+        if check_existing and self.reservations is not None and booking_date in self.reservations:
+            log.info("Found existing booking for this date!", extra={"banner": "!"})
+            return False
+        booking_url = f"{self.base_url}/organizations/{org_id}/reservations/{booking_date}/grid"
+        log.info("Navigating to booking page: %s", booking_url)
+        load_started = time.perf_counter()
         self.driver.get(booking_url)
-        time.sleep(5)
+        self.grid_snapshot = None
+        self.wait_for("grid", self.grid_rendered, "reservation grid")
+        self.page_loads.append((booking_date, time.perf_counter() - load_started))
+        if not check_existing:
+            return True
         
         # Check for existing bookings before proceeding
-        if self.check_existing_bookings(booking_date):
-            print("\n" + format_line("Found existing booking for this date!", symbol="!"))
+        has_booking = self.check_existing_bookings(booking_date)
+        if has_booking:
+            log.info("Found existing booking for this date!", extra={"banner": "!"})
             return False
         return True
         
+    def refresh_grid(self):
+        """Reload the current grid page and take a fresh snapshot"""
+        self.driver.refresh()
+        self.grid_snapshot = None
+        self.wait_for("grid", self.grid_rendered, "reservation grid after refresh")
+        return self.snapshot_grid()
+        
+    def snapshot_grid(self):
+        """Read every court/slot on the grid with one script call and index it"""
+        raw_slots = self.driver.execute_script(GRID_SNAPSHOT_SCRIPT) or []
+        self.grid_snapshot = GridSnapshot(raw_slots)
+        self.capture_page("grid", raw_slots)
+        log.debug("Grid snapshot: %d slots across %d courts", len(self.grid_snapshot),
+                  len(self.grid_snapshot.court_counts))
+        return self.grid_snapshot
+        
+    def capture_page(self, kind, extracted):
+        """Save the current page and what was read from it, if capture mode is on"""
+        if self.capture is None:
+            return
+        try:
+            # Element handles can't be saved; everything else is plain data
+            extracted = [{k: v for k, v in item.items() if k != "element"} for item in extracted]
+            path = self.capture.save(kind, self.booking_date, self.driver.page_source, extracted, self.driver.current_url)
+            log.debug("Captured %s page to %s", kind, path)
+        except Exception as e:
+            # A capture failure must never break a booking run
+            log.warning("Note: Could not capture the %s page: %s", kind, e)
+        
     def check_slot_availability(self, court_number, time_slot):
         """Check if a specific slot is available for booking"""
-        print(f"\n=== Step 3: Checking availability for Court {court_number} at {time_slot} ===")
+        log.info("Step 3: Checking availability for Court %s at %s", court_number, time_slot, extra={"heading": True})
         desired_start_time = time_slot.split(" - ")[0]
         
-        # Get all slots for the desired court
-        court_slots = self.driver.find_elements(
-            By.XPATH,
-            f"//div[contains(@class, 'courts-container-inner')]"
-            f"/div[contains(@class, 'column slots')][{court_number}]"
-            f"//usq-reservation-grid-slot//div[contains(@class, 'slot')]"
-        )
-        
-        print(f"Found {len(court_slots)} total slots on court {court_number}")
+        # Reuse the current snapshot; it is only rebuilt after the page changes
+        snapshot = self.grid_snapshot or self.snapshot_grid()
+        log.debug("Found %d total slots on court %s", snapshot.court_counts.get(court_number, 0), court_number)
         
-        # Find the slot with matching start time
-        for slot in court_slots:
-            title = slot.get_attribute('title')
-            classes = slot.get_attribute('class')
+        fields = {"court": court_number, "time_slot": time_slot}
+        entry = snapshot.get(court_number, desired_start_time)
+        if entry is None:
+            log.info("[NOT FOUND] No slot found for Court %s at %s", court_number, time_slot,
+                     extra=dict(fields, state="missing"))
+            return None
             
-            # Split the title to get the time range
-            title_lines = title.split('\n')
-            if len(title_lines) > 0:
-                slot_time_range = title_lines[0]
-                slot_start_time = slot_time_range.split(" - ")[0]
-                
-                if slot_start_time == desired_start_time:
-                    print(f"\nFound slot at {desired_start_time}:")
-                    print(f"  Status: {'Available' if 'slot open' in classes else 'Not Available'}")
-                    print(f"  Details: {slot_time_range}")
-                    
-                    if "slot open" in classes:
-                        print("  [AVAILABLE] This slot is available for booking!")
-                        return slot
-                    else:
-                        print("  [UNAVAILABLE] This slot is not available")
-                        return None
-        
-        print(f"\n[NOT FOUND] No slot found for Court {court_number} at {time_slot}")
+        if entry["open"]:
+            log.info("  [AVAILABLE] %s is available for booking", entry["time_range"], extra=dict(fields, state="open"))
+            return entry["element"]
+        log.info("  [UNAVAILABLE] %s is not available", entry["time_range"], extra=dict(fields, state="taken"))
         return None
         
-    def attempt_booking(self, slot):
-        """Attempt to book the specified slot"""
-        print(f"\n=== Step 4: Attempting to book slot ===")
+    def attempt_booking(self, slot, before_save=None):
+        """
+        Attempt to book the specified slot.
+        
+        before_save, if given, is called right before Save is clicked; returning
+        False cancels the booking (used to stop racing sessions double-booking).
+        """
+        log.info("Step 4: Attempting to book slot", extra={"heading": True})
         
-        # Highlight the slot before clicking
-        self.driver.execute_script("arguments[0].style.border='3px solid red'", slot)
-        time.sleep(2)
+        # Highlight the slot before clicking (only useful when someone is watching)
+        if self.show_browser:
+            self.driver.execute_script("arguments[0].style.border='3px solid red'", slot)
         
         slot.click()
-        time.sleep(3)
+        # The click opens the booking dialog, so the snapshot no longer matches the page
+        self.grid_snapshot = None
 
-        if self.test_mode:
-            print("TEST MODE: Would click on Save to confirm the booking.")
-            return True
-            
+        # Once past before_save, any failure may have come after the booking went through
+        saving = False
         try:
-            xpath_save = "//button[.//span[contains(text(), 'Save')]]"
-            if self.verbose:
-                print("Locating Save button with XPath:", xpath_save)
+            log.debug("Waiting for booking dialog with Save button: %s", SAVE_BUTTON_XPATH)
+            self.wait_for("dialog", EC.visibility_of_element_located((By.XPATH, SAVE_BUTTON_XPATH)), "booking dialog")
+            save_button = self.wait_for("save", EC.element_to_be_clickable((By.XPATH, SAVE_BUTTON_XPATH)), "Save enabled")
+            log.debug("Save button found and is clickable")
+            
+            if before_save is not None and not before_save():
+                log.info("[CANCELLED] Booking cancelled before Save")
+                return False
             
-            save_button = self.wait.until(EC.element_to_be_clickable((By.XPATH, xpath_save)))
-            print("Save button found and is clickable")
+            if self.test_mode:
+                log.info("TEST MODE: Would click on Save to confirm the booking.")
+                return True
+            
+            saving = True
             save_button.click()
-            print("[SUCCESS] Booking confirmed!")
-            time.sleep(3)
+            self.wait_for("save", EC.invisibility_of_element_located((By.XPATH, SAVE_BUTTON_XPATH)), "booking dialog closed")
+            log.info("[SUCCESS] Booking confirmed!", extra={"booking_date": self.booking_date, "outcome": "booked"})
+            if self.reservations is not None and self.booking_date:
+                self.reservations.add(self.booking_date)
             return True
         except Exception as e:
-            print(f"[ERROR] Error during booking: {str(e)}")
+            self.last_failure = SAVE_UNCERTAIN if saving else classify_failure(e)
+            log.error("[ERROR] Error during booking: %s", e, extra={"failure": self.last_failure})
+            return False
+            
+    def prepare_speculative(self, entries):
+        """
+        Get ready, before release, to book with a single script call: check the
+        top candidate is on the grid, remember the ranked candidates and allow
+        the confirm script enough time. Nothing on the page is set up, since
+        confirm_prepared reloads it. Returns True if confirm_prepared can run.
+        """
+        self.prepared = None
+        if not entries:
+            return False
+        snapshot = self.grid_snapshot or self.snapshot_grid()
+        top = snapshot.get(entries[0]["court"], entries[0]["time_slot"].split(" - ")[0])
+        if top is None:
+            log.warning("Note: Court %s at %s is not on the grid; booking the normal way", entries[0]['court'],
+                        entries[0]['time_slot'])
+            return False
+        try:
+            self.driver.set_script_timeout(self.confirm_timeout() + 5)
+        except Exception as e:
+            log.warning("Note: Could not prepare the speculative confirm: %s", e)
             return False
+        self.prepared = list(entries)
+        log.info("Speculative confirm ready for %s candidate(s), top: Court %s at %s", len(entries),
+                 entries[0]['court'], entries[0]['time_slot'])
+        return True
+        
+    def confirm_timeout(self):
+        """Seconds the confirm script may take: grid, dialog and save waits together"""
+        return sum(self.timeouts.get(phase, DEFAULT_TIMEOUTS[phase]) for phase in ("grid", "dialog", "save"))
+        
+    def confirm_prepared(self):
+        """
+        At release: reload the grid and run CONFIRM_SCRIPT, which clicks the
+        first open prepared candidate and then Save in one round trip. Returns
+        the booked entry, or None to fall back to the normal path (nothing
+        open yet, or the page didn't behave as expected). If Save may have been
+        clicked, last_failure is SAVE_UNCERTAIN and unconfirmed_entry is the
+        candidate it was clicked for (None if unknown); the caller must check
+        the reservations before booking anything else.
+        """
+        entries, self.prepared = self.prepared, None
+        self.last_failure = None
+        self.unconfirmed_entry = None
+        if not entries:
+            return None
+        log.info("Step 4: Speculative confirm", extra={"heading": True})
+        keys = [f"{int(e['court'])}|{e['time_slot'].split(' - ')[0]}" for e in entries]
+        started = time.perf_counter()
+        try:
+            self.driver.refresh()
+            self.grid_snapshot = None
+        except Exception as e:
+            log.warning("Speculative confirm failed (%s); booking the normal way", e)
+            self.last_failure = classify_failure(e)
+            return None
+        try:
+            result = self.driver.execute_async_script(
+                CONFIRM_SCRIPT, keys, SAVE_BUTTON_XPATH, int(self.confirm_timeout() * 1000), self.test_mode
+            ) or {}
+        except Exception as e:
+            # The script may have clicked Save before it failed or timed out
+            log.warning("Speculative confirm failed (%s); checking the reservations before anything else", e)
+            self.last_failure = SAVE_UNCERTAIN
+            return None
+        status = result.get("status")
+        booked = status in ("booked", "ready")
+        self.wait_timings.append(("confirm", f"speculative confirm: {status}", time.perf_counter() - started, booked))
+        if not booked:
+            log.info("Speculative confirm handed back: %s", CONFIRM_FALLBACKS.get(status, status),
+                     extra={"status": status})
+            if status == "save_timeout":
+                self.last_failure = SAVE_UNCERTAIN
+                self.unconfirmed_entry = entries[result["index"]]
+            elif status == "dialog_timeout":
+                self.last_failure = TIMEOUT
+            elif status == "no_grid":
+                self.last_failure = NAVIGATION
+            return None
+        entry = entries[result["index"]]
+        log.info("  Court %s at %s", entry['court'], entry['time_slot'],
+                 extra={"court": entry["court"], "time_slot": entry["time_slot"], "status": status})
+        if status == "ready":
+            log.info("TEST MODE: Would click on Save to confirm the booking.")
+            return entry
+        log.info("[SUCCESS] Booking confirmed!", extra={"booking_date": self.booking_date, "outcome": "booked"})
+        if self.reservations is not None and self.booking_date:
+            self.reservations.add(self.booking_date)
+        return entry
             
+    def attached(self):
+        """True if the browser outlives this session (it was not started by start_browser)"""
+        return bool(self.debugger_address or self.remote_driver)
+        
+    def measure_peak_rss(self):
+        """Peak RSS of chromedriver and every Chrome process it started, in bytes"""
+        if self.attached():
+            # Chrome is not a child of this process; chrome_supervisor.py watches it
+            return self.peak_rss
+        process = getattr(getattr(self.driver, "service", None), "process", None)
+        if process is not None:
+            self.peak_rss = browser_peak_rss(process.pid) or self.peak_rss
+        return self.peak_rss
+        
+    def current_rss(self):
+        """Current RSS of chromedriver and its Chrome processes in bytes (None if unknown)"""
+        if self.attached():
+            return None
+        process = getattr(getattr(self.driver, "service", None), "process", None)
+        return browser_rss(process.pid) if process is not None else None
+        
+    def session_alive(self):
+        """True if the browser still responds and the site still accepts our session"""
+        if not self.driver:
+            return False
+        try:
+            return self.grid_page_logged_in()
+        except Exception as e:
+            log.warning("Session check failed: %s", e)
+            return False
+        
     def close(self):
-        """Close the browser"""
+        """Close the browser (an attached Chrome only loses this session and keeps running)"""
         if self.driver:
+            self.measure_peak_rss()
             self.driver.quit()
             self.driver = None
+            
+    def print_wait_summary(self):
+        """Print how long each condition-based wait actually took"""
+        if not self.wait_timings:
+            return
+        log.info("Wait timings", extra={"banner": "-"})
+        total = 0.0
+        for phase, description, elapsed, satisfied in self.wait_timings:
+            total += elapsed
+            status = "ok" if satisfied else "TIMEOUT"
+            log.info("  %-13s %6.2fs  %-7s %s", phase, elapsed, status, description,
+                     extra={"phase": phase, "seconds": elapsed, "satisfied": satisfied})
+        log.info("  total         %6.2fs", total)
+        
+        log.info("Browser profile: %s", self.profile, extra={"banner": "-"})
+        if self.page_loads:
+            average = sum(seconds for _, seconds in self.page_loads) / len(self.page_loads)
+            log.info("  Page loads:  %s, average %.2fs to a rendered grid", len(self.page_loads), average)
+        peak = self.measure_peak_rss() if self.driver else self.peak_rss
+        if peak:
+            log.info("  Peak RSS:    %.0f MB (chromedriver and Chrome processes)", peak / (1024 * 1024))
 
 def main():
     # Parse command line arguments
@@ -222,6 +755,7 @@ def main():
     parser.add_argument("--verbose", action="store_true", help="Show verbose debugging output")
     parser.add_argument("--show_browser", action="store_true", help="Show browser window during booking")
     args = parser.parse_args()
+    setup_logging(args.verbose)
 
     # Initialize the booking system
     booking = SquashBooking(
@@ -250,17 +784,16 @@ def main():
             # Attempt to book if available
             success = booking.attempt_booking(slot)
             if success:
-                print("\nBooking successful! Press Enter to close the browser...")
+                log.info("Booking successful! Press Enter to close the browser...", extra={"gap": True})
+                flush_logs()
                 input()
         else:
-            print("\nNo available slot found. Press Enter to close the browser...")
+            log.info("No available slot found. Press Enter to close the browser...", extra={"gap": True})
+            flush_logs()
             input()
             
     except Exception as e:
-        print(f"\nAn error occurred: {str(e)}")
-        import traceback
-        print("Full traceback:")
-        print(traceback.format_exc())
+        log.exception("An error occurred: %s", e, extra={"gap": True})
     finally:
         booking.close()
 
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+#
+# tests/conftest.py
+#
+# The modules live at the repo root rather than in a package; put it on the
+# path so the tests import them the way the scripts do.
+
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_availability.py
+
+from availability import AvailabilityMatrix, parse_clock, bits
+
+def slot_row(court, first, last, length, taken=()):
+    """(court, start, end, open) for every slot on court from first to last (minutes)"""
+    return [(court, start, start + length, start not in taken) for start in range(first, last, length)]
+
+def matrix():
+    # Courts 1-3: 40-minute slots from 7:00 PM; court 4 starts 20 minutes later
+    slots = (
+        slot_row(1, 1140, 1260, 40, taken={1180})
+        + slot_row(2, 1140, 1260, 40)
+        + slot_row(3, 1140, 1260, 40, taken={1140})
+        + slot_row(4, 1160, 1240, 40)
+    )
+    return AvailabilityMatrix(slots)
+
+def test_parse_clock():
+    assert parse_clock("7:00 AM") == 420
+    assert parse_clock("07:40 PM") == 1180
+    assert parse_clock("12:00 AM") == 0
+    assert parse_clock("12:20 PM") == 740
+    assert parse_clock("noon") is None
+    assert parse_clock(None) is None
+
+def test_bits():
+    assert list(bits(0b101001)) == [0, 3, 5]
+    assert list(bits(0)) == []
+
+def test_tick_is_the_common_step():
+    m = matrix()
+    assert m.tick_minutes == 20
+    assert m.tick(1160) == 58
+    assert m.tick(1150) is None
+    assert m.courts == [1, 2, 3, 4]
+
+def test_is_open():
+    m = matrix()
+    assert m.is_open(1, 1140)
+    assert not m.is_open(1, 1180)
+    assert not m.is_open(3, 1140)
+    assert m.is_open("4", 1160)
+    # Off-tick minutes and unknown courts are never open
+    assert not m.is_open(1, 1150)
+    assert not m.is_open(9, 1140)
+
+def test_window_queries():
+    m = matrix()
+    assert m.open_in_window(1, 1140, 1260) == [1140, 1220]
+    # The window's end is exclusive
+    assert m.open_in_window(2, 1140, 1220) == [1140, 1180]
+    assert m.first_open_in_window(1170, 1260) == (2, 1180)
+    # Court ranking breaks ties between courts open at the same earliest tick
+    assert m.first_open_in_window(1140, 1260, court_ranking=[2, 1]) == (2, 1140)
+    assert m.first_open_in_window(1140, 1260) == (1, 1140)
+    assert m.first_open_in_window(600, 700) is None
+
+def test_adjacent_courts():
+    m = matrix()
+    # At 7:00 PM courts 1 and 2 are open, 3 is taken
+    assert m.open_courts_at(1140) == (1 << 1) | (1 << 2)
+    assert m.adjacent_courts(1140) == [1]
+    # At 8:20 PM courts 1-3 are all open
+    assert m.adjacent_courts(1220, count=3) == [1]
+    assert m.adjacent_courts(1220, count=2) == [1, 2]
+    assert m.adjacent_courts(1150) == []
+
+def test_back_to_back():
+    m = matrix()
+    # Court 2 is open all evening: 7:00-8:20 and 7:40-9:00
+    assert m.back_to_back(2, slots=2) == [1140, 1180]
+    # Court 1's 7:40 slot is taken, so no two slots in a row
+    assert m.back_to_back(1, slots=2) == []
+    assert m.back_to_back(3, slots=2) == [1180]
+    assert m.back_to_back(2, slots=3) == [1140]
+    assert m.back_to_back(2, slots=2, window=(1160, 1260)) == [1180]
+    # Court 4's slots are offset by one tick but still 40 minutes long
+    assert m.back_to_back(4, slots=2) == [1160]
+
+def test_open_candidates_in_ranked_order():
+    m = matrix()
+    day_schedule = [
+        {"court": 3, "time_slot": "7:00 PM - 7:40 PM"},
+        {"court": 1, "time_slot": "7:00 PM - 7:40 PM"},
+        {"court": 1, "time_slot": "7:40 PM - 8:20 PM"},
+        {"court": 4, "time_slot": "7:20 PM - 8:00 PM"},
+    ]
+    assert [rank for rank, _ in m.open_candidates(day_schedule)] == [2, 4]
+    assert m.first_open(day_schedule) == day_schedule[1]
+    assert m.first_open(day_schedule[:1]) is None
+    assert m.count_open() == 2 + 3 + 2 + 2
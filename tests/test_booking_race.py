@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_booking_race.py
+
+import threading
+
+from availability import AvailabilityMatrix
+from booking_race import BookingRace
+from preferences import SlotOptimizer
+from release_timer import FakeClock
+from retry_engine import RetryEngine, SAVE_UNCERTAIN, SLOT_TAKEN
+from run_scheduled_bookings import attempt_candidate, book_from_schedule
+
+BOOKING_DATE = "2026-10-20"
+DAY_SCHEDULE = [
+    {"court": 1, "time_slot": "7:00 PM - 7:40 PM"},
+    {"court": 2, "time_slot": "7:00 PM - 7:40 PM"},
+    {"court": 3, "time_slot": "7:00 PM - 7:40 PM"},
+]
+
+class FakeSnapshot:
+    """Grid with a 7:00 PM slot open on courts 1-3"""
+    def __len__(self):
+        return 3
+
+    def availability(self):
+        return AvailabilityMatrix([(court, 1140, 1180, True) for court in (1, 2, 3)])
+
+class FakeSite:
+    """What every racing session books against: the first Save books, unless save_failure says otherwise"""
+    def __init__(self, save_failure=None):
+        self.lock = threading.Lock()
+        self.save_failure = save_failure
+        self.booked = None
+        self.saves = []
+
+class FakeBooking:
+    def __init__(self, site):
+        self.site = site
+        self.grid_snapshot = FakeSnapshot()
+        self.booking_date = None
+        self.last_failure = None
+        # My Reservations can't be read
+        self.reservations = None
+
+    def start_browser(self):
+        pass
+
+    def login(self):
+        pass
+
+    def close(self):
+        pass
+
+    def navigate_to_date(self, booking_date, org_id, check_existing=True):
+        self.booking_date = booking_date
+        return True
+
+    def check_slot_availability(self, court, timeslot):
+        return (court, timeslot)
+
+    def attempt_booking(self, slot, before_save=None):
+        if before_save is not None and not before_save():
+            self.last_failure = SLOT_TAKEN
+            return False
+        with self.site.lock:
+            self.site.saves.append(slot)
+            if self.site.save_failure:
+                self.last_failure = self.site.save_failure
+                return False
+            if self.site.booked:
+                self.last_failure = SLOT_TAKEN
+                return False
+            self.site.booked = slot
+            return True
+
+    def clear_reservations(self):
+        pass
+
+    def check_existing_bookings(self, booking_date):
+        return False
+
+def book_one(session_id, booking, guard, select):
+    clock = FakeClock()
+    engine = RetryEngine(clock=clock.time, sleep=clock.sleep, rng=lambda: 0.5)
+    return book_from_schedule(booking, DAY_SCHEDULE, engine, SlotOptimizer(),
+                              attempt=guard(attempt_candidate), select=select)
+
+def make_race(site, strategy="round_robin"):
+    return BookingRace(lambda: FakeBooking(site), DAY_SCHEDULE, BOOKING_DATE, 0, book_one,
+                       sessions=3, strategy=strategy)
+
+def test_only_one_session_books():
+    site = FakeSite()
+    race = make_race(site)
+    winner = race.run()
+    assert (winner["court"], winner["time_slot"]) == site.booked
+    # Nobody clicked Save after the win
+    assert site.saves == [site.booked]
+    assert sorted(race.results.values()).count("cancelled") == 2
+
+def test_queue_tries_each_candidate_once():
+    site = FakeSite(save_failure=SLOT_TAKEN)
+    race = make_race(site, strategy="queue")
+    assert race.run() is None
+    assert sorted(site.saves) == [(court, "7:00 PM - 7:40 PM") for court in (1, 2, 3)]
+    assert set(race.results.values()) == {"no open slot"}
+
+def test_uncertain_save_stops_every_session():
+    site = FakeSite(save_failure=SAVE_UNCERTAIN)
+    race = make_race(site)
+    assert race.run() is None
+    # The one Save that may have booked is kept; nobody else clicked Save
+    assert len(site.saves) == 1
+    session_id, entry = race.claim.uncertain
+    assert race.results[session_id] == f"save uncertain on Court {entry['court']} at {entry['time_slot']}"
+    assert sorted(race.results.values()).count("cancelled") == 2
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_clublocker_http.py
+#
+# The HTTP backend against an in-process clublocker_standin.py.
+
+import argparse
+
+import requests
+import pytest
+
+import clublocker_http
+import run_scheduled_bookings as runner
+from clublocker_http import ClubLockerHTTPBooking, BookingHTTPError, is_loopback, save_failure
+from clublocker_standin import start_standin
+from retry_engine import SAVE_UNCERTAIN, SLOT_TAKEN, SESSION_EXPIRED, TIMEOUT
+
+BOOKING_DATE = "2026-10-20"
+ORG_ID = "10515"
+
+@pytest.fixture
+def standin():
+    server, base_url = start_standin()
+    yield server, base_url
+    server.shutdown()
+
+def logged_in(base_url, **kwargs):
+    booking = ClubLockerHTTPBooking(base_url=base_url, username="member", password="secret", **kwargs)
+    booking.start_browser()
+    booking.login()
+    return booking
+
+@pytest.mark.parametrize("base_url, local", [
+    ("http://127.0.0.1:8765", True),
+    ("http://localhost:8765/", True),
+    ("http://[::1]:8765", True),
+    ("https://clublocker.com", False),
+    ("http://192.168.1.10:8765", False),
+])
+def test_is_loopback(base_url, local):
+    assert is_loopback(base_url) is local
+
+def test_refuses_the_live_site():
+    with pytest.raises(ValueError):
+        ClubLockerHTTPBooking(base_url=clublocker_http.CLUBLOCKER_BASE_URL)
+
+@pytest.mark.parametrize("error, kind", [
+    (requests.ConnectTimeout(), TIMEOUT),
+    (BookingHTTPError("book", 409), SLOT_TAKEN),
+    (BookingHTTPError("book", 401), SESSION_EXPIRED),
+    # Any of these may come after the server saved the booking
+    (requests.ReadTimeout(), SAVE_UNCERTAIN),
+    (requests.ConnectionError("Connection aborted"), SAVE_UNCERTAIN),
+    (BookingHTTPError("book", 502), SAVE_UNCERTAIN),
+])
+def test_save_failure(error, kind):
+    assert save_failure(error) == kind
+
+def test_books_an_open_slot_once(standin):
+    _, base_url = standin
+    booking = logged_in(base_url)
+    try:
+        assert booking.navigate_to_date(BOOKING_DATE, ORG_ID)
+        slot = booking.check_slot_availability(1, "7:00 PM - 7:40 PM")
+        assert slot is not None
+        assert booking.attempt_booking(slot)
+        assert BOOKING_DATE in booking.reservations
+
+        # Booking the same slot again is refused as taken
+        assert booking.attempt_booking(slot) is False
+        assert booking.last_failure == SLOT_TAKEN
+        # ...and the date now shows the member's booking
+        booking.clear_reservations()
+        assert booking.navigate_to_date(BOOKING_DATE, ORG_ID) is False
+    finally:
+        booking.close()
+
+def test_unanswered_booking_post_is_save_uncertain(standin):
+    server, base_url = standin
+    booking = logged_in(base_url, timeouts={"save": 0.1})
+    try:
+        booking.navigate_to_date(BOOKING_DATE, ORG_ID)
+        slot = booking.check_slot_availability(2, "7:00 PM - 7:40 PM")
+        server.state.response_delay = 0.3
+        assert booking.attempt_booking(slot) is False
+        assert booking.last_failure == SAVE_UNCERTAIN
+    finally:
+        server.state.response_delay = 0.0
+        booking.close()
+
+def test_runner_rejects_http_backend_against_the_live_site():
+    parser = argparse.ArgumentParser()
+    live = argparse.Namespace(backend="http", base_url=clublocker_http.CLUBLOCKER_BASE_URL)
+    with pytest.raises(SystemExit):
+        runner.check_backend(parser, live)
+    runner.check_backend(parser, argparse.Namespace(backend="http", base_url="http://127.0.0.1:8765"))
+    runner.check_backend(parser, argparse.Namespace(backend="browser", base_url=clublocker_http.CLUBLOCKER_BASE_URL))
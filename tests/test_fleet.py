@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_fleet.py
+
+from availability import AvailabilityMatrix
+from fleet import CourtClaims, claimed_attempt, book_member_date
+from release_timer import FakeClock
+from retry_engine import RetryEngine, SAVE_UNCERTAIN
+from preferences import SlotOptimizer
+
+BOOKING_DATE = "2026-10-20"
+ALICE = {"name": "alice"}
+DAY_SCHEDULE = [
+    {"court": 1, "time_slot": "7:00 PM - 7:40 PM"},
+    {"court": 2, "time_slot": "7:00 PM - 7:40 PM"},
+]
+
+class FakeSnapshot:
+    """Grid with 40-minute slots from 7:00 PM on courts 1 and 2, all open"""
+    def __len__(self):
+        return 2
+
+    def availability(self):
+        return AvailabilityMatrix([(1, 1140, 1180, True), (2, 1140, 1180, True)])
+
+class FakeBooking:
+    """Every Save fails in the way given by save_failure (None books)"""
+    def __init__(self, save_failure=None, reservations=None):
+        self.save_failure = save_failure
+        self.reservations = reservations
+        self.grid_snapshot = FakeSnapshot()
+        self.booking_date = None
+        self.last_failure = None
+        self.saves = []
+
+    def navigate_to_date(self, booking_date, org_id, check_existing=True):
+        self.booking_date = booking_date
+        return True
+
+    def check_slot_availability(self, court, timeslot):
+        return (court, timeslot)
+
+    def attempt_booking(self, slot):
+        self.saves.append(slot)
+        if self.save_failure:
+            self.last_failure = self.save_failure
+            return False
+        return True
+
+    def clear_reservations(self):
+        pass
+
+    def check_existing_bookings(self, booking_date):
+        return self.reservations is not None and booking_date in self.reservations
+
+def make_engine():
+    clock = FakeClock()
+    return RetryEngine(clock=clock.time, sleep=clock.sleep, rng=lambda: 0.5)
+
+def test_teammate_claims_are_skipped():
+    claims = CourtClaims()
+    claims.claim(BOOKING_DATE, 1, "7:00 PM", "bob")
+    booking = FakeBooking()
+    outcome, entry = book_member_date(booking, ALICE, BOOKING_DATE, DAY_SCHEDULE, claims,
+                                      make_engine(), SlotOptimizer())
+    assert (outcome, entry["court"]) == ("booked", 2)
+    assert booking.saves == [(2, "7:00 PM - 7:40 PM")]
+
+def test_plain_failure_gives_the_claim_back():
+    claims = CourtClaims()
+    booking = FakeBooking(save_failure="slot_taken")
+    entry = dict(DAY_SCHEDULE[0], score=0.0)
+    assert not claimed_attempt(ALICE, BOOKING_DATE, claims)(booking, [entry], entry)
+    assert claims.claim(BOOKING_DATE, 1, "7:00 PM", "bob")
+
+def test_uncertain_save_stops_the_date_and_keeps_the_claim():
+    claims = CourtClaims()
+    # The reservations can't be read, so nobody knows if court 1 was booked
+    booking = FakeBooking(save_failure=SAVE_UNCERTAIN, reservations=None)
+    outcome, entry = book_member_date(booking, ALICE, BOOKING_DATE, DAY_SCHEDULE, claims,
+                                      make_engine(), SlotOptimizer())
+    assert (outcome, entry) == ("save_uncertain", None)
+    # Court 2 was never tried, and no teammate may go for court 1
+    assert booking.saves == [(1, "7:00 PM - 7:40 PM")]
+    assert not claims.claim(BOOKING_DATE, 1, "7:00 PM", "bob")
+
+def test_uncertain_save_found_in_reservations_is_booked():
+    booking = FakeBooking(save_failure=SAVE_UNCERTAIN, reservations={BOOKING_DATE})
+    outcome, entry = book_member_date(booking, ALICE, BOOKING_DATE, DAY_SCHEDULE, CourtClaims(),
+                                      make_engine(), SlotOptimizer())
+    assert (outcome, entry["court"]) == ("booked", 1)
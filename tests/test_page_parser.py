@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_page_parser.py
+#
+# Both parsers must read the saved pages in tests/fixtures exactly as the
+# browser's scripts read the live ones.
+
+import os
+
+import pytest
+
+import page_parser
+from grid_snapshot import GridSnapshot
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+PARSERS = [
+    "stdlib",
+    pytest.param("lxml", marks=pytest.mark.skipif(page_parser.lxml_html is None, reason="lxml is not installed")),
+]
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_parse_grid_html(parser):
+    slots = page_parser.parse_grid_html(fixture("grid.html"), parser)
+    # Only slot divs inside grid-slot elements of the first container's "column slots"
+    assert [(s["court"], s["title"].split("\n")[0], s["classes"]) for s in slots] == [
+        (1, "7:00 PM - 7:40 PM", "slot open"),
+        (1, "7:40 PM - 8:20 PM", "slot reserved"),
+        (2, "7:00 PM - 7:40 PM", "slot reserved"),
+        (2, "7:40 PM - 8:20 PM", "slot open"),
+        (3, "7:20 PM - 8:00 PM", "slot open"),
+    ]
+    assert slots[0]["title"] == "7:00 PM - 7:40 PM\nCourt 1"
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_parsed_grid_feeds_a_snapshot(parser):
+    snapshot = GridSnapshot(page_parser.parse_grid_html(fixture("grid.html"), parser))
+    assert snapshot.open_keys() == {(1, "7:00 PM"), (2, "7:40 PM"), (3, "7:20 PM")}
+    assert snapshot.availability().is_open(3, 1160)
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_parse_reservations_html(parser):
+    rows = page_parser.parse_reservations_html(fixture("reservations.html"), parser)
+    # The entry outside a row is skipped; the first .date/.time in an entry wins
+    assert rows == [
+        {"date": "Tue, Oct 20", "time": "7:00 PM Court 2"},
+        {"date": "Thu, Jan 7", "time": "6:20 PM Court 5"},
+    ]
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_page_without_a_grid(parser):
+    assert page_parser.parse_grid_html(fixture("reservations.html"), parser) == []
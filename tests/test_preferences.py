@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_preferences.py
+
+from availability import AvailabilityMatrix
+from preferences import SlotOptimizer
+
+# Ranked times 7:00 PM then 6:20 PM; ranked courts 2, 1, 5 (time rank outside court rank)
+DAY_SCHEDULE = [
+    {"court": 2, "time_slot": "7:00 PM - 7:40 PM"},
+    {"court": 1, "time_slot": "7:00 PM - 7:40 PM"},
+    {"court": 5, "time_slot": "7:00 PM - 7:40 PM"},
+    {"court": 2, "time_slot": "6:20 PM - 7:00 PM"},
+    {"court": 1, "time_slot": "6:20 PM - 7:00 PM"},
+    {"court": 5, "time_slot": "6:20 PM - 7:00 PM"},
+]
+
+def evening(open_slots):
+    """Courts 1, 2 and 5 with 40-minute slots from 6:20 to 8:20 PM; only open_slots are open"""
+    return AvailabilityMatrix(
+        (court, start, start + 40, (court, start) in open_slots)
+        for court in (1, 2, 5) for start in range(1100, 1220, 40)
+    )
+
+def test_rankings_follow_first_appearance():
+    time_rank, court_rank = SlotOptimizer.rankings(DAY_SCHEDULE)
+    assert time_rank == {1140: 0, 1100: 1}
+    assert court_rank == {2: 0, 1: 1, 5: 2}
+
+def test_without_time_weight_time_rank_always_wins():
+    # The worst court at the best time beats the best court at the second time
+    matrix = evening({(5, 1140), (2, 1100)})
+    ranked = SlotOptimizer().rank(matrix, DAY_SCHEDULE)
+    assert [(e["court"], e["time_slot"]) for e in ranked] == [(5, "7:00 PM - 7:40 PM"), (2, "6:20 PM - 7:00 PM")]
+
+def test_default_order_matches_the_saved_schedule():
+    optimizer = SlotOptimizer()
+    matrix = evening({(court, start) for court in (1, 2, 5) for start in (1100, 1140)})
+    ranked = optimizer.rank(matrix, DAY_SCHEDULE)
+    assert [(e["court"], e["time_slot"]) for e in ranked] == [(e["court"], e["time_slot"]) for e in DAY_SCHEDULE]
+    assert [(e["court"], e["time_slot"]) for e in optimizer.order(DAY_SCHEDULE)] == \
+        [(e["court"], e["time_slot"]) for e in DAY_SCHEDULE]
+
+def test_small_time_weight_lets_the_court_win():
+    matrix = evening({(5, 1140), (2, 1100)})
+    optimizer = SlotOptimizer(time_weight=1.0, court_weight=1.0)
+    best = optimizer.best(matrix, DAY_SCHEDULE)
+    # Court 2 at 6:20 scores 1 * 1 + 0; court 5 at 7:00 scores 0 + 2
+    assert (best["court"], best["time_slot"], best["score"]) == (2, "6:20 PM - 7:00 PM", 1.0)
+
+def test_group_weight_penalises_a_court_group():
+    matrix = evening({(1, 1140), (5, 1140)})
+    # Courts 4-7 (the second default group) cost 5 extra
+    optimizer = SlotOptimizer(time_weight=10.0, group_weights=[0.0, 5.0])
+    scores = {e["court"]: e["score"] for e in optimizer.rank(matrix, DAY_SCHEDULE)}
+    assert scores == {1: 1.0, 5: 2.0 + 5.0}
+
+def test_back_to_back_blocks_are_scored_by_their_first_slot():
+    # Court 1 is open 6:20-7:40; court 2 only at 7:00
+    matrix = evening({(1, 1100), (1, 1140), (2, 1140)})
+    ranked = SlotOptimizer(slots=2).rank(matrix, DAY_SCHEDULE)
+    assert len(ranked) == 1
+    assert ranked[0]["court"] == 1
+    assert ranked[0]["slots"] == ["6:20 PM - 7:00 PM", "7:00 PM - 7:40 PM"]
+    assert ranked[0]["time_slot"] == "6:20 PM - 7:00 PM"
+
+def test_nothing_open():
+    matrix = evening(set())
+    assert SlotOptimizer().rank(matrix, DAY_SCHEDULE) == []
+    assert SlotOptimizer().best(matrix, DAY_SCHEDULE) is None
+
+def test_from_config():
+    optimizer = SlotOptimizer.from_config({"preferences": {"time_weight": 2, "court_weight": 0.5, "slots": 2}})
+    assert (optimizer.time_weight, optimizer.court_weight, optimizer.slots) == (2, 0.5, 2)
+
+def test_unlisted_court_time_pairs_are_never_ranked():
+    # Court 5 is listed only at 6:20 and court 1 only at 7:00
+    day_schedule = [
+        {"court": 1, "time_slot": "7:00 PM - 7:40 PM"},
+        {"court": 5, "time_slot": "6:20 PM - 7:00 PM"},
+    ]
+    matrix = evening({(court, start) for court in (1, 5) for start in (1100, 1140)})
+    ranked = SlotOptimizer().rank(matrix, day_schedule)
+    assert [(e["court"], e["time_slot"]) for e in ranked] == [(1, "7:00 PM - 7:40 PM"), (5, "6:20 PM - 7:00 PM")]
+
+def test_unlisted_court_time_pairs_are_never_ranked():
+    # Court 5 is listed only at 6:20 and court 1 only at 7:00
+    day_schedule = [
+        {"court": 1, "time_slot": "7:00 PM - 7:40 PM"},
+        {"court": 5, "time_slot": "6:20 PM - 7:00 PM"},
+    ]
+    matrix = evening({(court, start) for court in (1, 5) for start in (1100, 1140)})
+    ranked = SlotOptimizer().rank(matrix, day_schedule)
+    assert [(e["court"], e["time_slot"]) for e in ranked] == [(1, "7:00 PM - 7:40 PM"), (5, "6:20 PM - 7:00 PM")]
+
+def test_order_lists_block_slots_from_the_timetable():
+    day_schedule = [
+        {"court": 1, "time_slot": "8:20 PM - 9:00 PM"},
+        {"court": 2, "time_slot": "6:20 PM - 7:00 PM"},
+    ]
+    ordered = SlotOptimizer(slots=2).order(day_schedule)
+    # 8:20 PM is the last slot of the day, so no block starts there
+    assert [(e["court"], e["slots"]) for e in ordered] == [(2, ["6:20 PM - 7:00 PM", "7:00 PM - 7:40 PM"])]
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_release_timer.py
+
+import math
+import datetime
+
+import release_timer
+from release_timer import FakeClock
+
+class RecordingClock(FakeClock):
+    """FakeClock that remembers every sleep"""
+    def __init__(self, start=0.0):
+        super().__init__(start)
+        self.sleeps = []
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        super().sleep(seconds)
+
+def test_wait_until_sleeps_coarse_then_fine():
+    clock = RecordingClock(start=100.0)
+    late = release_timer.wait_until(105.0, clock=clock.time, sleep=clock.sleep)
+
+    # One coarse sleep to FINE_WAIT_SECONDS before the target, then fine steps
+    assert math.isclose(clock.sleeps[0], 5.0 - release_timer.FINE_WAIT_SECONDS)
+    assert all(s <= release_timer.FINE_SLEEP_SECONDS for s in clock.sleeps[1:])
+    assert math.isclose(sum(clock.sleeps[1:]), release_timer.FINE_WAIT_SECONDS, abs_tol=1e-9)
+    assert clock.time() >= 105.0
+    assert 0.0 <= late < 1e-9
+
+def test_wait_until_past_target_returns_lateness_without_sleeping():
+    clock = RecordingClock(start=10.25)
+    assert release_timer.wait_until(10.0, clock=clock.time, sleep=clock.sleep) == 0.25
+    assert clock.sleeps == []
+
+def test_wait_for_release_corrects_for_server_offset():
+    # The server runs 2 s ahead, so release is reached 2 s early on the local clock
+    clock = FakeClock(start=0.0)
+    release_timer.wait_for_release(60.0, 2.0, clock=clock.time, sleep=clock.sleep)
+    assert math.isclose(clock.time(), 58.0)
+
+def test_measure_clock_offset_finds_the_second_boundary():
+    true_offset = 3.37
+    clock = FakeClock(start=1000.5)
+
+    def fetch(url):
+        # 10 ms each way; the Date header truncates to whole seconds
+        clock.sleep(0.01)
+        second = math.floor(clock.time() + true_offset)
+        clock.sleep(0.01)
+        return second
+
+    offset = release_timer.measure_clock_offset("http://server", clock=clock.time, fetch=fetch)
+    assert abs(offset - true_offset) <= 0.02
+
+def test_measure_clock_offset_falls_back_when_the_second_never_ticks():
+    clock = FakeClock(start=0.0)
+
+    def fetch(url):
+        clock.sleep(0.1)
+        return 500.0
+
+    offset = release_timer.measure_clock_offset("http://server", clock=clock.time, fetch=fetch, probe_seconds=0.3)
+    # First probe: sent at 0.0, received at 0.1; Date is on average half a second behind
+    assert math.isclose(offset, 500.0 + 0.5 - 0.05)
+
+def test_release_instant_follows_daylight_saving():
+    summer = release_timer.release_instant("12:00", datetime.date(2026, 10, 17), "America/New_York")
+    winter = release_timer.release_instant("12:00:30", datetime.date(2026, 12, 1), "America/New_York")
+    utc = datetime.timezone.utc
+    assert summer == datetime.datetime(2026, 10, 17, 16, 0, tzinfo=utc).timestamp()
+    assert winter == datetime.datetime(2026, 12, 1, 17, 0, 30, tzinfo=utc).timestamp()
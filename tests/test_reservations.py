@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_reservations.py
+
+import datetime
+
+import pytest
+
+from reservations import parse_reservation_date, ReservationCache
+
+@pytest.mark.parametrize("text, reference, expected", [
+    # Seen in late December, January rows belong to the next year
+    ("Mon, Jan 4", datetime.date(2026, 12, 30), datetime.date(2027, 1, 4)),
+    ("Tue, Jan 5", datetime.date(2026, 12, 30), datetime.date(2027, 1, 5)),
+    # Seen in early January, December rows belong to the year before
+    ("Thu, Dec 31", datetime.date(2027, 1, 2), datetime.date(2026, 12, 31)),
+    # Away from the boundary the weekday still picks the year
+    ("Mon, Jan 5", datetime.date(2026, 6, 1), datetime.date(2026, 1, 5)),
+    # Feb 29 only exists in leap years
+    ("Tue, Feb 29", datetime.date(2027, 6, 1), datetime.date(2028, 2, 29)),
+    # Full weekday names and odd case are read by their first three letters
+    ("thursday, Dec 31", datetime.date(2027, 1, 2), datetime.date(2026, 12, 31)),
+])
+def test_parse_reservation_date_picks_the_year(text, reference, expected):
+    assert parse_reservation_date(text, reference) == expected
+
+@pytest.mark.parametrize("text", [None, "", "Jan 5", "Xyz, Jan 5", "Mon, Foo 5", "Wed, Jan 5"])
+def test_parse_reservation_date_unreadable(text):
+    # "Wed, Jan 5" matches no nearby year's weekday
+    assert parse_reservation_date(text, datetime.date(2026, 12, 30)) is None
+
+def test_reservation_cache_from_rows_skips_unreadable_rows():
+    rows = [
+        {"date": "Mon, Jan 4", "time": "7:00 PM Court 2"},
+        {"date": "not a date", "time": ""},
+        {"time": "no date at all"},
+    ]
+    cache = ReservationCache.from_rows(rows, reference=datetime.date(2026, 12, 30))
+    assert len(cache) == 1
+    assert "2027-01-04" in cache
+    cache.add("2027-01-05")
+    assert "2027-01-05" in cache
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_retry_engine.py
+
+import pytest
+
+import retry_engine
+from retry_engine import RetryEngine, SaveUncertain, BudgetExhausted, classify_failure
+from release_timer import FakeClock
+
+# Stand-ins for the Selenium and requests exceptions, which are matched by class name
+class StaleElementReferenceException(Exception):
+    pass
+
+class TimeoutException(Exception):
+    pass
+
+class ConnectionError(Exception):
+    pass
+
+class HTTPStatusError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+@pytest.mark.parametrize("error, kind", [
+    (StaleElementReferenceException(), retry_engine.STALE),
+    (TimeoutException(), retry_engine.TIMEOUT),
+    (TimeoutError(), retry_engine.TIMEOUT),
+    (ConnectionError(), retry_engine.NAVIGATION),
+    (HTTPStatusError(401), retry_engine.SESSION_EXPIRED),
+    (HTTPStatusError(403), retry_engine.SESSION_EXPIRED),
+    (HTTPStatusError(409), retry_engine.SLOT_TAKEN),
+    (HTTPStatusError(503), retry_engine.NAVIGATION),
+    (Exception("Message: invalid session id"), retry_engine.SESSION_EXPIRED),
+    (ValueError("something else"), retry_engine.UNKNOWN),
+    (retry_engine.SAVE_UNCERTAIN, retry_engine.SAVE_UNCERTAIN),
+])
+def test_classify_failure(error, kind):
+    assert classify_failure(error) == kind
+
+class FakeSessionCache:
+    def __init__(self):
+        self.cleared = []
+
+    def clear(self, key):
+        self.cleared.append(key)
+
+class FakeBooking:
+    """Records the recovery calls the engine makes"""
+    def __init__(self, reservations_after_save=None):
+        self.calls = []
+        self.last_failure = None
+        self.session_cache = FakeSessionCache()
+        self.session_key = "key"
+        self.session_restored = True
+        self.reservations = None
+        # What My Reservations shows after a Save: a set of dates, or None if unreadable
+        self.reservations_after_save = reservations_after_save
+        self.navigate_errors = []
+
+    def close(self):
+        self.calls.append("close")
+
+    def start_browser(self):
+        self.calls.append("start_browser")
+
+    def login(self):
+        self.calls.append("login")
+
+    def navigate_to_date(self, booking_date, org_id, check_existing=True):
+        self.calls.append("navigate")
+        if self.navigate_errors:
+            raise self.navigate_errors.pop(0)
+        return True
+
+    def refresh_grid(self):
+        self.calls.append("refresh")
+
+    def clear_reservations(self):
+        self.calls.append("clear_reservations")
+        self.reservations = None
+
+    def check_existing_bookings(self, booking_date):
+        self.calls.append("check_existing")
+        self.reservations = self.reservations_after_save
+        return self.reservations is not None and booking_date in self.reservations
+
+def make_engine(budget=90.0, max_attempts=3, clock=None):
+    clock = clock or FakeClock()
+    return RetryEngine(budget_seconds=budget, max_attempts=max_attempts,
+                       clock=clock.time, sleep=clock.sleep, rng=lambda: 0.5)
+
+def scripted(booking, outcomes):
+    """attempt_one that plays outcomes in order: True, False, an exception, or a last_failure kind"""
+    tried = []
+    outcomes = list(outcomes)
+
+    def attempt_one(entry):
+        tried.append(entry["court"])
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        if isinstance(outcome, str):
+            booking.last_failure = outcome
+            return False
+        return outcome
+    return attempt_one, tried
+
+CANDIDATES = [
+    {"court": 1, "time_slot": "7:00 PM - 7:40 PM"},
+    {"court": 2, "time_slot": "7:00 PM - 7:40 PM"},
+    {"court": 3, "time_slot": "7:00 PM - 7:40 PM"},
+]
+
+def test_stale_is_retried_on_the_same_candidate_after_a_resnapshot():
+    booking = FakeBooking()
+    attempt_one, tried = scripted(booking, [StaleElementReferenceException(), True])
+    engine = make_engine()
+    assert engine.book(booking, CANDIDATES, "2026-10-20", "1", attempt_one) == CANDIDATES[0]
+    assert tried == [1, 1]
+    assert booking.calls == ["refresh"]
+    assert [kind for kind, _, _ in engine.failures] == [retry_engine.STALE]
+
+def test_slot_taken_moves_straight_to_the_next_candidate():
+    booking = FakeBooking()
+    attempt_one, tried = scripted(booking, [False, True])
+    assert make_engine().book(booking, CANDIDATES, "2026-10-20", "1", attempt_one) == CANDIDATES[1]
+    assert tried == [1, 2]
+    assert booking.calls == []
+
+def test_session_expired_logs_in_again():
+    booking = FakeBooking()
+    attempt_one, tried = scripted(booking, [HTTPStatusError(401), True])
+    assert make_engine().book(booking, CANDIDATES, "2026-10-20", "1", attempt_one) == CANDIDATES[0]
+    assert booking.calls == ["close", "start_browser", "login", "navigate"]
+    assert booking.session_cache.cleared == ["key"]
+    assert booking.session_restored is False
+
+def test_navigation_error_reloads_the_date():
+    booking = FakeBooking()
+    attempt_one, tried = scripted(booking, [ConnectionError(), True])
+    make_engine().book(booking, CANDIDATES, "2026-10-20", "1", attempt_one)
+    assert booking.calls == ["navigate"]
+
+def test_candidate_is_given_up_after_max_attempts():
+    booking = FakeBooking()
+    attempt_one, tried = scripted(booking, [TimeoutException()] * 2 + [True])
+    assert make_engine(max_attempts=2).book(booking, CANDIDATES, "2026-10-20", "1", attempt_one) == CANDIDATES[1]
+    assert tried == [1, 1, 2]
+
+def test_unknown_error_is_not_retried_on_the_same_candidate():
+    booking = FakeBooking()
+    attempt_one, tried = scripted(booking, [ValueError("bug"), True])
+    assert make_engine().book(booking, CANDIDATES, "2026-10-20", "1", attempt_one) == CANDIDATES[1]
+    assert tried == [1, 2]
+
+def test_budget_runs_out():
+    clock = FakeClock()
+    booking = FakeBooking()
+
+    def attempt_one(entry):
+        clock.sleep(4.0)
+        raise TimeoutException()
+
+    engine = make_engine(budget=10.0, max_attempts=10, clock=clock)
+    assert engine.book(booking, CANDIDATES, "2026-10-20", "1", attempt_one) is None
+    assert clock.time() <= 10.0 + 4.0
+
+def test_backoff_raises_once_the_budget_is_spent():
+    clock = FakeClock()
+    engine = make_engine(budget=1.0, clock=clock)
+    engine.start()
+    clock.sleep(1.0)
+    with pytest.raises(BudgetExhausted):
+        engine.backoff(1)
+
+def test_save_uncertain_that_booked_returns_the_candidate():
+    booking = FakeBooking(reservations_after_save={"2026-10-20"})
+    attempt_one, tried = scripted(booking, [retry_engine.SAVE_UNCERTAIN])
+    assert make_engine().book(booking, CANDIDATES, "2026-10-20", "1", attempt_one) == CANDIDATES[0]
+    assert tried == [1]
+    assert booking.calls == ["clear_reservations", "check_existing"]
+
+def test_save_uncertain_that_did_not_book_reloads_and_retries():
+    booking = FakeBooking(reservations_after_save=set())
+    attempt_one, tried = scripted(booking, [retry_engine.SAVE_UNCERTAIN, True])
+    assert make_engine().book(booking, CANDIDATES, "2026-10-20", "1", attempt_one) == CANDIDATES[0]
+    assert tried == [1, 1]
+    assert booking.calls == ["clear_reservations", "check_existing", "navigate"]
+
+def test_save_uncertain_with_unreadable_reservations_stops_the_date():
+    booking = FakeBooking(reservations_after_save=None)
+    attempt_one, tried = scripted(booking, [retry_engine.SAVE_UNCERTAIN, True])
+    with pytest.raises(SaveUncertain):
+        make_engine().book(booking, CANDIDATES, "2026-10-20", "1", attempt_one)
+    # Read twice, reloading the grid in between; no other court is tried
+    assert tried == [1]
+    assert booking.calls == ["clear_reservations", "check_existing", "navigate", "clear_reservations", "check_existing"]
+
+def test_navigate_retries_transient_failures_only():
+    booking = FakeBooking()
+    booking.navigate_errors = [TimeoutException()]
+    assert make_engine().navigate(booking, "2026-10-20", "1") is True
+    assert booking.calls == ["navigate", "navigate"]
+
+    booking = FakeBooking()
+    booking.navigate_errors = [ValueError("bug")]
+    with pytest.raises(ValueError):
+        make_engine().navigate(booking, "2026-10-20", "1")
+    assert booking.calls == ["navigate"]
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_run_scheduled_bookings.py
+
+import run_scheduled_bookings as runner
+from run_scheduled_bookings import PARTIAL_BLOCK, attempt_candidate, booked_outcome, overall_outcome
+
+BLOCK = ["6:20 PM - 7:00 PM", "7:00 PM - 7:40 PM"]
+
+class FakeBooking:
+    """Grid where only the time slots in open_slots can be booked"""
+    def __init__(self, open_slots):
+        self.open_slots = set(open_slots)
+        self.booked = []
+
+    def check_slot_availability(self, court, timeslot):
+        return (court, timeslot) if timeslot in self.open_slots else None
+
+    def attempt_booking(self, slot):
+        self.booked.append(slot)
+        return True
+
+def block_entry():
+    return {"court": 1, "time_slot": BLOCK[0], "slots": list(BLOCK), "score": 0.0}
+
+def test_whole_block_is_booked():
+    entry = block_entry()
+    assert attempt_candidate(FakeBooking(BLOCK), [entry], entry) is True
+    assert entry["booked_slots"] == BLOCK
+    assert booked_outcome(entry) == "booked"
+
+def test_block_cut_short_is_a_partial_outcome():
+    entry = block_entry()
+    booking = FakeBooking(BLOCK[:1])
+    outcome = attempt_candidate(booking, [entry], entry)
+    # Still a true value, so the engine stops instead of booking a second court
+    assert outcome == PARTIAL_BLOCK
+    assert booking.booked == [(1, BLOCK[0])]
+    assert entry["booked_slots"] == BLOCK[:1]
+    assert booked_outcome(entry) == PARTIAL_BLOCK
+    assert runner.describe_booking(entry) == "Court 1 at 6:20 PM - 7:00 PM"
+
+def test_first_slot_taken_books_nothing():
+    entry = block_entry()
+    assert attempt_candidate(FakeBooking(BLOCK[1:]), [entry], entry) is False
+    assert "booked_slots" not in entry
+
+def test_single_slot_entries_are_booked():
+    assert booked_outcome({"court": 2, "time_slot": BLOCK[0]}) == "booked"
+
+def test_overall_outcome():
+    assert overall_outcome({}) == "no_schedule"
+    assert overall_outcome({"a": ("booked", {}), "b": ("booked", {})}) == "booked"
+    assert overall_outcome({"a": ("booked", {}), "b": (PARTIAL_BLOCK, {})}) == PARTIAL_BLOCK
+    assert overall_outcome({"a": (PARTIAL_BLOCK, {}), "b": ("no_slot", None)}) == "partial"
+    assert overall_outcome({"a": ("no_slot", None), "b": ("no_slot", None)}) == "no_slot"
+    assert overall_outcome({"a": ("existing_booking", None), "b": ("no_slot", None)}) == "no_slot"
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+
+#!/usr/bin/env python
+# timetable.py
+#
+# Court timetable model and compiled booking plan.
+#
+# Each court group is described by (open, close, duration, offset) and its
+# slots are computed, keyed by integer minutes since midnight, instead of
+# being listed by hand. compile_plan() turns the UI settings in
+# booking_config.json into a validated booking_plan.json that the runner
+# can load directly; malformed settings are rejected with PlanError when the
+# plan is compiled (at save time) rather than at noon.
+#
+# Usage:
+#   python timetable.py            # validate booking_config.json and write booking_plan.json
+#   python timetable.py --check    # validate only
+
+import sys
+import json
+import hashlib
+import argparse
+import datetime
+
+CONFIG_FILE = "booking_config.json"
+PLAN_FILE = "booking_plan.json"
+PLAN_VERSION = 1
+DAYS_OF_WEEK = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+WEEKEND_DAYS = ["Saturday", "Sunday"]
+# Ranking lists in the UI are built on this grid
+TICK_MINUTES = 20
+
+class PlanError(ValueError):
+    """Raised when the schedule settings can't be compiled into a valid plan"""
+    def __init__(self, problems):
+        self.problems = list(problems)
+        super().__init__("; ".join(self.problems))
+
+def parse_time(text):
+    """Parse "6:00 PM", "06:00 PM" or "18:00" into minutes since midnight"""
+    text = str(text).strip().upper()
+    for fmt in ("%I:%M %p", "%H:%M"):
+        try:
+            parsed = datetime.datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        return parsed.hour * 60 + parsed.minute
+    raise ValueError(f"Unrecognised time: {text!r}")
+
+def format_minutes(minutes):
+    """Format minutes since midnight like the grid does: "6:00 PM" (no leading zero)"""
+    hour, minute = divmod(int(minutes), 60)
+    suffix = "AM" if hour < 12 else "PM"
+    hour = hour % 12 or 12
+    return f"{hour}:{minute:02d} {suffix}"
+
+def format_range(start, end):
+    """Format a slot as "6:00 PM - 6:40 PM" """
+    return f"{format_minutes(start)} - {format_minutes(end)}"
+
+def normalize_time(text):
+    """Canonical display form of a time string ("06:00 PM" -> "6:00 PM")"""
+    return format_minutes(parse_time(text))
+
+class CourtGroup:
+    """Courts that share one timetable: slots of duration minutes from open+offset until close"""
+    def __init__(self, courts, open_time, close_time, duration=40, offset=0):
+        self.courts = [int(c) for c in courts]
+        self.open = parse_time(open_time) if isinstance(open_time, str) else int(open_time)
+        self.close = parse_time(close_time) if isinstance(close_time, str) else int(close_time)
+        self.duration = int(duration)
+        self.offset = int(offset)
+        if self.duration <= 0:
+            raise ValueError("Slot duration must be positive")
+        self.starts = list(range(self.open + self.offset, self.close - self.duration + 1, self.duration))
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["courts"], data["open"], data["close"], data.get("duration", 40), data.get("offset", 0))
+
+    def to_dict(self):
+        return {
+            "courts": self.courts,
+            "open": format_minutes(self.open),
+            "close": format_minutes(self.close),
+            "duration": self.duration,
+            "offset": self.offset,
+        }
+
+class Timetable:
+    """All court groups of a club, indexed by court number"""
+    def __init__(self, groups):
+        self.groups = list(groups)
+        self.by_court = {}
+        for group in self.groups:
+            for court in group.courts:
+                if court in self.by_court:
+                    raise ValueError(f"Court {court} appears in more than one court group")
+                self.by_court[court] = group
+        # (court, start minute) -> end minute
+        self.slot_ends = {
+            (court, start): start + group.duration
+            for court, group in self.by_court.items()
+            for start in group.starts
+        }
+
+    @classmethod
+    def from_config(cls, config):
+        """The timetable block of the config, or the club's default layout"""
+        groups = (config or {}).get("timetable", {}).get("groups")
+        if not groups:
+            return DEFAULT_TIMETABLE
+        return cls(CourtGroup.from_dict(group) for group in groups)
+
+    @property
+    def courts(self):
+        return sorted(self.by_court)
+
+    def slot_starts(self, court):
+        """Start minutes of every slot on a court"""
+        return self.by_court[int(court)].starts
+
+    def slot_end(self, court, start):
+        """End minute of the slot starting at start on court, or None if there is no such slot"""
+        return self.slot_ends.get((int(court), int(start)))
+
+    def time_range(self):
+        """Every TICK_MINUTES start between the earliest and latest slot start, as display strings"""
+        earliest = min(group.starts[0] for group in self.groups if group.starts)
+        latest = max(group.starts[-1] for group in self.groups if group.starts)
+        return [format_minutes(m) for m in range(earliest, latest + 1, TICK_MINUTES)]
+
+    def to_dict(self):
+        return {"groups": [group.to_dict() for group in self.groups]}
+
+# Courts 1-3 run 7:00 AM - 9:00 PM; courts 4-7 are offset by 20 minutes and close at 8:00 PM
+DEFAULT_TIMETABLE = Timetable([
+    CourtGroup([1, 2, 3], "7:00 AM", "9:00 PM", duration=40, offset=0),
+    CourtGroup([4, 5, 6, 7], "7:00 AM", "8:00 PM", duration=40, offset=20),
+])
+
+def build_day_candidates(time_ranking, court_ranking, timetable):
+    """Ranked (court, start, end) candidates: time rank outside, court rank inside"""
+    candidates = []
+    for start in time_ranking:
+        for court in court_ranking:
+            end = timetable.slot_end(court, start)
+            if end is not None:
+                candidates.append((court, start, end))
+    return candidates
+
+def compile_plan(config, timetable=None):
+    """
+    Validate the schedule settings and compile them into a plan dict.
+    Raises PlanError listing every problem found.
+    """
+    timetable = timetable or Timetable.from_config(config)
+    problems = []
+
+    court_ranking = config.get("court_ranking", [])
+    courts = []
+    for court in court_ranking:
+        try:
+            court = int(court)
+        except (TypeError, ValueError):
+            problems.append(f"court_ranking: {court!r} is not a court number")
+            continue
+        if court not in timetable.by_court:
+            problems.append(f"court_ranking: court {court} is not in the timetable")
+        elif court in courts:
+            problems.append(f"court_ranking: court {court} is listed twice")
+        else:
+            courts.append(court)
+    if not courts:
+        problems.append("court_ranking: no valid courts")
+
+    rankings = {}
+    for section in ("weekday", "weekend"):
+        minutes = []
+        for text in config.get(section, {}).get("time_ranking", []):
+            try:
+                start = parse_time(text)
+            except ValueError:
+                problems.append(f"{section}.time_ranking: {text!r} is not a time")
+                continue
+            if start in minutes:
+                problems.append(f"{section}.time_ranking: {text} is listed twice")
+                continue
+            minutes.append(start)
+        rankings[section] = minutes
+
+    days = {}
+    for day, active in config.get("active_days", {}).items():
+        if day not in DAYS_OF_WEEK:
+            problems.append(f"active_days: {day!r} is not a day of the week")
+            continue
+        if not active:
+            continue
+        section = "weekend" if day in WEEKEND_DAYS else "weekday"
+        candidates = build_day_candidates(rankings[section], courts, timetable)
+        if not candidates:
+            problems.append(f"{day}: none of the ranked {section} times is a slot on any ranked court")
+            continue
+        days[day] = [list(candidate) for candidate in candidates]
+
+    if problems:
+        raise PlanError(problems)
+    return {
+        "version": PLAN_VERSION,
+        "source_hash": config_hash(config),
+        "compiled_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "timetable": timetable.to_dict(),
+        "days": days,
+    }
+
+def config_hash(config):
+    """Fingerprint of the settings a plan is compiled from, to detect stale plans"""
+    source = {key: config.get(key) for key in ("active_days", "weekday", "weekend", "court_ranking", "timetable")}
+    return hashlib.sha256(json.dumps(source, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def plan_to_final_schedule(plan):
+    """Expand a compiled plan into the final_schedule structure ({day: [{court, time_slot}]})"""
+    return {
+        day: [{"court": court, "time_slot": format_range(start, end)} for court, start, end in candidates]
+        for day, candidates in plan["days"].items()
+    }
+
+def write_plan(plan, path=PLAN_FILE):
+    with open(path, "w") as f:
+        json.dump(plan, f, separators=(",", ":"))
+
+def load_plan(path=PLAN_FILE, config=None):
+    """
+    Load a compiled plan. Returns None if the file is missing, has another
+    version, or (when config is given) was compiled from different settings.
+    """
+    try:
+        with open(path, "r") as f:
+            plan = json.load(f)
+    except FileNotFoundError:
+        return None
+    if plan.get("version") != PLAN_VERSION:
+        return None
+    if config is not None and plan.get("source_hash") != config_hash(config):
+        return None
+    return plan
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate booking settings and compile the booking plan.")
+    parser.add_argument("--config", type=str, default=CONFIG_FILE, help="Settings file to compile")
+    parser.add_argument("--plan", type=str, default=PLAN_FILE, help="Where to write the compiled plan")
+    parser.add_argument("--check", action="store_true", help="Validate only; don't write the plan")
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = json.load(f)
+    try:
+        plan = compile_plan(config)
+    except PlanError as e:
+        print("Invalid booking settings:")
+        for problem in e.problems:
+            print(f"  - {problem}")
+        sys.exit(1)
+    for day, candidates in plan["days"].items():
+        print(f"{day}: {len(candidates)} candidates")
+    if not args.check:
+        write_plan(plan, args.plan)
+        print(f"Plan written to {args.plan}")
+
+if __name__ == "__main__":
+    main()